@@ -6,30 +6,90 @@ Created on Fri Aug  8 21:39:33 2025
 """
 
 import asyncio
+import contextvars
+import heapq
+import hmac
+import itertools
+import json
 import logging
+import math
 import os
 import random
 import re
-from collections.abc import Callable
-from contextlib import asynccontextmanager
+from collections import deque
+from collections.abc import Awaitable, Callable
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass, replace
+from datetime import UTC, datetime, timedelta
 from http import HTTPStatus
-from typing import AsyncIterator, Iterable
+from time import monotonic, perf_counter
+from typing import Any, AsyncIterator, Hashable, Iterable, Literal, cast
 
-from fastapi import APIRouter, FastAPI, Request, Response
-from telegram import Update
+from fastapi import APIRouter, FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict
+from starlette.types import Receive, Scope, Send
+from telegram import Chat, Message, Update
+from telegram.error import NetworkError, RetryAfter
 from telegram.ext import (
     ApplicationBuilder,
+    BaseUpdateProcessor,
     CommandHandler,
     ContextTypes,
+    ExtBot,
     MessageHandler,
+    TypeHandler,
     filters,
 )
+from telegram.request import HTTPXRequest
 
+from acrobot import executors, logs, tracing
 from acrobot.config import Config, get_settings, setup_logging
-from acrobot.models import AcroError, build_model, get_acro
+from acrobot.monitor import LoopMonitor
+from acrobot.pending import PendingTask, load_pending, save_pending
+from acrobot.pregen import KeywordPool
+from acrobot.probe import ProbeResult, probe_models
+from acrobot.state import ChatStates
+from acrobot.summary import SUMMARY_TEMPLATE, Summarizer
+from acrobot.usage import UsageLedger
+from acrobot.models import (
+    AcroError,
+    AcroResult,
+    Model,
+    RetryPolicy,
+    BATCH_TEMPLATE,
+    RouteRule,
+    Router,
+    Usage,
+    build_model,
+    get_acro_batch_async,
+    get_acro_result_async,
+    repair_stats,
+)
 
 logger = logging.getLogger(__name__)
 
+# Error given to API requests still waiting when the bot stops.
+SHUTDOWN_ERROR = "service unavailable: shutting down"
+
+
+def chat_id_of(update: Update) -> int | None:
+    """
+    Returns the id of the chat an update belongs to. Updates without a chat
+    share the state kept under None.
+    """
+    return update.effective_chat.id if update.effective_chat else None
+
+
+def keyword_reply(word: str, response: str) -> str:
+    """Formats the bot's reply to a keyword hit."""
+    return f"{word}? Who said {word}!?\n" + response
+
+
+def clean_word(word: str, max_length: int) -> str:
+    """Strips non-alphabetic characters and truncates to max_length."""
+    return "".join(char for char in word if char.isalpha())[:max_length]
+
 
 def match_words(message: str, keywords: Iterable[str]) -> list[str]:
     """
@@ -40,6 +100,165 @@ def match_words(message: str, keywords: Iterable[str]) -> list[str]:
     return found
 
 
+@dataclass
+class SenderStats:
+    """Running totals for ReplySender."""
+
+    sent: int = 0
+    failed: int = 0
+    retries: int = 0
+    flood_waits: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+
+    @property
+    def wait_mean(self) -> float:
+        done = self.sent + self.failed
+        return self.wait_total / done if done else 0.0
+
+
+# ************************************************************
+# REPLY SENDER
+# -----------------------------------------------------------
+# Outbound messages are handed off to per-chat lanes so a slow
+# or flood-limited chat never holds up the generation queue or
+# any other chat. Each lane sends in order; lanes run
+# concurrently up to max_concurrent sends at a time.
+# ************************************************************
+class ReplySender:
+    def __init__(self, max_concurrent: int = 8, max_attempts: int = 3) -> None:
+        self.max_attempts = max_attempts
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.lanes: dict[Hashable, asyncio.Queue[tuple[float, Callable]]] = {}
+        self.workers: dict[Hashable, asyncio.Task] = {}
+        self.stats = SenderStats()
+
+    def send(self, chat_id: Hashable, func: Callable[[], Awaitable[Any]]) -> None:
+        """
+        Queues func (which performs the actual Telegram call) on the chat's
+        lane and returns immediately.
+        """
+        lane = self.lanes.setdefault(chat_id, asyncio.Queue())
+        lane.put_nowait((perf_counter(), tracing.carry(func)))
+        if chat_id not in self.workers:
+            # run each lane in a fresh context; items carry their own trace
+            self.workers[chat_id] = asyncio.create_task(
+                self._lane_worker(chat_id, lane), context=contextvars.Context()
+            )
+
+    def pending(self) -> int:
+        """Replies not yet sent, counting the one each lane is working on."""
+        return sum(lane.qsize() for lane in self.lanes.values()) + len(self.workers)
+
+    async def join(self) -> None:
+        """Waits until every lane has been drained."""
+        while self.workers:
+            await asyncio.gather(*self.workers.values(), return_exceptions=True)
+
+    async def _lane_worker(self, chat_id: Hashable, lane: asyncio.Queue) -> None:
+        try:
+            while not lane.empty():
+                queued, func = lane.get_nowait()
+                with tracing.resume(func, "reply.wait"), logs.bind(chat_id):
+                    await self._deliver(queued, func)
+        finally:
+            del self.workers[chat_id]
+            if lane.empty():
+                del self.lanes[chat_id]
+
+    async def _deliver(self, queued: float, func: Callable) -> None:
+        """
+        Sends a single message, honouring flood-control waits and retrying
+        network errors a bounded number of times.
+        """
+        delay: float
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                async with self.semaphore:
+                    if attempt == 1:
+                        wait = perf_counter() - queued
+                        self.stats.wait_total += wait
+                        self.stats.wait_max = max(self.stats.wait_max, wait)
+                    with tracing.span("telegram.reply", attempt=attempt):
+                        await func()
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                delay = (
+                    retry_after.total_seconds()
+                    if isinstance(retry_after, timedelta)
+                    else retry_after
+                )
+                logger.warning("flood control: waiting %ss", delay)
+                self.stats.flood_waits += 1
+            except NetworkError as e:
+                logger.warning("send failed (%s: %s)", type(e).__name__, e)
+                delay = attempt
+            except Exception as e:
+                logger.error("send failed: %s: %s", type(e).__name__, e, exc_info=False)
+                break
+            else:
+                self.stats.sent += 1
+                return
+            if attempt < self.max_attempts:
+                self.stats.retries += 1
+                await asyncio.sleep(delay)
+        self.stats.failed += 1
+
+
+# ************************************************************
+# UPDATE PROCESSING
+# -----------------------------------------------------------
+# Incoming updates are handled concurrently, up to
+# max_concurrent at a time, except that updates from the same
+# chat are handled one at a time and in the order received.
+# ************************************************************
+class ChatUpdateProcessor(BaseUpdateProcessor):
+    def __init__(self, max_concurrent: int = 8, max_pending: int | None = None) -> None:
+        # PTB's own limit covers updates still waiting on their chat, so a
+        # busy chat can't use up the slots other chats need.
+        super().__init__(max_pending or 16 * max_concurrent)
+        self.slots = asyncio.Semaphore(max_concurrent)
+        self.locks: dict[Hashable, asyncio.Lock] = {}
+        self.waiting: dict[Hashable, int] = {}
+        self.processed = 0
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        chat_id = chat_id_of(update) if isinstance(update, Update) else None
+        lock = self.locks.setdefault(chat_id, asyncio.Lock())
+        self.waiting[chat_id] = self.waiting.get(chat_id, 0) + 1
+        try:
+            async with lock, self.slots:
+                with logs.bind(chat_id, getattr(update, "update_id", None)):
+                    await coroutine
+        finally:
+            self.processed += 1
+            self.waiting[chat_id] -= 1
+            if not self.waiting[chat_id]:
+                del self.waiting[chat_id], self.locks[chat_id]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+
+class PollingBot(ExtBot):
+    """ExtBot that fetches at most poll_limit updates per getUpdates call."""
+
+    __slots__ = ("poll_limit",)
+
+    def __init__(self, *args: Any, poll_limit: int = 100, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        with self._unfrozen():
+            self.poll_limit = poll_limit
+
+    async def get_updates(  # type: ignore[override]
+        self, offset: int | None = None, limit: int | None = None, *args: Any, **kwargs: Any
+    ) -> tuple[Update, ...]:
+        return await super().get_updates(offset, limit or self.poll_limit, *args, **kwargs)
+
+
 # ************************************************************
 # ACROBOT (BASE) CLASS
 # -----------------------------------------------------------
@@ -48,22 +267,129 @@ def match_words(message: str, keywords: Iterable[str]) -> list[str]:
 # ************************************************************
 class Acrobot:
     def __init__(
-        self, settings: Config = get_settings(), start_telegram: bool = True
+        self,
+        settings: Config = get_settings(),
+        start_telegram: bool = True,
+        shared: "Acrobot | None" = None,
+        name: str | None = None,
     ) -> None:
+        """
+        With shared, this bot joins shared's group of peers (see Acrohost):
+        it uses shared's queue, and so its rate limit, along with its reply
+        sender, models and usage ledger. Each bot keeps its own keyword pool,
+        refilled with its own config. The first bot of the group runs the
+        queue for all of them.
+        """
         logger.info(f"Initializing with:\n{settings}")
         self.settings = Config.model_validate(settings)
-        self.queue: asyncio.Queue[None | Callable] = asyncio.Queue()
-        self.history: list[tuple[str, str]] = []
+        self.name = name
+        tracing.configure(**self.settings.tracing.model_dump())
+        self.peers: list[Acrobot] = shared.peers if shared else []
+        self.peers.append(self)
+        self.queue: asyncio.Queue[None | Callable] = (
+            shared.queue if shared else asyncio.Queue()
+        )
+        self.active: Callable | None = None
+        self.api_waiting: set[asyncio.Future] = set()
+        self.backlog: deque[Callable | None] = deque()
+        self.deferred: list[tuple[float, int, PendingTask]] = []
+        self.deferred_seq = itertools.count()
+        monitor = self.settings.monitor
+        self.monitor: LoopMonitor | None = None
+        if shared is None:
+            executors.configure(
+                {name: e.model_dump() for name, e in self.settings.executors.items()}
+            )
+        if shared is None and monitor.enabled:
+            self.monitor = LoopMonitor(monitor.interval, monitor.threshold, monitor.workers)
+        self.sender: ReplySender = shared.sender if shared else ReplySender(
+            self.settings.acrobot.reply_workers, self.settings.acrobot.reply_attempts
+        )
         self.keywords = self.settings.acrobot.keywords
-        self.llm = build_model(self.settings.use_config)
+        self.chats = ChatStates(
+            self.settings.acrobot.max_history,
+            self.settings.acrobot.max_state_bytes,
+            self.settings.acrobot.state_path,
+        )
+        self.models: dict[str, tuple[Model, RetryPolicy]] = shared.models if shared else {}
+        self.probes: dict[str, ProbeResult] = shared.probes if shared else {}
+        self.probed: asyncio.Event = shared.probed if shared else asyncio.Event()
+        self.serving = False
+        self.config_name = self.settings.model.use_config
+        self.llm, self.retry_policy = self._config_model(self.config_name)
+        self.fallback_llm: Model | None = None
+        self.fallback_policy = RetryPolicy()
+        if self.settings.model.fallback:
+            self.fallback_llm, self.fallback_policy = self._config_model(
+                self.settings.model.fallback
+            )
+
+        routing = self.settings.routing
+        self.model_router: Router | None = shared.model_router if shared else None
+        if shared is None and routing.enabled:
+            rules = [
+                RouteRule(**{**rule.model_dump(), "kinds": rule.kinds and tuple(rule.kinds)})
+                for rule in routing.rules
+            ]
+            self.model_router = Router(
+                rules, routing.min_samples, routing.window, routing.explore
+            )
+
+        usage = self.settings.usage
+        self.usage: UsageLedger = shared.usage if shared else UsageLedger(
+            usage.window, usage.retention, usage.chat_budget, usage.path, usage.flush_interval
+        )
+        self.budget_llm = None
+        self.budget_policy = RetryPolicy()
+        if usage.chat_budget is not None and usage.budget_config:
+            self.budget_llm, self.budget_policy = self._config_model(usage.budget_config)
+        elif usage.chat_budget is not None:
+            self.budget_llm = build_model("LocalModel")
+
+        self.summarizer: Summarizer | None = None
+        self.task_summary: asyncio.Task | None = None
+        if self.settings.summary.enabled:
+            summary = self.settings.summary
+            self.summarizer = Summarizer(
+                self._config_model(str(summary.config))[0],
+                summary.every,
+                summary.recent,
+                summary.prompt or SUMMARY_TEMPLATE,
+            )
+
+        self.pool: KeywordPool | None = None
+        self.refill_failures = 0
+        self.refill_after = 0.0
+        self.refill_turn = 0
+        if self.settings.pregen.enabled:
+            self.pool = KeywordPool(
+                self.settings.pregen.pool_size,
+                self.settings.pregen.ttl,
+                self.settings.pregen.priority,
+            )
+            self._sync_pool()
 
         if start_telegram:
             logger.info("Configuring telegram app.")
+            acro = self.settings.acrobot
+            bot_kwargs: dict[str, Any] = {}
+            if acro.api_base_url:
+                bot_kwargs["base_url"] = acro.api_base_url
+            bot = PollingBot(
+                os.environ.get(acro.telegram_key, ""),
+                request=HTTPXRequest(connection_pool_size=256),
+                get_updates_request=HTTPXRequest(),
+                poll_limit=acro.poll_limit,
+                **bot_kwargs,
+            )
             self.telegram_app = (
                 ApplicationBuilder()
-                .token(os.environ.get(self.settings.acrobot.telegram_key, ""))
+                .bot(bot)
+                .concurrent_updates(ChatUpdateProcessor(acro.concurrent_updates))
+                .post_stop(self._post_stop)
                 .build()
             )
+            self.telegram_app.add_handler(TypeHandler(Update, self._prefetch_chat), -1)
             self.telegram_app.add_handler(CommandHandler("start", self.command_start))
             self.telegram_app.add_handler(CommandHandler("info", self.command_info))
             self.telegram_app.add_handler(
@@ -92,75 +418,575 @@ class Acrobot:
         """
 
         logger.info("queue processor started.")
+        if self.settings.probe.enabled:
+            # hold requests until the probe has opened the models' connections
+            await self.probed.wait()
 
+        stopping = False
         while True:
             logger.debug("queue processor awaiting.")
-            item = await self.queue.get()
-            logger.debug(f"task received: {item}")
+            if self.backlog:
+                item = self.backlog.popleft()
+            elif self.deferred and self.deferred[0][0] <= monotonic():
+                item = heapq.heappop(self.deferred)[2]
+            elif stopping:
+                if not self.deferred:
+                    self.queue.task_done()
+                    logger.info("loop stopping")
+                    break
+                await asyncio.sleep(self.deferred[0][0] - monotonic())
+                continue
+            elif self.pool is not None:
+                # Spare capacity goes to refilling the keyword pools. Poll
+                # so that pools emptied by keyword hits get noticed.
+                if self.queue.empty() and (refill := self._next_refill()):
+                    bot, keyword = refill
+                    await bot._refill_pool(keyword)
+                    await asyncio.sleep(self.settings.acrobot.throttle_interval)
+                    continue
+                try:
+                    item = await asyncio.wait_for(
+                        self.queue.get(), self._idle_wait(self.settings.pregen.idle_poll)
+                    )
+                except TimeoutError:
+                    continue
+            else:
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), self._idle_wait())
+                except TimeoutError:
+                    continue
+            logger.debug("task received: %s", item)
+            if item is None:
+                # requests held back by their chat's throttle still get run
+                stopping = True
+                continue
+            if (ready := self._ready_at(item)) > monotonic():
+                task = cast(PendingTask, item)
+                heapq.heappush(self.deferred, (ready, next(self.deferred_seq), task))
+                continue
+            if (
+                self.settings.batch.enabled
+                and isinstance(item, PendingTask)
+                and self._batchable(item, item)
+            ):
+                await self._prefetch_batch(item)
+            ids = (getattr(item, "chat_id", None), getattr(item, "update_id", None))
+            with tracing.resume(item), logs.bind(*ids):
+                with tracing.span("queue.task"):
+                    self.active = item
+                    await item()
+                    self.active = None
+                self._hold_chat(item)
+                if getattr(item, "prefetched", None) is None:
+                    with tracing.span("queue.throttle"):
+                        await asyncio.sleep(self.settings.acrobot.throttle_interval)
+            self.queue.task_done()
+
+    def _idle_wait(self, timeout: float | None = None) -> float | None:
+        """How long to wait for new requests: at most until the next deferred one is due."""
+        if not self.deferred:
+            return timeout
+        due = max(0.0, self.deferred[0][0] - monotonic())
+        return due if timeout is None else min(due, timeout)
+
+    def _ready_at(self, item: Callable) -> float:
+        """When item may run, going by its chat's throttle (see _hold_chat)."""
+        if not isinstance(item, PendingTask):
+            return 0.0
+        return self._peer(item.bot).chats.get(item.chat_id).not_before
+
+    def _hold_chat(self, item: Callable) -> None:
+        """
+        Holds back the next request from item's chat, if the chat has set a
+        throttle_interval of its own. Other chats are not held up: requests
+        that arrive early are set aside (self.deferred) until they are due.
+        """
+        if isinstance(item, PendingTask):
+            bot = self._peer(item.bot)
+            if "throttle_interval" in bot._overlay(item.chat_id):
+                bot.chats.get(item.chat_id).not_before = (
+                    monotonic() + bot._chat_throttle(item.chat_id)
+                )
+
+    def _batchable(self, item: Callable | None, first: PendingTask) -> bool:
+        """
+        Whether item can share a batch call with first (same bot and model,
+        and a model that can answer the batch prompt).
+        """
+        if not (
+            isinstance(item, PendingTask)
+            and item.prefetched is None
+            and item.bot == first.bot
+            and not self.usage.over_budget(item.chat_id)
+            and self._ready_at(item) <= monotonic()
+        ):
+            return False
+        bot = self._peer(first.bot)
+        model = bot._chat_model(first.chat_id)
+        if not model[1].supports_batch:
+            return False
+        return item is first or bot._chat_model(item.chat_id) == model
+
+    async def _prefetch_batch(self, first: PendingTask) -> None:
+        """
+        Collects the requests that arrive within batch.window seconds (up to
+        batch.max_words) and asks for all their acronyms in one model call.
+        The requests are moved to the backlog, in order, to be run as usual;
+        those answered by the batch call reply without calling the model or
+        waiting out the throttle interval again.
+        """
+        settings = self.settings.batch
+        batch = [first]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.window
+        while len(batch) < settings.max_words:
+            try:
+                item = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), deadline - loop.time())
+                except TimeoutError:
+                    break
+            self.backlog.append(item)
             if item is None:
-                self.queue.task_done()
-                logger.info("loop stopping")
                 break
-            await item()
+            if self._batchable(item, first):
+                batch.append(cast(PendingTask, item))
+        if len(batch) < 2:
+            return
+
+        bot = self._peer(first.bot)
+        config_name, llm, policy = bot._chat_model(first.chat_id)
+        requests = [(task.word, bot._convo(task.chat_id)) for task in batch]
+        with tracing.resume(first, "batch.wait"), tracing.span("queue.batch", words=len(batch)):
+            try:
+                results, usage = await get_acro_batch_async(
+                    llm, requests, policy, settings.prompt or BATCH_TEMPLATE
+                )
+            except Exception as e:
+                # not inside any handler, so nothing else would catch this
+                logger.warning(
+                    "batch of %d failed, running singly: %s: %s", len(batch), type(e).__name__, e
+                )
+                results, usage = [None] * len(batch), Usage()
+            n = len(batch)
+            share = Usage(usage.prompt_tokens // n, usage.completion_tokens // n, usage.reasoning_tokens // n)
+            for task, result in zip(batch, results):
+                self.usage.record(task.chat_id, config_name, share)
+                if result is not None:
+                    task.prefetched = result.expansion
+            logger.info("batch answered %d of %d", sum(r is not None for r in results), n)
             await asyncio.sleep(self.settings.acrobot.throttle_interval)
-            self.queue.task_done()
 
-    async def _generate_acro(self, word: str) -> str:
+    async def _summary_processor(self) -> None:
+        """
+        Refreshes chat summaries one at a time, waiting summary.interval
+        seconds between refreshes. Runs alongside the queue processor so
+        summaries never hold up acronym requests.
+        """
+        assert self.summarizer is not None
+        logger.info("summary processor started.")
+
+        while True:
+            chat_id = await self.summarizer.next_chat()
+            try:
+                await self.chats.prefetch(chat_id)
+                with logs.bind(chat_id):
+                    usage = await self.summarizer.refresh(self.chats.get(chat_id))
+                self.chats.update(chat_id)
+                self.usage.record(chat_id, str(self.settings.summary.config), usage)
+            except Exception as e:
+                logger.error(f"summary processor caught: {type(e).__name__}: {e}")
+            await asyncio.sleep(self.settings.summary.interval)
+
+    @property
+    def history(self) -> deque[tuple[str, str]]:
+        """History of updates that don't belong to any chat."""
+        return self.chats.get(None).history
+
+    def _history(self, chat_id: int | None) -> deque[tuple[str, str]]:
+        return self.chats.get(chat_id).history
+
+    def _convo(self, chat_id: int | None) -> str:
+        """The chat's conversation as it goes into the prompt."""
+        state = self.chats.get(chat_id)
+        if self.summarizer is not None:
+            return self.summarizer.convo(state)
+        return "\n".join(f"{u}: {m}" for u, m in state.history)
+
+    def _keywords(self, chat_id: int | None) -> frozenset[str] | set[str]:
+        """The chat's own keywords if it has changed them, else the bot's."""
+        keywords = self.chats.get(chat_id).keywords
+        return self.keywords if keywords is None else keywords
+
+    async def _generate_acro(
+        self, word: str, chat_id: int | None = None, kind: str = "acro"
+    ) -> str:
         """
         Forms the complete acronym prompt and gets the model's response.
         """
+        result = await self._generate_result(word, self._convo(chat_id), chat_id, kind=kind)
+        return result.expansion
 
-        convo = "\n".join(f"{u}: {m}" for u, m in self.history)
-        response, _ = await asyncio.to_thread(
-            get_acro,
-            model=self.llm,
-            word=word,
-            convo=convo,
-            retries=self.settings.model.retries,
+    async def _generate_result(
+        self,
+        word: str,
+        convo: str,
+        chat_id: Hashable = None,
+        config_name: str | None = None,
+        kind: str = "acro",
+    ) -> AcroResult:
+        """
+        Runs one request through the retry loop, with the given config block,
+        the chat's own (see command_set), the one picked by the router, or
+        else the bot's. Chats over their token budget are served by the
+        budget model, and API errors fall through to the fallback model.
+        Tokens are recorded against the config that spent them, whether or
+        not its attempt succeeded.
+        """
+        if (
+            config_name is None
+            and self.model_router is not None
+            and "use_config" not in self._overlay(chat_id)
+        ):
+            config_name = self.model_router.pick(word, kind, self.queue.qsize())
+        config_name, llm, policy = self._chat_model(chat_id, config_name)
+        if self.budget_llm is not None and self.usage.over_budget(chat_id):
+            config_name = self.settings.usage.budget_config or "LocalModel"
+            logger.info("chat %s is over budget, using %s", chat_id, config_name)
+            llm, policy = self.budget_llm, self.budget_policy
+        usage = Usage()
+        try:
+            try:
+                result = await get_acro_result_async(
+                    model=llm, word=word, convo=convo, policy=policy, usage=usage
+                )
+            finally:
+                self.usage.record(chat_id, config_name, usage)
+        except AcroError:
+            # the failure counts against the config that was picked, and the
+            # fallback's answer is not credited to it
+            if self.model_router is not None:
+                self.model_router.record(config_name, word, None)
+            if self.fallback_llm is None:
+                raise
+            fallback = self.settings.model.fallback or config_name
+            logger.warning("falling back to %s", fallback)
+            usage = Usage()
+            try:
+                return await get_acro_result_async(
+                    model=self.fallback_llm,
+                    word=word,
+                    convo=convo,
+                    policy=self.fallback_policy,
+                    usage=usage,
+                )
+            finally:
+                self.usage.record(chat_id, fallback, usage)
+        if self.model_router is not None:
+            self.model_router.record(config_name, word, result)
+        return result
+
+    def _config_model(self, config_name: str) -> tuple[Model, RetryPolicy]:
+        """The model and retry policy for a config block, built on first use."""
+        if config_name not in self.models:
+            self.models[config_name] = (
+                build_model(getattr(self.settings, config_name)),
+                RetryPolicy(**self.settings.retry_settings(config_name)),
+            )
+        return self.models[config_name]
+
+    def _used_configs(self) -> list[str]:
+        """Every config block the bots may send requests to."""
+        settings = self.settings
+        names: list[str | None] = [bot.config_name for bot in self.peers]
+        names.append(settings.model.fallback)
+        if settings.usage.chat_budget is not None:
+            names.append(settings.usage.budget_config)
+        if settings.summary.enabled:
+            names.append(settings.summary.config)
+        if settings.routing.enabled:
+            names.extend(rule.config for rule in settings.routing.rules)
+        return list(dict.fromkeys(name for name in names if name))
+
+    async def _probe(self) -> None:
+        """
+        Times a tiny request against each config block in use (or those in
+        probe.configs, plus the active ones), all at once. Configs that fail
+        are probed again every retry_interval seconds until they answer, so
+        the router can go back to them. Results are kept in self.probes and
+        passed to the router.
+        """
+        settings = self.settings.probe
+        active = [bot.config_name for bot in self.peers]
+        names = list(dict.fromkeys(active + (settings.configs or self._used_configs())))
+        try:
+            while names:
+                models = {}
+                for name in names:
+                    try:
+                        models[name] = self._config_model(name)[0]
+                    except (KeyError, ValueError) as e:
+                        self.probes[name] = ProbeResult(name, error=f"{type(e).__name__}: {e}")
+                with tracing.span("probe", configs=len(models)):
+                    self.probes.update(
+                        await probe_models(models, settings.prompt, settings.timeout)
+                    )
+                if self.model_router is not None:
+                    self.model_router.latency.update(
+                        {name: result.latency for name, result in self.probes.items()}
+                    )
+                self.probed.set()
+                # configs that could not be built are not retried
+                names = [name for name in models if not self.probes[name].ok]
+                if names:
+                    await asyncio.sleep(settings.retry_interval)
+        finally:
+            self.probed.set()
+
+    def is_ready(self) -> bool:
+        """
+        Whether every bot is serving and, with probe.enabled, every bot's
+        active config has answered its probe.
+        """
+        if not all(bot.serving for bot in self.peers):
+            return False
+        if not self.settings.probe.enabled:
+            return True
+        return all(
+            (result := self.probes.get(bot.config_name)) is not None and result.ok
+            for bot in self.peers
         )
-        return response
+
+    def _overlay(self, chat_id: Hashable) -> dict[str, Any]:
+        """The settings the chat has changed with /set."""
+        return self.chats.get(chat_id).overlay or {}
+
+    def _chat_model(
+        self, chat_id: Hashable, config_name: str | None = None
+    ) -> tuple[str, Model, RetryPolicy]:
+        """
+        The config block, model and retry policy for a chat's requests: the
+        given block, else the chat's use_config, else the bot's, with the
+        chat's retries if it has set them. Models come from the shared
+        registry, so a chat switching configs costs nothing to resolve.
+        """
+        overlay = self._overlay(chat_id)
+        config_name = config_name or overlay.get("use_config") or self.config_name
+        if config_name == self.config_name:
+            llm, policy = self.llm, self.retry_policy
+        else:
+            llm, policy = self._config_model(config_name)
+        if "retries" in overlay:
+            policy = replace(policy, format_retries=overlay["retries"])
+        return config_name, llm, policy
+
+    def _chat_throttle(self, chat_id: Hashable) -> float:
+        """
+        Seconds between the chat's own requests: its throttle_interval, if it
+        has set one, within the bot's throttle_interval and max_chat_throttle.
+        """
+        settings = self.settings.acrobot
+        interval = self._overlay(chat_id).get("throttle_interval", settings.throttle_interval)
+        return min(max(interval, settings.throttle_interval), settings.max_chat_throttle)
+
+    def _peer(self, name: str | None) -> "Acrobot":
+        """The peer bot with the given name."""
+        return next(bot for bot in self.peers if bot.name == name)
+
+    async def _refill_pool(self, keyword: str) -> None:
+        """
+        Generates one acronym for this bot's keyword pool with its own
+        config, without chat context.
+        After a failure, refills pause for pregen.idle_poll seconds, doubling
+        with each further failure up to pregen.max_backoff, so a model that
+        is down isn't called over and over.
+        """
+        assert self.pool is not None
+        usage = Usage()
+        try:
+            result = await get_acro_result_async(
+                model=self.llm, word=keyword, policy=self.retry_policy, usage=usage
+            )
+        except Exception as e:
+            delay = min(
+                self.settings.pregen.idle_poll * 2**self.refill_failures,
+                self.settings.pregen.max_backoff,
+            )
+            self.refill_failures += 1
+            self.refill_after = monotonic() + delay
+            logger.warning(
+                "pool refill failed, pausing refills for %gs: %s: %s",
+                delay,
+                type(e).__name__,
+                e,
+            )
+        else:
+            self.refill_failures = 0
+            if result.is_valid:
+                self.pool.add(keyword, result.expansion)
+        finally:
+            self.usage.record(None, self.config_name, usage)
+
+    def _next_refill(self) -> "tuple[Acrobot, str] | None":
+        """
+        The next bot and keyword to refill, taking the bots in turn and
+        skipping those whose refills are paused after failures.
+        """
+        for i in range(len(self.peers)):
+            bot = self.peers[(self.refill_turn + i) % len(self.peers)]
+            if (
+                bot.pool is not None
+                and bot.refill_after <= monotonic()
+                and (keyword := bot.pool.next_keyword())
+            ):
+                self.refill_turn = (self.refill_turn + i + 1) % len(self.peers)
+                return bot, keyword
+        return None
+
+    def _sync_pool(self) -> None:
+        """
+        Keeps one pool per keyword in use, by the bot or by any resident chat.
+        """
+        if self.pool is not None:
+            keywords: set[str] = set(self.keywords)
+            for _, state in self.chats.items():
+                keywords.update(state.keywords or ())
+            self.pool.sync(keywords)
 
     # === BOT TASKS ===
     # The following functions are tasks that arise from command requests and
     # which get added to the processing queue for execution.
 
-    async def _keyword_task(self, update: Update, word: str) -> None:
+    async def _keyword_task(
+        self, update: Update, word: str, prefetched: str | None = None
+    ) -> None:
         """
         Form the bot's reply to a keyword hit.
         """
 
         if update.message:
             try:
-                response = await self._generate_acro(word)
+                response = prefetched or await self._generate_acro(
+                    word, chat_id_of(update), "keyword"
+                )
             except AcroError as e:
-                await update.message.reply_text(e(), do_quote=True)
+                await self._reply(update.message, e(), do_quote=True)
             except Exception as e:
-                logger.error(f"caught: {type(e).__name__}: {e}", exc_info=False)
-                await update.message.reply_text(
-                    "dammit, you broke something!", do_quote=True
+                logger.error("caught: %s: %s", type(e).__name__, e, exc_info=False)
+                await self._reply(
+                    update.message, "dammit, you broke something!", do_quote=True
                 )
             else:
-                await update.message.reply_text(
-                    f"{word}? Who said {word}!?\n" + response, do_quote=False
+                await self._reply(
+                    update.message, keyword_reply(word, response), do_quote=False
                 )
 
-    async def _acro_task(self, update: Update, word: str) -> None:
+    async def _acro_task(
+        self, update: Update, word: str, prefetched: str | None = None
+    ) -> None:
         """
         Form the bot's reply to an acronym request.
         """
 
         if update.message:
             try:
-                response = await self._generate_acro(word)
+                response = prefetched or await self._generate_acro(word, chat_id_of(update))
             except AcroError as e:
-                await update.message.reply_text(e(), do_quote=True)
+                await self._reply(update.message, e(), do_quote=True)
             except Exception as e:
-                logger.error(f"caught: {type(e).__name__}: {e}", exc_info=False)
-                await update.message.reply_text(
-                    "dammit, you broke something!", do_quote=True
+                logger.error("caught: %s: %s", type(e).__name__, e, exc_info=False)
+                await self._reply(
+                    update.message, "dammit, you broke something!", do_quote=True
                 )
             else:
-                await update.message.reply_text(response, do_quote=True)
+                await self._reply(update.message, response, do_quote=True)
+
+    def _pending(
+        self, update: Update, word: str, kind: Literal["acro", "keyword"]
+    ) -> PendingTask:
+        """Wraps an acronym request for the queue."""
+        handler = self._acro_task if kind == "acro" else self._keyword_task
+        task = PendingTask(
+            chat_id_of(update),
+            update.message.message_id if update.message else None,
+            word,
+            kind,
+            update_id=update.update_id,
+            bot=self.name,
+        )
+        task.run = lambda: handler(update, word, task.prefetched)
+        return task
+
+    def _restore_pending(self) -> None:
+        """
+        Queues the requests saved by the last shutdown, if still fresh, each
+        for the peer bot that received it.
+        """
+        path = self.settings.acrobot.pending_path
+        if path is None:
+            return
+        bots = {bot.name: bot for bot in self.peers}
+        for saved in load_pending(path, self.settings.acrobot.pending_ttl):
+            bot = bots.get(saved.bot)
+            if bot is None or saved.chat_id is None or saved.message_id is None:
+                continue
+            # just enough of the original update to reply to it
+            message = Message(
+                saved.message_id, datetime.now(UTC), Chat(saved.chat_id, Chat.GROUP)
+            )
+            if hasattr(bot, "telegram_app"):
+                message.set_bot(bot.telegram_app.bot)
+            update = Update(saved.update_id or 0, message=message)
+            task = bot._pending(update, saved.word, saved.kind)
+            task.enqueued = saved.enqueued
+            self.queue.put_nowait(task)
+
+    def _save_pending(self) -> None:
+        """
+        Stops the queue processor and saves the request it was working on,
+        along with everything still queued, to pending_path. API requests
+        can't be saved, so they fail with SHUTDOWN_ERROR, and replies still
+        waiting in the sender are logged as lost.
+        """
+        if task_qp := getattr(self, "task_qp", None):
+            task_qp.cancel()
+        for future in self.api_waiting:
+            if not future.done():
+                future.set_exception(AcroError(SHUTDOWN_ERROR))
+        if unsent := self.sender.pending():
+            logger.warning(
+                "drain deadline passed, dropping %d unsent replies in %d chats",
+                unsent,
+                len(self.sender.lanes),
+            )
+        pending = [self.active] if isinstance(self.active, PendingTask) else []
+        pending += [item for item in self.backlog if isinstance(item, PendingTask)]
+        pending += [item for _, _, item in sorted(self.deferred, key=lambda d: d[:2])]
+        self.backlog.clear()
+        self.deferred.clear()
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            self.queue.task_done()
+            if isinstance(item, PendingTask):
+                pending.append(item)
+        if not pending:
+            return
+        path = self.settings.acrobot.pending_path
+        if path is None:
+            logger.warning(f"drain deadline passed, dropping {len(pending)} requests")
+        else:
+            saved = save_pending(path, pending)
+            logger.warning(f"drain deadline passed, saved {saved} requests to {path}")
+
+    async def _reply(self, message: Message, text: str, do_quote: bool) -> None:
+        """
+        Hands the result of a queued task to the reply sender, so the queue
+        doesn't wait on Telegram.
+        """
+        self.sender.send(
+            message.chat_id, lambda: message.reply_text(text, do_quote=do_quote)
+        )
 
     # === COMMAND HANDLERS ===
     # These are the callback functions that get invoked when the associated
@@ -179,11 +1005,36 @@ class Acrobot:
         """
         Relays info about the self of the bot.
         """
-        logger.info("\n--CHAT HISTORY--\n" + "\n".join(f"{u}: {m}" for u, m in self.history))
-        logger.info(f"\n--SETTINGS--\n{self.settings}")
+        chat_id = chat_id_of(update)
+        usage = self.usage.summary(chat_id)
+        chat_settings = self._chat_settings(chat_id)
+        if logger.isEnabledFor(logging.INFO):
+            history = "\n".join(f"{u}: {m}" for u, m in self._history(chat_id))
+            logger.info("\n--CHAT HISTORY--\n%s", history)
+            logger.info("\n--CHAT SETTINGS--\n%s", chat_settings)
+            logger.info("\n--SETTINGS--\n%s", self.settings)
+            logger.info("\n--REPLIES--\n%s", self.sender.stats)
+            if self.peers[0].monitor is not None:
+                logger.info("\n--EVENT LOOP--\n%s", self.peers[0].monitor)
+            logger.info("\n--EXECUTORS--\n%s", executors.summary())
+            if self.probes:
+                logger.info("\n--PROBES--\n%s", "\n".join(map(str, self.probes.values())))
+            logger.info("\n--CHATS--\n%s", self.chats)
+            if self.pool is not None:
+                logger.info("\n--KEYWORD POOL--\n%s", self.pool)
+            logger.info("\n--REPAIRS--\n%s", repair_stats)
+            if self.model_router is not None:
+                logger.info("\n--ROUTING--\n%s", self.model_router)
+            if self.summarizer is not None:
+                summary = self.chats.get(chat_id).summary
+                logger.info("\n--SUMMARY--\n%s\n(%s)", summary, self.summarizer)
+            logger.info("\n--TOKEN USAGE--\n%s", usage)
 
         if update.message:
-            await update.message.reply_text(f"--SETTINGS--\n{self.settings}")
+            await update.message.reply_text(
+                f"--CHAT SETTINGS--\n{chat_settings}\n\n--SETTINGS--\n{self.settings}"
+                f"\n\n--TOKEN USAGE--\n{usage}"
+            )
 
 
     async def command_add_keywords(
@@ -197,17 +1048,25 @@ class Acrobot:
             if context.args is None or len(context.args) < 1:
                 await update.message.reply_text("Usage: /add_keyword kw1 kw2 kw3 ...")
             else:
-                self._add_keywords(context.args)
+                self._add_keywords(context.args, chat_id_of(update))
                 await update.message.reply_text("keywords added.", do_quote=True)
 
-    def _add_keywords(self, keyword_list: list[str]) -> None:
+    def _add_keywords(self, keyword_list: list[str], chat_id: int | None = None) -> None:
         """
-        Helper function for adding new keywords. We use a reassignment
+        Helper function for adding new keywords, to the chat's own trigger
+        list or (chat_id None) to the bot's. We use a reassignment
         technique rather than in-place assignment in order to trigger a
         descriptor update.
         """
         if keyword_list is not None:
-            self.keywords = self.keywords.union(keyword_list)
+            if chat_id is None:
+                self.keywords = self.keywords.union(keyword_list)
+            else:
+                self.chats.get(chat_id).keywords = frozenset(
+                    self._keywords(chat_id)
+                ).union(keyword_list)
+                self.chats.update(chat_id)
+            self._sync_pool()
 
     async def command_del_keywords(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -220,17 +1079,25 @@ class Acrobot:
             if update.message:
                 await update.message.reply_text("Usage: /del_keyword kw1 kw2 kw3 ...")
             return
-        self._del_keywords(context.args)
+        self._del_keywords(context.args, chat_id_of(update))
 
-    def _del_keywords(self, keyword_list: list[str]) -> None:
+    def _del_keywords(self, keyword_list: list[str], chat_id: int | None = None) -> None:
         """
-        Helper function for removing keywords. We use a reassignment
+        Helper function for removing keywords, from the chat's own trigger
+        list or (chat_id None) from the bot's. We use a reassignment
         technique rather than in-place assignment in order to trigger a
         descriptor update.
         """
 
         if keyword_list is not None:
-            self.keywords = self.keywords.difference(keyword_list)
+            if chat_id is None:
+                self.keywords = self.keywords.difference(keyword_list)
+            else:
+                self.chats.get(chat_id).keywords = frozenset(
+                    self._keywords(chat_id)
+                ).difference(keyword_list)
+                self.chats.update(chat_id)
+            self._sync_pool()
 
     async def command_add_message(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -246,7 +1113,7 @@ class Acrobot:
                 )
             else:
                 username, message = context.args[0], " ".join(context.args[1:])
-                self._update_history(username, message)
+                self._update_history(username, message, chat_id_of(update))
                 await update.message.reply_text("Message added.", do_quote=True)
 
     async def command_acro(
@@ -264,43 +1131,90 @@ class Acrobot:
                 word = context.args[0]
             else:
                 flat_history = [
-                    word for user, msg in self.history for word in (user, *msg.split())
+                    word
+                    for user, msg in self._history(chat_id_of(update))
+                    for word in (user, *msg.split())
                 ]
                 word = random.choice(flat_history) if flat_history else ""
 
-            word = "".join(char for char in word if char.isalpha())[
-                : self.settings.acrobot.max_word_length
-            ]
+            word = clean_word(word, self.settings.acrobot.max_word_length)
 
             if word:
-                await self.queue.put(lambda: self._acro_task(update, word))
+                with tracing.trace("command.acro", word=word):
+                    await self.queue.put(tracing.carry(self._pending(update, word, "acro")))
             else:
                 await update.message.reply_text("Not allowed boyo!", do_quote=True)
                 
     async def command_set(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """
-        Updates the LLM model with a new config.
-        usage: /set config_name
-        config_name must be a valid config block listed config.yaml.
+        Changes this chat's settings, leaving other chats on the bot's.
+        usage: /set config_name | throttle_interval SECONDS | retries N | reset
+        config_name must be a valid config block listed config.yaml. Models
+        are built once and shared, so switching back and forth is cheap.
         """
-        
-        if update.message:
-            if context.args:
-                try:
-                    new_config = getattr(self.settings, context.args[0])
-                except AttributeError as e:
-                    logger.error(f"command_set failed: {e}")
-                    await update.message.reply_text(f"Could not find {context.args[0]}")                    
-                else:
-                    try:
-                        self.llm = build_model(new_config)
-                    except KeyError as e:
-                        logger.error(f"command_set failed: {e}")
-                        await update.message.reply_text(f"Invalid setting in {context.args[0]}")
-                    else:
-                        await update.message.reply_text("Model config updated.")
-                        logger.info(f"llm config set to {context.args[0]}")
-                
+
+        if not update.message:
+            return
+        args = context.args or []
+        chat_id = chat_id_of(update)
+        state = self.chats.get(chat_id)
+        overlay = dict(state.overlay or {})
+        if not args:
+            await update.message.reply_text(
+                "Usage: /set config_name | throttle_interval SECONDS | retries N | reset"
+            )
+            return
+        if args[0] == "reset":
+            overlay.clear()
+            reply = "Chat settings reset."
+        elif len(args) == 2 and args[0] in ("throttle_interval", "retries"):
+            try:
+                value = float(args[1]) if args[0] == "throttle_interval" else int(args[1])
+                if value < 0 or not math.isfinite(value):
+                    raise ValueError(f"{args[0]} must be a number >= 0")
+            except ValueError as e:
+                logger.error("command_set failed: %s", e)
+                await update.message.reply_text(f"Invalid value for {args[0]}")
+                return
+            if args[0] == "throttle_interval":
+                # chats may slow themselves down, but not below the bot's rate limit
+                acrobot = self.settings.acrobot
+                value = min(max(value, acrobot.throttle_interval), acrobot.max_chat_throttle)
+            overlay[args[0]] = value
+            reply = f"{args[0]} set to {value:g}."
+        elif args[0] not in (self.settings.model_extra or {}):
+            logger.error("command_set failed: no config block %s", args[0])
+            await update.message.reply_text(f"Could not find {args[0]}")
+            return
+        else:
+            try:
+                self._config_model(args[0])
+            except (KeyError, ValueError) as e:
+                logger.error("command_set failed: %s", e)
+                await update.message.reply_text(f"Invalid setting in {args[0]}")
+                return
+            if args[0] == self.config_name:
+                overlay.pop("use_config", None)
+            else:
+                overlay["use_config"] = args[0]
+            reply = "Model config updated."
+        state.overlay = overlay or None
+        self.chats.update(chat_id)
+        logger.info("chat %s settings: %s", chat_id, overlay)
+        await update.message.reply_text(reply)
+
+    def _chat_settings(self, chat_id: Hashable) -> str:
+        """The settings in effect for a chat, marking those it has set itself."""
+        overlay = self._overlay(chat_id)
+        config_name, _, policy = self._chat_model(chat_id)
+        settings = {
+            "use_config": config_name,
+            "throttle_interval": self._chat_throttle(chat_id),
+            "retries": policy.format_retries,
+        }
+        return "\n".join(
+            f"{k}: {v}" + (" (this chat)" if k in overlay else "") for k, v in settings.items()
+        )
 
     # === MESSAGE HANDLER ===
     # General-purpose chat message handler.
@@ -319,20 +1233,45 @@ class Acrobot:
         message = update.message.text
 
         if message:
-            self._update_history(sender, message)
-            found = match_words(message, self.keywords)
+            chat_id = chat_id_of(update)
+            self._update_history(sender, message, chat_id)
+            found = match_words(message, self._keywords(chat_id))
             if len(found) > 0:
-                await self.queue.put(
-                    lambda: self._keyword_task(update, random.choice(found))
-                )
+                word = random.choice(found)
+                with tracing.trace("handle_message", keywords=len(found)):
+                    pooled = self._take_pooled(word, chat_id)
+                    if pooled is not None:
+                        await self._reply(
+                            update.message, keyword_reply(word, pooled), do_quote=False
+                        )
+                    else:
+                        await self.queue.put(
+                            tracing.carry(self._pending(update, word, "keyword"))
+                        )
 
-    def _update_history(self, sender: str, message: str) -> None:
+    def _take_pooled(self, word: str, chat_id: int | None) -> str | None:
+        """
+        Returns a pre-generated acronym for the keyword, if one is available.
+        """
+        if self.pool is None:
+            return None
+        context: list[str] = []
+        if self.settings.pregen.context_aware:
+            context = [w for _, m in self._history(chat_id) for w in m.split()]
+        return self.pool.take(word, context)
+
+    def _update_history(
+        self, sender: str, message: str, chat_id: int | None = None
+    ) -> None:
         """
         Helper function for manually adding a message to the conversation
         history.
         """
-        self.history.append((sender, message))
-        self.history = self.history[-self.settings.acrobot.max_history :]
+        state = self.chats.get(chat_id)
+        state.add_message(sender, message)
+        if self.summarizer is not None:
+            self.summarizer.note(chat_id, state)
+        self.chats.update(chat_id)
 
     def start(self, run_polling: bool = False) -> None:
         """
@@ -341,7 +1280,15 @@ class Acrobot:
         """
 
         async def go() -> None:
+            self._restore_pending()
             self.task_qp = asyncio.create_task(self._queue_processor())
+            if self.settings.probe.enabled:
+                self.task_probe = asyncio.create_task(self._probe())
+            if self.monitor is not None:
+                self.task_monitor = asyncio.create_task(self.monitor.run())
+            for bot in self.peers:
+                if bot.summarizer is not None:
+                    bot.task_summary = asyncio.create_task(bot._summary_processor())
 
         try:
             loop = asyncio.get_event_loop()
@@ -354,16 +1301,114 @@ class Acrobot:
         self.task_go = loop.create_task(go())
 
         if run_polling:
-            self.telegram_app.run_polling()  # this will block
+            self.telegram_app.run_polling(
+                timeout=self.settings.acrobot.poll_timeout
+            )  # this will block
+
+    async def _prefetch_chat(self, update: Update, _: Any) -> None:
+        """Loads a spilled chat before the update's handler runs."""
+        await self.chats.prefetch(chat_id_of(update))
+
+    async def _post_stop(self, _: Any) -> None:
+        await self.complete(True)
+
+    async def webhook_handler(self, request: Request) -> Response:
+        """Processes incoming Telegram updates from the webhook."""
+        with tracing.trace("webhook"):
+            json_string = await request.json()
+            update = Update.de_json(json_string, self.telegram_app.bot)
+            with logs.bind(chat_id_of(update), update.update_id):
+                await self.telegram_app.process_update(update)
+        return Response(status_code=HTTPStatus.OK)
+
+    async def raw_webhook(self, receive: Receive, send: Send) -> None:
+        """
+        webhook_handler as a bare ASGI app (see server.fast_path): the update
+        is read and handled without going through FastAPI's routing,
+        dependency resolution and Request/Response objects.
+        """
+        body = b""
+        more = True
+        while more:
+            message = await receive()
+            body += message.get("body", b"")
+            more = message.get("more_body", False)
+        status = HTTPStatus.OK
+        with tracing.trace("webhook"):
+            try:
+                update = Update.de_json(json.loads(body), self.telegram_app.bot)
+            except ValueError as e:
+                logger.warning(f"bad webhook request: {e}")
+                status = HTTPStatus.BAD_REQUEST
+            else:
+                with logs.bind(chat_id_of(update), update.update_id):
+                    await self.telegram_app.process_update(update)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(b"content-length", b"0")],
+            }
+        )
+        await send({"type": "http.response.body", "body": b""})
+
+    async def healthz_handler(self) -> Response:
+        """Liveness: the process answers and its queue processor is running."""
+        task = getattr(self.peers[0], "task_qp", None)
+        if task is not None and task.done():
+            return JSONResponse({"status": "stopped"}, HTTPStatus.SERVICE_UNAVAILABLE)
+        return JSONResponse({"status": "ok"})
+
+    async def readyz_handler(self) -> Response:
+        """Readiness (see is_ready), along with the probe results so far."""
+        ready = self.is_ready()
+        return JSONResponse(
+            {
+                "ready": ready,
+                "probes": {name: result.to_dict() for name, result in self.probes.items()},
+            },
+            HTTPStatus.OK if ready else HTTPStatus.SERVICE_UNAVAILABLE,
+        )
 
     async def complete(self, stop) -> None:
         """
         Waits for any queued tasks to finish and optionally terminates the
-        event loop.
+        event loop. When stopping, waits at most drain_deadline seconds, after
+        which the remaining requests are saved for the next start.
         """
+        deadline = self.settings.acrobot.drain_deadline if stop else None
         if stop:
             await self.queue.put(None)
-        await self.queue.join()
+        try:
+            async with asyncio.timeout(deadline):
+                await self.queue.join()
+                await self.sender.join()
+        except TimeoutError:
+            self._save_pending()
+        tracing.tracer.flush()
+        self.usage.flush()
+        if stop:
+            for name in ("task_monitor", "task_probe"):
+                if task := getattr(self, name, None):
+                    task.cancel()
+            for bot in self.peers:
+                if task := getattr(bot, "task_summary", None):
+                    task.cancel()
+                await bot.chats.flush()
+
+
+class AcroRequest(BaseModel):
+    """
+    Body of a POST /v1/acro request: a word or a list of words, with
+    optional conversation context and config block to use instead of the
+    current one. With stream set, results are sent as NDJSON as they finish.
+    """
+
+    words: str | list[str]
+    context: str = ""
+    config: str | None = None
+    stream: bool = False
+    model_config = ConfigDict(extra="forbid")
 
 
 # ************************************************************
@@ -374,13 +1419,34 @@ class Acrobot:
 # issued from telegram to the webhook URL address.
 # ************************************************************
 class Acrowebhook(Acrobot, FastAPI):
-    def __init__(self, webhook_url: str | None = None) -> None:
-        Acrobot.__init__(self)
+    def __init__(
+        self, webhook_url: str | None = None, settings: Config | None = None
+    ) -> None:
+        if settings is None:
+            Acrobot.__init__(self)
+        else:
+            Acrobot.__init__(self, settings)
         self.webhook_url = webhook_url
         FastAPI.__init__(self, lifespan=self.lifespan)
         router = APIRouter()
         router.add_api_route("/", self.webhook_handler, methods=["POST"])
+        router.add_api_route("/healthz", self.healthz_handler, methods=["GET"])
+        router.add_api_route("/readyz", self.readyz_handler, methods=["GET"])
+        if self.settings.api.enabled:
+            router.add_api_route("/v1/acro", self.acro_handler, methods=["POST"])
         self.include_router(router)
+        self.api_slots = asyncio.Semaphore(self.settings.api.max_concurrent)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            self.settings.server.fast_path
+            and scope["type"] == "http"
+            and scope["method"] == "POST"
+            and scope["path"] == "/"
+        ):
+            await self.raw_webhook(receive, send)
+        else:
+            await FastAPI.__call__(self, scope, receive, send)
 
     @asynccontextmanager
     async def lifespan(self, _: FastAPI) -> AsyncIterator[None]:
@@ -390,16 +1456,187 @@ class Acrowebhook(Acrobot, FastAPI):
             await self.telegram_app.bot.setWebhook(self.webhook_url)
         async with self.telegram_app:
             await self.telegram_app.start()
+            self.serving = True
             yield
+            self.serving = False
             await self.telegram_app.stop()
             await self.complete(True)
 
-    async def webhook_handler(self, request: Request) -> Response:
-        """Processes incoming Telegram updates from the webhook."""
-        json_string = await request.json()
-        update = Update.de_json(json_string, self.telegram_app.bot)
-        await self.telegram_app.process_update(update)
-        return Response(status_code=HTTPStatus.OK)
+    async def acro_handler(self, body: AcroRequest, request: Request) -> Response:
+        """
+        Generates acronyms for the words in the request. Each word goes
+        through the same queue (and so rate limit), keyword pool and retry
+        loop as chat requests, at most api.max_concurrent at a time.
+        """
+        api = self.settings.api
+        if api.token is not None:
+            expected = f"Bearer {os.environ.get(api.token, '')}"
+            given = request.headers.get("authorization", "")
+            if not hmac.compare_digest(given.encode(), expected.encode()):
+                raise HTTPException(HTTPStatus.UNAUTHORIZED, "invalid token")
+        words = [body.words] if isinstance(body.words, str) else body.words
+        if not words:
+            raise HTTPException(HTTPStatus.UNPROCESSABLE_ENTITY, "no words given")
+        if len(words) > api.max_batch:
+            raise HTTPException(
+                HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"at most {api.max_batch} words"
+            )
+        if body.config is not None:
+            if body.config not in (self.settings.model_extra or {}):
+                raise HTTPException(HTTPStatus.NOT_FOUND, f"no config {body.config}")
+            try:
+                self._config_model(body.config)
+            except (KeyError, ValueError) as e:
+                logger.error(f"api config {body.config} failed: {e}")
+                raise HTTPException(
+                    HTTPStatus.UNPROCESSABLE_ENTITY, f"invalid setting in {body.config}"
+                )
+
+        with tracing.trace("api.acro", words=len(words)):
+            tasks = [
+                asyncio.create_task(self._api_result(i, w, body.context, body.config))
+                for i, w in enumerate(words)
+            ]
+        if not body.stream:
+            rows = await asyncio.gather(*tasks)
+            unavailable = any(row["error"] == SHUTDOWN_ERROR for row in rows)
+            return JSONResponse(
+                {"results": rows},
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE if unavailable else HTTPStatus.OK,
+            )
+
+        async def lines() -> AsyncIterator[str]:
+            for done in asyncio.as_completed(tasks):
+                yield json.dumps(await done) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    async def _api_result(
+        self, index: int, word: str, context: str, config_name: str | None
+    ) -> dict[str, Any]:
+        """
+        One word of an API request. Words without context or config that
+        have a pooled acronym are answered from the pool (cached: true).
+        """
+        start = perf_counter()
+        row: dict[str, Any] = {
+            "index": index,
+            "word": word,
+            "expansion": None,
+            "is_valid": False,
+            "attempts": 0,
+            "cached": False,
+            "error": None,
+        }
+        clean = clean_word(word, self.settings.acrobot.max_word_length)
+        async with self.api_slots:
+            pooled = None
+            if (
+                self.pool is not None
+                and not context
+                and config_name is None
+                and clean.lower() in self.pool.pools
+            ):
+                pooled = self.pool.take(clean)
+            if not clean:
+                row["error"] = "not a word"
+            elif pooled is not None:
+                row.update(expansion=pooled, is_valid=True, cached=True)
+            else:
+                future: asyncio.Future[AcroResult] = asyncio.get_running_loop().create_future()
+
+                async def run() -> None:
+                    try:
+                        result = await self._generate_result(
+                            clean, context, "api", config_name, kind="api"
+                        )
+                    except Exception as e:
+                        if not future.done():
+                            future.set_exception(e)
+                    else:
+                        # the API request may have been cancelled meanwhile
+                        if not future.done():
+                            future.set_result(result)
+
+                self.api_waiting.add(future)
+                await self.queue.put(tracing.carry(run))
+                try:
+                    result = await future
+                except AcroError as e:
+                    row["error"] = str(e)
+                except Exception as e:
+                    logger.error("api word %d failed: %s: %s", index, type(e).__name__, e)
+                    row["error"] = "internal error"
+                else:
+                    row.update(
+                        expansion=result.expansion,
+                        is_valid=result.is_valid,
+                        attempts=result.attempts,
+                    )
+                finally:
+                    self.api_waiting.discard(future)
+        row["elapsed"] = round(perf_counter() - start, 4)
+        return row
+
+
+# ************************************************************
+# MULTI-BOT HOST
+# -----------------------------------------------------------
+# Serves every bot listed under 'bots' in the config from one
+# process, each bot's webhook under its own path (/<name>).
+# ************************************************************
+class Acrohost(FastAPI):
+    def __init__(self, base_url: str | None = None, settings: Config | None = None) -> None:
+        """
+        Each bot has its own telegram app, chats and keywords (see
+        Config.for_bot). They share one queue and rate limit, reply sender,
+        model registry and usage ledger, kept by the first bot.
+        With base_url, each bot's webhook is set to base_url/<name>.
+        """
+        settings = Config.model_validate(settings or get_settings())
+        if not settings.bots:
+            raise ValueError("Acrohost needs at least one bot under 'bots'!")
+        self.bots: dict[str, Acrobot] = {}
+        host: Acrobot | None = None
+        for name in settings.bots:
+            bot = Acrobot(settings.for_bot(name), shared=host, name=name)
+            host = host or bot
+            self.bots[name] = bot
+        self.primary = host
+        self.base_url = base_url
+        FastAPI.__init__(self, lifespan=self.lifespan)
+        router = APIRouter()
+        assert host is not None
+        router.add_api_route("/healthz", host.healthz_handler, methods=["GET"])
+        router.add_api_route("/readyz", host.readyz_handler, methods=["GET"])
+        for name, bot in self.bots.items():
+            router.add_api_route(f"/{name}", bot.webhook_handler, methods=["POST"])
+        self.include_router(router)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        bot = self.bots.get(scope["path"][1:]) if scope["type"] == "http" else None
+        if bot is not None and bot.settings.server.fast_path and scope["method"] == "POST":
+            await bot.raw_webhook(receive, send)
+        else:
+            await FastAPI.__call__(self, scope, receive, send)
+
+    @asynccontextmanager
+    async def lifespan(self, _: FastAPI) -> AsyncIterator[None]:
+        """Starts every bot's telegram app around the shared queue."""
+        assert self.primary is not None
+        self.primary.start(False)
+        async with AsyncExitStack() as stack:
+            for name, bot in self.bots.items():
+                if self.base_url:
+                    await bot.telegram_app.bot.setWebhook(f"{self.base_url.rstrip('/')}/{name}")
+                await stack.enter_async_context(bot.telegram_app)
+                await bot.telegram_app.start()
+                bot.serving = True
+            yield
+            for bot in self.bots.values():
+                bot.serving = False
+                await bot.telegram_app.stop()
+            await self.primary.complete(True)
 
 
 if __name__ == "__main__":
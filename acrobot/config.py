@@ -8,11 +8,13 @@ import os
 import logging
 import pathlib
 import requests
-from typing import Any, Dict, Self
+from typing import Any, Dict, Literal, Self
 
 import yaml
 from pydantic import BaseModel, ConfigDict, Field, model_validator
 
+from acrobot import logs
+
 DEFAULT_PATH = str(pathlib.Path(__file__).parent / "config.yaml")
 
 logger = logging.getLogger(__name__)
@@ -32,7 +34,19 @@ class Acrobot(BaseModel):
     max_history: int = Field(default=5, ge=0)
     max_word_length: int = Field(default=12, ge=1)
     throttle_interval: int = Field(default=5, ge=0)
+    max_chat_throttle: float = Field(default=300, ge=0)
     keywords: set[str] = set()
+    api_base_url: str | None = None
+    max_state_bytes: int = Field(default=16_000_000, ge=0)
+    state_path: str | None = None
+    reply_workers: int = Field(default=8, ge=1)
+    reply_attempts: int = Field(default=3, ge=1)
+    concurrent_updates: int = Field(default=8, ge=1)
+    poll_timeout: int = Field(default=10, ge=0)
+    poll_limit: int = Field(default=100, ge=1, le=100)
+    drain_deadline: float | None = Field(default=30, ge=0)
+    pending_path: str | None = None
+    pending_ttl: float = Field(default=600, gt=0)
     model_config = ConfigDict(extra="forbid")
 
 class Prompt(BaseModel):
@@ -43,11 +57,29 @@ class Prompt(BaseModel):
     model_config = ConfigDict(extra="forbid")
 
 
+class Retry(BaseModel):
+    """Retry policy config class."""
+
+    format_retries: int | None = Field(default=None, ge=0)
+    error_retries: int = Field(default=0, ge=0)
+    base_delay: float = Field(default=1.0, ge=0)
+    multiplier: float = Field(default=2.0, ge=1)
+    max_delay: float = Field(default=8.0, ge=0)
+    jitter: float = Field(default=0.1, ge=0, le=1)
+    deadline: float | None = Field(default=None, gt=0)
+    repair: bool = True
+    repair_edits: int = Field(default=2, ge=0)
+    rank: bool = False
+    model_config = ConfigDict(extra="forbid")
+
+
 class Model(BaseModel):
     """Model config class."""
 
     use_config: str
     retries: int = Field(default=0, ge=0)
+    retry: Retry = Retry()
+    fallback: str | None = None
     model_config = ConfigDict(extra="forbid")
 
 
@@ -55,6 +87,156 @@ class Logging(BaseModel):
     """Logging config class."""
 
     level: str = "INFO"
+    format: Literal["text", "json"] = "text"
+    queue: bool = True
+    sample: dict[str, float] = {}
+    model_config = ConfigDict(extra="forbid")
+
+
+class Tracing(BaseModel):
+    """Tracing config class."""
+
+    enabled: bool = False
+    sample_rate: float = Field(default=1.0, ge=0, le=1)
+    path: str = "traces.jsonl"
+    batch_size: int = Field(default=64, ge=1)
+    model_config = ConfigDict(extra="forbid")
+
+
+class Pregen(BaseModel):
+    """Keyword pre-generation config class."""
+
+    enabled: bool = False
+    pool_size: int = Field(default=3, ge=1)
+    ttl: float = Field(default=3600, gt=0)
+    priority: Literal["emptiest", "popular"] = "emptiest"
+    context_aware: bool = True
+    idle_poll: float = Field(default=1.0, gt=0)
+    max_backoff: float = Field(default=300, gt=0)
+    model_config = ConfigDict(extra="forbid")
+
+
+class Summary(BaseModel):
+    """Rolling conversation summary config class."""
+
+    enabled: bool = False
+    config: str | None = None
+    every: int = Field(default=5, ge=1)
+    recent: int = Field(default=2, ge=0)
+    interval: float = Field(default=5, ge=0)
+    prompt: str | None = None
+    model_config = ConfigDict(extra="forbid")
+
+
+class Ledger(BaseModel):
+    """Token usage accounting config class (see acrobot.usage.UsageLedger)."""
+
+    window: float = Field(default=3600, gt=0)
+    retention: int = Field(default=24, ge=1)
+    chat_budget: int | None = Field(default=None, ge=0)
+    budget_config: str | None = None
+    path: str | None = None
+    flush_interval: float = Field(default=60, ge=0)
+    model_config = ConfigDict(extra="forbid")
+
+
+class Api(BaseModel):
+    """HTTP acronym API config class."""
+
+    enabled: bool = False
+    token: str | None = None
+    max_batch: int = Field(default=20, ge=1)
+    max_concurrent: int = Field(default=4, ge=1)
+    model_config = ConfigDict(extra="forbid")
+
+
+class Executor(BaseModel):
+    """Per-provider executor config class (see acrobot.executors)."""
+
+    workers: int = Field(default=8, ge=1)
+    max_queue: int = Field(default=16, ge=0)
+    on_full: Literal["reject", "wait"] = "reject"
+    model_config = ConfigDict(extra="forbid")
+
+
+class Monitor(BaseModel):
+    """Event loop monitor config class."""
+
+    enabled: bool = True
+    interval: float = Field(default=0.5, gt=0)
+    threshold: float = Field(default=0.1, gt=0)
+    workers: int | None = Field(default=None, ge=1)
+    model_config = ConfigDict(extra="forbid")
+
+
+class Server(BaseModel):
+    """Webhook server (uvicorn) config class."""
+
+    loop: Literal["auto", "asyncio", "uvloop"] = "auto"
+    http: Literal["auto", "h11", "httptools"] = "auto"
+    backlog: int = Field(default=2048, ge=1)
+    timeout_keep_alive: int = Field(default=5, ge=0)
+    limit_concurrency: int | None = Field(default=None, ge=1)
+    access_log: bool = True
+    fast_path: bool = False
+    model_config = ConfigDict(extra="forbid")
+
+    def uvicorn_options(self) -> dict[str, Any]:
+        """Keyword arguments for uvicorn.run / uvicorn.Config."""
+        return self.model_dump(exclude={"fast_path"})
+
+
+class Probe(BaseModel):
+    """Startup probe config class (see acrobot.probe)."""
+
+    enabled: bool = False
+    configs: list[str] | None = None
+    prompt: str = "Reply with the single word OK."
+    timeout: float = Field(default=10.0, gt=0)
+    retry_interval: float = Field(default=30.0, gt=0)
+    model_config = ConfigDict(extra="forbid")
+
+
+class Batch(BaseModel):
+    """Micro-batching config class."""
+
+    enabled: bool = False
+    max_words: int = Field(default=8, ge=2)
+    window: float = Field(default=0.05, ge=0)
+    prompt: str | None = None
+    model_config = ConfigDict(extra="forbid")
+
+
+class Route(BaseModel):
+    """Routing rule config class (see acrobot.models.RouteRule)."""
+
+    config: str
+    min_length: int = Field(default=1, ge=1)
+    max_length: int | None = Field(default=None, ge=1)
+    kinds: list[Literal["acro", "keyword", "api"]] | None = None
+    min_queue: int = Field(default=0, ge=0)
+    min_valid_rate: float | None = Field(default=None, ge=0, le=1)
+    max_latency: float | None = Field(default=None, gt=0)
+    model_config = ConfigDict(extra="forbid")
+
+
+class Routing(BaseModel):
+    """Per-request model routing config class."""
+
+    enabled: bool = False
+    min_samples: int = Field(default=20, ge=1)
+    window: int = Field(default=200, ge=1)
+    explore: float = Field(default=0.05, ge=0, le=1)
+    rules: list[Route] = []
+    model_config = ConfigDict(extra="forbid")
+
+
+class Bot(BaseModel):
+    """Per-bot config class for multi-bot mode (see Config.for_bot)."""
+
+    telegram_key: str
+    keywords: list[str] | None = None
+    use_config: str | None = None
     model_config = ConfigDict(extra="forbid")
 
 
@@ -64,6 +246,18 @@ class Config(BaseModel):
     acrobot: Acrobot    
     model: Model
     logging: Logging
+    tracing: Tracing = Tracing()
+    pregen: Pregen = Pregen()
+    usage: Ledger = Ledger()
+    summary: Summary = Summary()
+    api: Api = Api()
+    bots: dict[str, Bot] = {}
+    routing: Routing = Routing()
+    batch: Batch = Batch()
+    monitor: Monitor = Monitor()
+    executors: dict[str, Executor] = {}
+    probe: Probe = Probe()
+    server: Server = Server()
 
     model_config = ConfigDict(extra="allow")
     __pydantic_extra__: Dict[str, Any]
@@ -72,6 +266,44 @@ class Config(BaseModel):
     def use_config(self) -> dict[str, Any]:
         return self.__pydantic_extra__[self.model.use_config]
 
+    def retry_settings(self, config_name: str | None = None) -> dict[str, Any]:
+        """
+        Returns the retry policy for a config block: the global model.retry
+        settings, overridden by any 'retry' field in the block itself. If
+        format_retries is not set anywhere it falls back to model.retries.
+        """
+        block = (
+            self.use_config
+            if config_name is None
+            else self.__pydantic_extra__[config_name]
+        )
+        retry = Retry.model_validate(
+            {**self.model.retry.model_dump(exclude_unset=True), **block.get("retry", {})}
+        ).model_dump()
+        if retry["format_retries"] is None:
+            retry["format_retries"] = self.model.retries
+        return retry
+
+    def for_bot(self, name: str) -> Self:
+        """
+        These settings with the named bot's telegram key, keywords and config
+        block (e.g. one with its own system_instruction) swapped in. Each bot
+        keeps its evicted chat state in its own state_path file.
+        """
+        bot = self.bots[name]
+        acrobot: dict[str, Any] = {"telegram_key": bot.telegram_key}
+        if bot.keywords is not None:
+            acrobot["keywords"] = bot.keywords
+        if self.acrobot.state_path:
+            acrobot["state_path"] = f"{self.acrobot.state_path}.{name}"
+        model = {"use_config": bot.use_config} if bot.use_config else {}
+        return self.model_copy(
+            update={
+                "acrobot": Acrobot.model_validate({**self.acrobot.model_dump(), **acrobot}),
+                "model": self.model.model_copy(update=model),
+            }
+        )
+
     @model_validator(mode="after")
     def validation(self) -> Self:
         if self.model.use_config not in self.__pydantic_extra__:
@@ -80,6 +312,27 @@ class Config(BaseModel):
             raise KeyError(
                 f"{self.model.use_config} must include 'provider' parameter!"
             )
+        if self.model.fallback and self.model.fallback not in self.__pydantic_extra__:
+            raise KeyError(f"No settings found for fallback {self.model.fallback}!")
+        budget_config = self.usage.budget_config
+        if budget_config and budget_config not in self.__pydantic_extra__:
+            raise KeyError(f"No settings found for budget_config {budget_config}!")
+        for rule in self.routing.rules:
+            if rule.config not in self.__pydantic_extra__:
+                raise KeyError(f"No settings found for routing config {rule.config}!")
+        for config in self.probe.configs or ():
+            if config not in self.__pydantic_extra__:
+                raise KeyError(f"No settings found for probe config {config}!")
+        for name, bot in self.bots.items():
+            if bot.use_config and bot.use_config not in self.__pydantic_extra__:
+                raise KeyError(f"No settings found for bot {name} config {bot.use_config}!")
+        if self.bots and self.api.enabled:
+            raise ValueError("api.enabled is not supported in multi-bot mode (bots)!")
+        if self.summary.enabled:
+            if self.summary.config not in self.__pydantic_extra__:
+                raise KeyError(f"No settings found for summary config {self.summary.config}!")
+            if self.summary.every > self.acrobot.max_history:
+                raise ValueError("summary.every must not exceed acrobot.max_history!")
         return self
 
 
@@ -121,25 +374,14 @@ def get_prompt() -> Prompt:
     prompt = Prompt(**all_settings['prompt'])
     return prompt
 
-# level=settings.logging.level
-def setup_logging(level: str) -> None:
-    logging.getLogger().handlers.clear()
-    root = logging.getLogger()
-
-    if root.handlers:
-        return
-
-    root.setLevel(level)
-    handler = logging.StreamHandler()
-
-    formatter = logging.Formatter(
-        "%(levelname)s | %(name)s | %(filename)s | %(message)s"
-    )
-    handler.setFormatter(formatter)
-    root.addHandler(handler)
-
-    logging.getLogger("httpx").setLevel(logging.WARNING)
-    logging.getLogger("cerebras").setLevel(logging.WARNING)
+def setup_logging(
+    level: str,
+    format: Literal["text", "json"] = "text",
+    queue: bool = True,
+    sample: dict[str, float] | None = None,
+) -> None:
+    """Sets up the root logger (see acrobot.logs); takes the Logging settings."""
+    logs.configure(level, format, queue, sample)
 
 if __name__ == "__main__":
     setup_logging("INFO")
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 07:33:46 2026
+
+@author: BlankAdventure
+"""
+
+import asyncio
+import json
+import logging
+import pathlib
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from time import perf_counter
+from typing import Any
+
+from acrobot.config import Config, load_yaml_local
+from acrobot.models import (
+    AcroError,
+    RetryPolicy,
+    build_model,
+    get_acro_result_async,
+    repair_stats,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Record:
+    """Outcome of one eval request."""
+
+    config: str
+    word: str
+    context: int
+    latency: float
+    attempts: int = 0
+    is_valid: bool = False
+    first_try: bool = False
+    repaired: bool = False
+    tokens: int = 0
+    expansion: str | None = None
+    error: str | None = None
+
+
+@dataclass
+class Summary:
+    """Aggregate stats for one config block."""
+
+    config: str
+    requests: int
+    p50: float
+    p95: float
+    p99: float
+    valid_rate: float
+    first_try_rate: float
+    mean_attempts: float
+    mean_tokens: float = 0.0
+    repaired_rate: float = 0.0
+    errors: dict[str, int] = field(default_factory=dict)
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Linearly interpolated percentile (p in 0-100) of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(config: str, records: list[Record]) -> Summary:
+    """Reduces the records of a single config block to a Summary."""
+    latencies = [r.latency for r in records]
+    count = len(records) or 1
+    return Summary(
+        config=config,
+        requests=len(records),
+        p50=percentile(latencies, 50),
+        p95=percentile(latencies, 95),
+        p99=percentile(latencies, 99),
+        valid_rate=sum(r.is_valid for r in records) / count,
+        first_try_rate=sum(r.first_try for r in records) / count,
+        mean_attempts=sum(r.attempts for r in records) / count,
+        mean_tokens=sum(r.tokens for r in records) / count,
+        repaired_rate=sum(r.repaired for r in records) / count,
+        errors=dict(Counter(r.error for r in records if r.error)),
+    )
+
+
+def load_words(path: str) -> list[str]:
+    """Reads a word list, one word per line. Blank lines and # comments are skipped."""
+    lines = pathlib.Path(path).read_text().splitlines()
+    return [w.strip() for w in lines if w.strip() and not w.startswith("#")]
+
+
+def load_contexts(path: str | None) -> list[str]:
+    """
+    Reads conversation contexts from a YAML file holding a list of
+    conversations, each given as a single string of 'user: message' lines.
+    Without a file, every word is run once with an empty conversation.
+    """
+    if path is None:
+        return [""]
+    return [str(c) for c in load_yaml_local(path)]
+
+
+async def eval_config(
+    settings: Config,
+    config_name: str,
+    words: list[str],
+    contexts: list[str],
+    concurrency: int = 4,
+) -> list[Record]:
+    """Runs every word/context pair against a single config block."""
+
+    llm = build_model(getattr(settings, config_name))
+    policy = RetryPolicy(**settings.retry_settings(config_name))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(word: str, index: int) -> Record:
+        async with semaphore:
+            start = perf_counter()
+            try:
+                result = await get_acro_result_async(llm, word, contexts[index], policy)
+            except Exception as e:
+                message = e() if isinstance(e, AcroError) else type(e).__name__
+                return Record(config_name, word, index, perf_counter() - start, error=message)
+            return Record(
+                config_name,
+                word,
+                index,
+                perf_counter() - start,
+                attempts=result.attempts,
+                is_valid=result.is_valid,
+                first_try=result.first_try,
+                repaired=result.repaired,
+                tokens=result.usage.total_tokens,
+                expansion=result.expansion,
+            )
+
+    jobs = [run(w, i) for w in words for i in range(len(contexts))]
+    return list(await asyncio.gather(*jobs))
+
+
+async def run_eval(
+    settings: Config,
+    config_names: list[str],
+    words: list[str],
+    contexts: list[str],
+    concurrency: int = 4,
+) -> dict[str, Any]:
+    """
+    Evaluates several config blocks concurrently. Returns a JSON-ready dict
+    with a summary per config, the format repairs made during the run (see
+    models.repair_expansion) and the individual records.
+    """
+
+    before = asdict(repair_stats)
+    results = await asyncio.gather(
+        *(eval_config(settings, c, words, contexts, concurrency) for c in config_names)
+    )
+    return {
+        "summary": [asdict(summarize(c, r)) for c, r in zip(config_names, results)],
+        "repairs": {k: v - before[k] for k, v in asdict(repair_stats).items()},
+        "records": [asdict(r) for records in results for r in records],
+    }
+
+
+def format_summary(report: dict[str, Any]) -> str:
+    """Renders the summary part of a report as a plain text table."""
+    header = (
+        f"{'config':<12}{'n':>5}{'p50':>8}{'p95':>8}{'p99':>8}"
+        f"{'valid':>8}{'1st':>8}{'fixed':>8}{'tries':>7}{'tokens':>8}  errors"
+    )
+    lines = [header]
+    for s in report["summary"]:
+        lines.append(
+            f"{s['config']:<12}{s['requests']:>5}{s['p50']:>8.2f}{s['p95']:>8.2f}{s['p99']:>8.2f}"
+            f"{s['valid_rate']:>8.0%}{s['first_try_rate']:>8.0%}{s['repaired_rate']:>8.0%}"
+            f"{s['mean_attempts']:>7.2f}"
+            f"{s['mean_tokens']:>8.0f}  "
+            f"{s['errors'] or ''}"
+        )
+    if repairs := report.get("repairs"):
+        lines.append(
+            f"repairs: attempted {repairs['attempted']}, repaired {repairs['repaired']}, "
+            f"retries avoided {repairs['retries_avoided']}"
+        )
+    return "\n".join(lines)
+
+
+def write_report(report: dict[str, Any], path: str) -> None:
+    pathlib.Path(path).write_text(json.dumps(report, indent=2))
+    logger.info(f"eval results written to {path}")
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 08:25:40 2026
+
+@author: BlankAdventure
+
+Blocking model SDK calls run on a thread pool of their own per provider
+(model class), sized for I/O rather than CPU count, so they neither queue
+behind other asyncio.to_thread users nor pile up unseen. Each pool admits
+at most workers + max_queue calls; beyond that, calls are rejected with
+ExecutorFull or wait for a slot.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+from collections.abc import Callable
+from typing import Any, Literal
+
+from acrobot.monitor import CountingExecutor
+
+logger = logging.getLogger(__name__)
+
+_executors: dict[str, "ProviderExecutor"] = {}
+
+
+class ExecutorFull(Exception):
+    """Raised when a provider's executor has no room for another call."""
+
+
+class ProviderExecutor(CountingExecutor):
+    """A named, bounded thread pool for one provider's calls."""
+
+    def __init__(
+        self,
+        name: str,
+        workers: int = 8,
+        max_queue: int = 16,
+        on_full: Literal["reject", "wait"] = "reject",
+    ) -> None:
+        super().__init__(workers, thread_name_prefix=f"acrobot-{name}")
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.on_full = on_full
+        self.slots = asyncio.Semaphore(workers + max_queue)
+        self.rejected = 0
+        self.in_flight = 0
+        self.peak_queued = 0
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """
+        Runs fn(*args) on the pool, in a copy of the current context (as
+        asyncio.to_thread does). The call keeps its slot until its thread is
+        done with it, even if the caller gives up waiting (e.g. on a
+        timeout), so a slow provider can't pile up calls beyond the limit.
+        """
+        if self.on_full == "reject" and self.slots.locked():
+            self.rejected += 1
+            raise ExecutorFull(f"{self.name} has {self.queued} calls queued")
+        await self.slots.acquire()
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        self.peak_queued = max(self.peak_queued, self.in_flight - self.workers)
+        call = functools.partial(contextvars.copy_context().run, fn, *args)
+        try:
+            future = self.submit(call)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release_soon(loop))
+        return await asyncio.wrap_future(future, loop=loop)
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self.slots.release()
+
+    def _release_soon(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Releases a slot from the worker thread that finished the call."""
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            pass  # the loop has closed, and the semaphore with it
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {self.running}/{self.workers} running, {self.queued}/{self.max_queue} "
+            f"queued (peak {self.peak_queued}), {self.completed} done, {self.rejected} rejected, "
+            f"{self.utilization():.0%} utilization"
+        )
+
+
+def configure(settings: dict[str, dict[str, Any]]) -> None:
+    """
+    Replaces the executors with one per provider in settings, which maps a
+    model class name to ProviderExecutor options.
+    """
+    for executor in _executors.values():
+        executor.shutdown(wait=False)
+    _executors.clear()
+    for name, options in settings.items():
+        _executors[name] = ProviderExecutor(name, **options)
+
+
+def get(name: str) -> ProviderExecutor | None:
+    return _executors.get(name)
+
+
+def summary() -> str:
+    return "\n".join(str(executor) for executor in _executors.values())
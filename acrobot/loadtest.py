@@ -0,0 +1,455 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 07:41:33 2026
+
+@author: BlankAdventure
+"""
+
+import asyncio
+import importlib
+import importlib.util
+import json
+import logging
+import os
+import random
+import socket
+import time
+from collections import defaultdict, deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, replace
+from typing import Any
+from urllib.parse import parse_qsl
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from acrobot.app import Acrobot, Acrowebhook, ChatUpdateProcessor
+from acrobot.config import Config
+from acrobot.evaluate import percentile
+
+logger = logging.getLogger(__name__)
+
+STUB_TOKEN = "123456:loadtest"
+FILLER = (
+    "anyone around later",
+    "that was hilarious",
+    "did you see the game",
+    "what are we doing",
+    "lol no way",
+    "send me the pics",
+)
+ACRO_WORDS = ("cat", "pizza", "monday", "rocket", "banana", "sunday", "taco")
+
+
+@dataclass
+class LoadProfile:
+    """Shape of the synthetic update stream."""
+
+    chats: int = 10
+    rate: float = 5.0  # messages per second, across all chats
+    duration: float = 30.0  # seconds
+    keyword_ratio: float = 0.1  # fraction of messages containing a keyword
+    acro_ratio: float = 0.05  # fraction of messages that are /acro commands
+    keywords: tuple[str, ...] = ()  # defaults to the bot's own keywords
+
+
+@dataclass
+class LoadReport:
+    """Results of a load test run."""
+
+    updates: int
+    expected_replies: int
+    replies: int
+    elapsed: float
+    throughput: float  # replies per second
+    p50: float
+    p95: float
+    p99: float
+    slo: float
+    slo_adherence: float  # fraction of expected replies received within slo
+    throttled: int  # sendMessage calls answered with 429
+    update_rate: float = 0.0  # updates handled per second, until the last was handled
+    loop_cpu: float = 0.0  # event loop thread CPU time per update (microseconds)
+    request_p50: float = 0.0  # webhook mode: time to answer the update's POST
+    request_p99: float = 0.0
+
+
+def generate_updates(
+    profile: LoadProfile, seed: int | None = None
+) -> Iterator[tuple[float, dict[str, Any], bool]]:
+    """
+    Yields (send time, update, expects reply) with Poisson arrivals spread
+    uniformly over the chats.
+    """
+    rng = random.Random(seed)
+    t, update_id = 0.0, 0
+    message_ids: dict[int, int] = defaultdict(int)
+
+    while True:
+        t += rng.expovariate(profile.rate)
+        if t > profile.duration:
+            return
+        update_id += 1
+        chat_id = -1000 - rng.randrange(profile.chats)
+        message_ids[chat_id] += 1
+        user_id = rng.randrange(1, 50)
+
+        roll = rng.random()
+        entities: list[dict[str, Any]] = []
+        expects_reply = True
+        if roll < profile.acro_ratio:
+            text = f"/acro {rng.choice(ACRO_WORDS)}"
+            entities = [{"type": "bot_command", "offset": 0, "length": 5}]
+        elif roll < profile.acro_ratio + profile.keyword_ratio and profile.keywords:
+            text = f"{rng.choice(FILLER)} {rng.choice(profile.keywords)}"
+        else:
+            text = rng.choice(FILLER)
+            expects_reply = False
+
+        message = {
+            "message_id": message_ids[chat_id],
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "group", "title": f"chat {chat_id}"},
+            "from": {
+                "id": user_id,
+                "is_bot": False,
+                "first_name": f"user{user_id}",
+                "username": f"user{user_id}",
+            },
+            "text": text,
+            "entities": entities,
+        }
+        yield t, {"update_id": update_id, "message": message}, expects_reply
+
+
+# ************************************************************
+# BOT API STUB
+# -----------------------------------------------------------
+# Minimal stand-in for the Telegram Bot API. Records outgoing
+# messages, serves queued updates to getUpdates, and can add
+# latency and 429 (flood control) responses to sendMessage.
+# ************************************************************
+class BotApiStub(FastAPI):
+    def __init__(
+        self, latency: float = 0.0, error_rate: float = 0.0, retry_after: int = 1
+    ) -> None:
+        super().__init__()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.replies: list[tuple[float, int, str]] = []
+        self.updates: deque[dict[str, Any]] = deque()
+        self.has_updates = asyncio.Event()
+        self.throttled = 0
+        self.webhook: str | None = None
+        self.add_api_route("/bot{token}/{method}", self.handle, methods=["GET", "POST"])
+
+    async def _params(self, request: Request) -> dict[str, Any]:
+        if request.headers.get("content-type", "").startswith("application/json"):
+            return await request.json()
+        # PTB posts url-encoded forms with JSON-encoded values
+        params: dict[str, Any] = {}
+        for key, value in parse_qsl((await request.body()).decode()):
+            try:
+                params[key] = json.loads(value)
+            except ValueError:
+                params[key] = value
+        return params
+
+    async def handle(self, token: str, method: str, request: Request) -> JSONResponse:
+        params = await self._params(request)
+        method = method.lower()
+
+        if method == "sendmessage":
+            return await self.send_message(params)
+        if method == "getupdates":
+            return self.ok(await self.get_updates(params))
+        if method == "getme":
+            return self.ok(
+                {"id": 1, "is_bot": True, "first_name": "Acrobot", "username": "acro_bot"}
+            )
+        if method == "setwebhook":
+            self.webhook = params.get("url")
+        return self.ok(True)
+
+    async def send_message(self, params: dict[str, Any]) -> JSONResponse:
+        await asyncio.sleep(self.latency)
+        if random.random() < self.error_rate:
+            self.throttled += 1
+            return JSONResponse(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                },
+                status_code=429,
+            )
+        chat_id, text = int(params["chat_id"]), str(params.get("text", ""))
+        self.replies.append((time.perf_counter(), chat_id, text))
+        return self.ok(
+            {
+                "message_id": len(self.replies),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "group"},
+                "text": text,
+            }
+        )
+
+    def push(self, update: dict[str, Any]) -> None:
+        """Queues an update for the next getUpdates call."""
+        self.updates.append(update)
+        self.has_updates.set()
+
+    async def get_updates(self, params: dict[str, Any]) -> list[dict[str, Any]]:
+        limit = int(params.get("limit", 100))
+        timeout = float(params.get("timeout", 0))
+        if not self.updates and timeout:
+            try:
+                await asyncio.wait_for(self.has_updates.wait(), timeout)
+            except TimeoutError:
+                return []
+        batch: list[dict[str, Any]] = []
+        while self.updates and len(batch) < limit:
+            batch.append(self.updates.popleft())
+        if not self.updates:
+            self.has_updates.clear()
+        return batch
+
+    @staticmethod
+    def ok(result: Any) -> JSONResponse:
+        return JSONResponse({"ok": True, "result": result})
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def serve(
+    app: Any, port: int, options: dict[str, Any] | None = None
+) -> tuple[uvicorn.Server, asyncio.Task]:
+    """
+    Starts a uvicorn server in the running loop and waits until it is up.
+    options are passed on to uvicorn.Config; the loop option has no effect,
+    the server runs in whatever loop is running (see loop_factory).
+    """
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", **(options or {}))
+    )
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task
+
+
+def summarize(
+    sent: dict[int, deque[float]],
+    replies: list[tuple[float, int, str]],
+    updates: int,
+    elapsed: float,
+    slo: float,
+    throttled: int,
+) -> LoadReport:
+    """
+    Matches replies to the updates that triggered them (in order, per chat)
+    and works out the latency of each.
+    """
+    expected = sum(len(times) for times in sent.values())
+    pending = {chat: deque(times) for chat, times in sent.items()}
+    latencies = [
+        when - pending[chat].popleft()
+        for when, chat, _ in replies
+        if pending.get(chat)
+    ]
+    return LoadReport(
+        updates=updates,
+        expected_replies=expected,
+        replies=len(latencies),
+        elapsed=elapsed,
+        throughput=len(latencies) / elapsed if elapsed else 0.0,
+        p50=percentile(latencies, 50),
+        p95=percentile(latencies, 95),
+        p99=percentile(latencies, 99),
+        slo=slo,
+        slo_adherence=sum(lat <= slo for lat in latencies) / expected if expected else 1.0,
+        throttled=throttled,
+    )
+
+
+@contextmanager
+def stub_token(name: str) -> Iterator[None]:
+    """Sets the environment variable name to STUB_TOKEN, restoring it on exit."""
+    previous = os.environ.get(name)
+    os.environ[name] = STUB_TOKEN
+    try:
+        yield
+    finally:
+        if previous is None:
+            del os.environ[name]
+        else:
+            os.environ[name] = previous
+
+
+async def run_load(
+    settings: Config,
+    profile: LoadProfile,
+    mode: str = "webhook",
+    stub: BotApiStub | None = None,
+    slo: float = 10.0,
+    drain: float = 30.0,
+    seed: int | None = None,
+) -> LoadReport:
+    """
+    Runs the bot in-process against a local Bot API stub and feeds it a
+    synthetic update stream, either by POSTing to the webhook route or via
+    the stub's getUpdates (polling mode). Waits up to drain seconds after the
+    last update for outstanding replies.
+    """
+    stub = stub or BotApiStub()
+    stub_port = free_port()
+    stub_server, stub_task = await serve(stub, stub_port)
+
+    settings = settings.model_copy(deep=True)
+    settings.acrobot.api_base_url = f"http://127.0.0.1:{stub_port}/bot"
+    if profile.keywords:
+        settings.acrobot.keywords |= set(profile.keywords)
+    else:
+        profile = replace(profile, keywords=tuple(sorted(settings.acrobot.keywords)))
+
+    sent: dict[int, deque[float]] = defaultdict(deque)
+    request_times: list[float] = []
+    updates = 0
+
+    if mode == "webhook":
+        bot_port = free_port()
+        with stub_token(settings.acrobot.telegram_key):
+            bot: Acrobot = Acrowebhook(settings=settings)
+        bot_server, bot_task = await serve(bot, bot_port, settings.server.uvicorn_options())
+        client = httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{bot_port}", limits=httpx.Limits(max_connections=None)
+        )
+
+        async def deliver(update: dict[str, Any]) -> None:
+            posted = time.perf_counter()
+            await client.post("/", json=update)
+            request_times.append(time.perf_counter() - posted)
+    else:
+        with stub_token(settings.acrobot.telegram_key):
+            bot = Acrobot(settings)
+        qp_task = asyncio.create_task(bot._queue_processor())
+        await bot.telegram_app.initialize()
+        await bot.telegram_app.start()
+        assert bot.telegram_app.updater is not None
+        await bot.telegram_app.updater.start_polling(poll_interval=0, timeout=1)
+
+        async def deliver(update: dict[str, Any]) -> None:
+            stub.push(update)
+
+    start, cpu = time.perf_counter(), time.thread_time()
+    posts = set()
+    for at, update, expects_reply in generate_updates(profile, seed):
+        await asyncio.sleep(max(0.0, start + at - time.perf_counter()))
+        if expects_reply:
+            sent[update["message"]["chat"]["id"]].append(time.perf_counter())
+        posts.add(asyncio.create_task(deliver(update)))
+        updates += 1
+    await asyncio.gather(*posts)
+    if mode != "webhook":
+        # posting to the webhook returns once the update has been handled
+        processor = bot.telegram_app.update_processor
+        assert isinstance(processor, ChatUpdateProcessor)
+        deadline = time.perf_counter() + drain
+        while processor.processed < updates and time.perf_counter() < deadline:
+            await asyncio.sleep(0.005)
+    handled = time.perf_counter() - start
+
+    expected = sum(len(times) for times in sent.values())
+    deadline = time.perf_counter() + drain
+    while len(stub.replies) < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    cpu = time.thread_time() - cpu
+
+    if mode == "webhook":
+        await client.aclose()
+        bot_server.should_exit = True
+        await bot_task
+    else:
+        assert bot.telegram_app.updater is not None
+        await bot.telegram_app.updater.stop()
+        await bot.telegram_app.stop()
+        await bot.telegram_app.shutdown()
+        qp_task.cancel()
+    stub_server.should_exit = True
+    await stub_task
+
+    report = summarize(sent, stub.replies, updates, elapsed, slo, stub.throttled)
+    report.update_rate = updates / handled if handled else 0.0
+    report.loop_cpu = cpu / updates * 1e6 if updates else 0.0
+    if request_times:
+        report.request_p50 = percentile(request_times, 50)
+        report.request_p99 = percentile(request_times, 99)
+    return report
+
+
+def format_report(report: LoadReport) -> str:
+    return "\n".join(f"{k:>18}: {v:.3f}" if isinstance(v, float) else f"{k:>18}: {v}"
+                     for k, v in asdict(report).items())
+
+
+# Logging setups compared by the logging benchmark (see logs.configure).
+LOG_MODES: dict[str, dict[str, Any]] = {
+    "sync": {"use_queue": False},
+    "queue": {},
+    "json": {"format": "json"},
+    "sampled": {"format": "json", "sample": {"acrobot": 0.1}},
+}
+
+
+# Webhook server setups compared by the server benchmark (see config.Server).
+# "default" is plain uvicorn and FastAPI routing.
+SERVER_MODES: dict[str, dict[str, Any]] = {
+    "default": {},
+    "fast_path": {"fast_path": True},
+    "no_log": {"fast_path": True, "access_log": False},
+    "uvloop": {"fast_path": True, "access_log": False, "loop": "uvloop", "http": "httptools"},
+}
+
+
+def server_modes() -> dict[str, dict[str, Any]]:
+    """SERVER_MODES, without those needing packages that are not installed."""
+    return {
+        name: options
+        for name, options in SERVER_MODES.items()
+        if all(
+            importlib.util.find_spec(options[key]) is not None
+            for key in ("loop", "http")
+            if options.get(key) in ("uvloop", "httptools")
+        )
+    }
+
+
+def loop_factory(loop: str) -> Callable[[], asyncio.AbstractEventLoop] | None:
+    """The event loop uvicorn would pick for server.loop, for asyncio.Runner."""
+    if loop == "asyncio" or (loop == "auto" and importlib.util.find_spec("uvloop") is None):
+        return None
+    return importlib.import_module("uvloop").new_event_loop
+
+
+def format_sweep(reports: dict[Any, LoadReport], label: str = "concurrent") -> str:
+    """Tabulates load test reports run with different settings."""
+    lines = [
+        f"{label:>10}{'updates/s':>11}{'replies/s':>11}{'loop us':>9}"
+        f"{'p50':>8}{'p95':>8}{'p99':>8}{'post p99':>10}"
+    ]
+    for setting, r in reports.items():
+        lines.append(
+            f"{setting:>10}{r.update_rate:>11.1f}{r.throughput:>11.1f}{r.loop_cpu:>9.0f}"
+            f"{r.p50:>8.3f}{r.p95:>8.3f}{r.p99:>8.3f}{r.request_p99:>10.4f}"
+        )
+    return "\n".join(lines)
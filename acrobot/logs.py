@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 08:04:39 2026
+
+@author: BlankAdventure
+
+Log records are put on a queue by the calling thread and written out by a
+QueueListener on a background thread, so logging never blocks the event
+loop on I/O. The calling thread only merges each message with its
+arguments; the formatter (text or JSON, and any traceback) runs on the
+listener thread. Records are tagged with the chat and request (update)
+being handled, bound with bind(), and can be sampled per logger.
+"""
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, Literal
+
+TEXT_FORMAT = "%(levelname)s | %(name)s | %(filename)s | %(message)s"
+
+_chat: contextvars.ContextVar[Any] = contextvars.ContextVar("log_chat", default=None)
+_request: contextvars.ContextVar[Any] = contextvars.ContextVar("log_request", default=None)
+_listener: logging.handlers.QueueListener | None = None
+
+
+@contextmanager
+def bind(chat: Any = None, request: Any = None) -> Iterator[None]:
+    """Tags records logged inside the block with the chat and request ids."""
+    tokens = (_chat.set(chat), _request.set(request))
+    try:
+        yield
+    finally:
+        _chat.reset(tokens[0])
+        _request.reset(tokens[1])
+
+
+class ContextFilter(logging.Filter):
+    """Copies the bound correlation ids onto each record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.chat = _chat.get()
+        record.request = _request.get()
+        return True
+
+
+class SampleFilter(logging.Filter):
+    """
+    Keeps only a fraction of the records below WARNING from noisy loggers.
+    rates maps a logger name (or its parent's) to the fraction kept.
+    """
+
+    def __init__(self, rates: dict[str, float]) -> None:
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        name = record.name
+        while name:
+            if name in self.rates:
+                return random.random() < self.rates[name]
+            name = name.rpartition(".")[0]
+        return True
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """
+    Queues a copy of each record with its message merged, so arguments
+    can't change before it is written. Unlike the stock QueueHandler, it
+    leaves formatting to the listener's handler.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including the correlation ids."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "chat": getattr(record, "chat", None),
+            "request": getattr(record, "request", None),
+        }
+        if record.exc_info:
+            line["exc"] = self.formatException(record.exc_info)
+        return json.dumps(line, default=str)
+
+
+def stop() -> None:
+    """Stops the background writer, flushing anything still queued."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure(
+    level: str = "INFO",
+    format: Literal["text", "json"] = "text",
+    use_queue: bool = True,
+    sample: dict[str, float] | None = None,
+    handler: logging.Handler | None = None,
+) -> None:
+    """
+    Replaces the root logger's handlers. Output goes to handler (stderr by
+    default), through a queue and background thread unless use_queue is off.
+    """
+    stop()
+    root = logging.getLogger()
+    root.handlers.clear()
+    root.setLevel(level)
+
+    handler = handler or logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if format == "json" else logging.Formatter(TEXT_FORMAT))
+    front = handler
+    if use_queue:
+        global _listener
+        front = QueueHandler(queue.SimpleQueue())
+        _listener = logging.handlers.QueueListener(front.queue, handler)
+        _listener.start()
+    front.addFilter(SampleFilter(sample or {}))
+    front.addFilter(ContextFilter())
+    root.addHandler(front)
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("cerebras").setLevel(logging.WARNING)
+
+
+atexit.register(stop)
@@ -5,12 +5,22 @@ Created on Fri Dec 19 14:23:33 2025
 @author: BlankAdventure
 """
 
+import asyncio
+import contextvars
 import functools
+import hashlib
+import json
 import logging
+import pathlib
+import random
+import re
+import threading
+from collections import Counter, defaultdict, deque
 from abc import ABC, abstractmethod
-from collections.abc import Callable
-from dataclasses import dataclass
-from time import sleep
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from time import perf_counter, sleep
 from typing import Any, Literal, Optional, Type, cast
 
 from cerebras.cloud.sdk import APIConnectionError, Cerebras, RateLimitError
@@ -18,7 +28,8 @@ from google import genai
 from google.genai import errors, types
 from httpx import ConnectError
 
-from acrobot.config import setup_logging, get_prompt
+from acrobot import executors, tracing
+from acrobot.config import setup_logging, get_prompt, load_yaml_local
 
 logger = logging.getLogger(__name__)
 
@@ -55,11 +66,89 @@ def catch(exception: type[Exception], message: str) -> Callable:
     return decorator
 
 
+@dataclass
+class Usage:
+    """
+    Token counts for one or more model calls. completion_tokens excludes
+    reasoning_tokens, so the three add up to the total billed.
+    """
+
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    reasoning_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens + self.reasoning_tokens
+
+    def add(self, prompt: int = 0, completion: int = 0, reasoning: int = 0) -> None:
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+        self.reasoning_tokens += reasoning
+
+
+_usage: contextvars.ContextVar[Usage | None] = contextvars.ContextVar(
+    "acrobot_usage", default=None
+)
+
+
+@contextmanager
+def collect_usage(usage: Usage) -> Iterator[Usage]:
+    """
+    Sends token counts reported while the block runs (including from worker
+    threads started with asyncio.to_thread) to usage.
+    """
+    token = _usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage.reset(token)
+
+
+def record_usage(prompt: int = 0, completion: int = 0, reasoning: int = 0) -> None:
+    """
+    Called by models after each API call. Counts go to the Usage of the
+    request being run (see get_acro_result), and are ignored outside one.
+    """
+    usage = _usage.get()
+    if usage is not None:
+        usage.add(prompt, completion, reasoning)
+
+
 class Model(ABC):
+    # Models that answer locally, without an API call. The startup probe
+    # counts them as ready instead of sending them its prompt.
+    offline = False
+    # Whether the model can answer a batch prompt (see BATCH_TEMPLATE);
+    # requests for models that can't are never batched.
+    supports_batch = True
+
     @abstractmethod
     def generate_response(self, prompt: str) -> Optional[str]:
         pass
 
+    def generate_candidates(self, prompt: str) -> list[Optional[str]]:
+        """
+        One or more responses to the prompt from a single call. Models that
+        can return several candidates per request override this.
+        """
+        return [self.generate_response(prompt)]
+
+
+async def call_model(model: Model, fn: Callable, *args: Any) -> Any:
+    """
+    Runs a blocking model call on the executor for the model's provider, or
+    with asyncio.to_thread if it has none. A full executor raises AcroError.
+    """
+    executor = executors.get(type(model).__name__)
+    if executor is None:
+        return await asyncio.to_thread(fn, *args)
+    try:
+        return await executor.run(fn, *args)
+    except executors.ExecutorFull as e:
+        logger.warning(f"rejected: {e}")
+        raise AcroError("I'm swamped, try again in a bit.") from e
+
 
 @dataclass
 class GeminiModel(Model):
@@ -71,8 +160,12 @@ class GeminiModel(Model):
     top_p: float = 0.95
     model_name: str = "gemini-2.5-flash"
     api_key: str | None = None
+    system_instruction: str | None = None
+    candidates: int = 1
 
     def __post_init__(self):
+        if self.candidates < 1:
+            raise ValueError("candidates must be at least 1")
         thinking_config = types.ThinkingConfig(
             thinking_budget=self.thinking_budget, 
             thinking_level=self.thinking_level,
@@ -80,21 +173,42 @@ class GeminiModel(Model):
         )
         func_calling = types.AutomaticFunctionCallingConfig(disable=True)
         self.config = types.GenerateContentConfig(
-            system_instruction=SYS_INSTRUCTION,
+            system_instruction=self.system_instruction or SYS_INSTRUCTION,
             temperature=self.temperature,
             top_p=self.top_p,
             thinking_config=thinking_config,
             automatic_function_calling=func_calling,
         )
+        self.multi_config = self.config.model_copy(update={"candidate_count": self.candidates})
         self.client = genai.Client(api_key=self.api_key)
 
     @catch(ConnectError, "your internet is busted.")
     @catch(errors.APIError, "dammit, you broke something!")
-    def generate_response(self, prompt: str) -> str | None:
+    def _generate(self, prompt: str, multi: bool) -> list[str | None]:
         response = self.client.models.generate_content(
-            model=self.model_name, contents=prompt, config=self.config
+            model=self.model_name,
+            contents=prompt,
+            config=self.multi_config if multi else self.config,
         )
-        return response.text.strip()
+        if meta := response.usage_metadata:
+            record_usage(
+                meta.prompt_token_count or 0,
+                meta.candidates_token_count or 0,
+                meta.thoughts_token_count or 0,
+            )
+        if not multi:
+            return [response.text.strip()]
+        return [
+            "".join(part.text or "" for part in c.content.parts or []).strip()
+            for c in response.candidates or []
+            if c.content
+        ] or [None]
+
+    def generate_response(self, prompt: str) -> str | None:
+        return self._generate(prompt, False)[0]
+
+    def generate_candidates(self, prompt: str) -> list[str | None]:
+        return self._generate(prompt, self.candidates > 1)
 
 
 @dataclass
@@ -107,16 +221,20 @@ class CerebrasModel(Model):
     top_p: float = 1
     api_key: str | None = None
     reasoning_effort: Literal["low", "medium", "high"] = "low"
+    system_instruction: str | None = None
+    candidates: int = 1
 
     def __post_init__(self):
+        if self.candidates < 1:
+            raise ValueError("candidates must be at least 1")
         self.client = Cerebras(api_key=self.api_key)
 
     @catch(RateLimitError, "slow down there buddy.")
     @catch(APIConnectionError, "your internet is busted.")
     @catch(ConnectError, "your internet is busted.")
-    def generate_response(self, prompt: str) -> str | None:
+    def _generate(self, prompt: str, n: int) -> list[str | None]:
         messages = [
-            {"role": "system", "content": SYS_INSTRUCTION},
+            {"role": "system", "content": self.system_instruction or SYS_INSTRUCTION},
             {"role": "user", "content": prompt},
         ]
 
@@ -127,9 +245,214 @@ class CerebrasModel(Model):
             temperature=self.temperature,
             top_p=self.top_p,
             reasoning_effort=self.reasoning_effort,
+            n=n,
             stream=False,
         )
-        return completion.choices[0].message.content.strip()
+        if usage := completion.usage:
+            details = usage.completion_tokens_details
+            reasoning = (details.reasoning_tokens if details else None) or 0
+            record_usage(
+                usage.prompt_tokens or 0, (usage.completion_tokens or 0) - reasoning, reasoning
+            )
+        return [
+            choice.message.content.strip() if choice.message.content else None
+            for choice in completion.choices
+        ]
+
+    def generate_response(self, prompt: str) -> str | None:
+        return self._generate(prompt, 1)[0]
+
+    def generate_candidates(self, prompt: str) -> list[str | None]:
+        return self._generate(prompt, self.candidates)
+
+
+WORDS_PATH = str(pathlib.Path(__file__).parent / "words.yaml")
+
+# Part-of-speech templates by acronym length. Longer words cycle through the
+# longest template as many times as needed.
+TEMPLATES: dict[int, tuple[str, ...]] = {
+    1: ("noun",),
+    2: ("adjective", "noun"),
+    3: ("adjective", "noun", "verb"),
+    4: ("adjective", "noun", "verb", "adverb"),
+    5: ("adjective", "noun", "verb", "adjective", "noun"),
+    6: ("adjective", "adjective", "noun", "verb", "adjective", "noun"),
+}
+
+
+def _prompt_pattern(template: str) -> re.Pattern:
+    """
+    Turns the prompt template into a regex that recovers the word and the
+    conversation from a prompt built with build_prompt.
+    """
+    pattern, seen = "", set()
+    for part in re.split(r"(\{convo\}|\{word\})", template):
+        if part in ("{convo}", "{word}"):
+            name = part[1:-1]
+            pattern += f"(?P={name})" if name in seen else f"(?P<{name}>.*?)"
+            seen.add(name)
+        else:
+            pattern += re.escape(part)
+    return re.compile(pattern, re.DOTALL)
+
+
+@dataclass
+class LocalModel(Model):
+    """
+    Offline model that builds acronyms from a bundled word list. Always
+    returns a valid acronym, with no network access, in microseconds. With
+    history_bias > 0 it prefers words from the conversation when one starts
+    with the right letter.
+    """
+
+    offline = True
+    supports_batch = False
+
+    history_bias: float = 0.3
+    word_file: str | None = None
+    seed: int | None = None
+
+    def __post_init__(self) -> None:
+        words = load_yaml_local(self.word_file or WORDS_PATH)
+        self.index: dict[str, dict[str, list[str]]] = {}
+        for pos, word_list in words.items():
+            self.index[pos] = defaultdict(list)
+            for w in word_list:
+                self.index[pos][w[0].lower()].append(w)
+        self.pattern = _prompt_pattern(PROMPT_TEMPLATE)
+        self.rng = random.Random(self.seed)
+
+    def _pick(self, letter: str, pos: str, convo_words: dict[str, list[str]]) -> str:
+        if convo_words.get(letter) and self.rng.random() < self.history_bias:
+            return self.rng.choice(convo_words[letter])
+        for p in (pos, *self.index):
+            if choices := self.index[p].get(letter):
+                return self.rng.choice(choices)
+        return letter
+
+    def generate_response(self, prompt: str) -> str:
+        match = self.pattern.fullmatch(prompt)
+        if match is None:
+            raise AcroError("I can't make sense of that prompt.")
+        word = match.group("word").lower()
+        convo = match.groupdict().get("convo") or ""
+
+        convo_words: dict[str, list[str]] = defaultdict(list)
+        for line in convo.splitlines():
+            for w in re.findall(r"[a-z]{3,}", line.split(": ", 1)[-1].lower()):
+                if w not in FILLER_WORDS:
+                    convo_words[w[0]].append(w)
+
+        template = TEMPLATES.get(len(word), TEMPLATES[max(TEMPLATES)])
+        parts = [
+            self._pick(letter, template[i % len(template)], convo_words)
+            for i, letter in enumerate(word)
+        ]
+        return " ".join(parts).capitalize()
+
+
+def prompt_hash(prompt: str) -> str:
+    """Short, stable key for a prompt in a cassette file."""
+    return hashlib.sha256(prompt.encode()).hexdigest()[:16]
+
+
+@dataclass
+class RecordingModel(Model):
+    """
+    Wraps another model (given as a config block, or a provider name) and
+    appends every call to a cassette file at path, one JSON object per line:
+    the prompt hash, the responses (or the AcroError message), the latency
+    and the tokens used. The prompt itself is only kept with keep_prompts.
+    """
+
+    model: str | dict[str, Any] = "LocalModel"
+    path: str = "cassette.jsonl"
+    keep_prompts: bool = False
+
+    def __post_init__(self) -> None:
+        self.inner = build_model(self.model)
+        self.supports_batch = self.inner.supports_batch
+        self.lock = threading.Lock()
+
+    def _record(self, prompt: str, call: Callable[[str], list[str | None]]) -> list[str | None]:
+        entry: dict[str, Any] = {"hash": prompt_hash(prompt)}
+        if self.keep_prompts:
+            entry["prompt"] = prompt
+        usage = Usage()
+        start = perf_counter()
+        try:
+            with collect_usage(usage):
+                responses = call(prompt)
+        except AcroError as e:
+            entry["error"] = str(e)
+            raise
+        except Exception as e:
+            # replayed as an AcroError, like any other failed call
+            entry["error"] = f"{type(e).__name__}: {e}"
+            raise
+        else:
+            entry["responses"] = responses
+            return responses
+        finally:
+            entry["latency"] = round(perf_counter() - start, 4)
+            entry["usage"] = [usage.prompt_tokens, usage.completion_tokens, usage.reasoning_tokens]
+            record_usage(*entry["usage"])
+            with self.lock, pathlib.Path(self.path).open("a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def generate_response(self, prompt: str) -> str | None:
+        return self._record(prompt, lambda p: [self.inner.generate_response(p)])[0]
+
+    def generate_candidates(self, prompt: str) -> list[str | None]:
+        return self._record(prompt, self.inner.generate_candidates)
+
+
+@dataclass
+class ReplayModel(Model):
+    """
+    Serves the responses in a cassette written by RecordingModel, looked up
+    by prompt hash. A prompt recorded several times gets its recordings in
+    turn, starting over after the last. With latency, each call takes as
+    long as the recorded one did (times speed). Prompts missing from the
+    cassette raise AcroError.
+    """
+
+    offline = True
+    supports_batch = False
+
+    path: str = "cassette.jsonl"
+    latency: bool = False
+    speed: float = 1.0
+
+    def __post_init__(self) -> None:
+        self.entries: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        for line in pathlib.Path(self.path).read_text().splitlines():
+            if line.strip():
+                entry = json.loads(line)
+                self.entries[entry["hash"]].append(entry)
+        self.served: Counter[str] = Counter()
+        self.lock = threading.Lock()
+
+    def _replay(self, prompt: str) -> list[str | None]:
+        key = prompt_hash(prompt)
+        with self.lock:
+            recorded = self.entries.get(key)
+            if not recorded:
+                raise AcroError("that one isn't on the tape.")
+            entry = recorded[self.served[key] % len(recorded)]
+            self.served[key] += 1
+        if self.latency:
+            sleep(entry["latency"] * self.speed)
+        record_usage(*entry.get("usage", ()))
+        if "error" in entry:
+            raise AcroError(entry["error"])
+        return entry["responses"]
+
+    def generate_response(self, prompt: str) -> str | None:
+        return self._replay(prompt)[0]
+
+    def generate_candidates(self, prompt: str) -> list[str | None]:
+        return self._replay(prompt)
 
 
 def validate_format(word: str, expansion: str | None) -> bool:
@@ -144,6 +467,118 @@ def validate_format(word: str, expansion: str | None) -> bool:
     return False
 
 
+FILLER_WORDS = frozenset({"the", "a", "an", "and", "of", "to", "in", "on"})
+_NUMBERING = re.compile(r"^\s*(?:\d+[.):]|[-*•])\s*")
+_STRIP_CHARS = "\"'`“”‘’*_.,;:!?()[]{}"
+
+
+@dataclass
+class RepairStats:
+    """Running totals for repair_expansion, shared across the process."""
+
+    attempted: int = 0
+    repaired: int = 0
+    retries_avoided: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"attempted: {self.attempted}, repaired: {self.repaired}, "
+            f"retries avoided: {self.retries_avoided}"
+        )
+
+
+repair_stats = RepairStats()
+
+
+def _normalize_line(line: str) -> list[str]:
+    """Strips numbering, quotes and punctuation, and splits hyphenated words."""
+    line = _NUMBERING.sub("", line)
+    words = (w.strip(_STRIP_CHARS) for w in re.split(r"[\s\-–—]+", line))
+    return [w for w in words if w and w[0].isalnum()]
+
+
+def _spell_subsequence(word: str, words: list[str], max_edits: int) -> list[str] | None:
+    """
+    Finds a subsequence of words whose initials spell word, dropping at most
+    max_edits words. Filler words are preferred when choosing what to drop.
+    """
+    letters = word.lower()
+    if not 0 <= len(words) - len(letters) <= max_edits:
+        return None
+
+    @functools.cache
+    def best(i: int, j: int) -> tuple[int, tuple[int, ...]] | None:
+        # lowest cost way of spelling letters[j:] from words[i:]
+        if j == len(letters):
+            return (0, ()) if i == len(words) else best_drop(i, j)
+        if len(words) - i < len(letters) - j:
+            return None
+        options = []
+        if words[i][0].lower() == letters[j] and (keep := best(i + 1, j + 1)):
+            options.append((keep[0], (i, *keep[1])))
+        if drop := best_drop(i, j):
+            options.append(drop)
+        return min(options, default=None)
+
+    def best_drop(i: int, j: int) -> tuple[int, tuple[int, ...]] | None:
+        rest = best(i + 1, j) if i < len(words) else None
+        if rest is None:
+            return None
+        cost = 1 if words[i].lower() in FILLER_WORDS else 2
+        return (rest[0] + cost, rest[1])
+
+    found = best(0, 0)
+    return [words[i] for i in found[1]] if found else None
+
+
+def repair_expansion(word: str, expansion: str | None, max_edits: int = 2) -> str | None:
+    """
+    Attempts to fix near-miss acronyms locally rather than asking the model
+    again: stray numbering, quotes, punctuation, hyphenated words, one word
+    per line, or a few extra words. Returns None unless the repaired
+    expansion passes validate_format.
+    """
+    if not isinstance(word, str) or not isinstance(expansion, str):
+        return None
+
+    lines = [words for words in map(_normalize_line, expansion.splitlines()) if words]
+    candidates = [[w for words in lines for w in words], *lines]
+    for words in candidates:
+        found = _spell_subsequence(word, words, max_edits)
+        if found is not None and validate_format(word, repaired := " ".join(found)):
+            return repaired
+    return None
+
+
+def score_expansion(expansion: str) -> tuple[int, float]:
+    """
+    Cheap ranking heuristic for valid expansions: more distinct non-filler
+    words first, then longer words on average.
+    """
+    words = expansion.lower().split()
+    if not words:
+        return (0, 0.0)
+    return (len(set(words) - FILLER_WORDS), sum(map(len, words)) / len(words))
+
+
+def pick_candidate(
+    word: str, candidates: list[str | None], rank: bool = False, repair_edits: int | None = None
+) -> str | None:
+    """
+    Chooses among several responses to one prompt: the first valid one (or
+    with rank, the best by score_expansion), else the first that
+    repair_expansion can fix (if repair_edits is given), else the first.
+    """
+    valid = [c for c in candidates if c is not None and validate_format(word, c)]
+    if valid:
+        return max(valid, key=score_expansion) if rank else valid[0]
+    if repair_edits is not None:
+        for c in candidates:
+            if repair_expansion(word, c, repair_edits) is not None:
+                return c
+    return candidates[0] if candidates else None
+
+
 def build_prompt(word: str, convo: str = "") -> str:
     """
     Helper function for assembling the complete prompt. Provided as a 
@@ -152,6 +587,159 @@ def build_prompt(word: str, convo: str = "") -> str:
     return PROMPT_TEMPLATE.format(convo=convo, word=word)
 
 
+@dataclass
+class RetryPolicy:
+    """
+    Controls how get_acro retries a request. Invalid formats and API errors
+    (AcroError) draw from separate budgets. Delays grow exponentially from
+    base_delay, are capped at max_delay, and are randomly scaled by +/- jitter
+    (a fraction). No retry is started that would run past the deadline
+    (seconds, measured from the start of the request). When a model returns
+    several candidates per call, rank picks the best valid one by
+    score_expansion rather than the first.
+    """
+
+    format_retries: int = 0
+    error_retries: int = 0
+    base_delay: float = 1.0
+    multiplier: float = 2.0
+    max_delay: float = 8.0
+    jitter: float = 0.1
+    deadline: float | None = None
+    repair: bool = True
+    repair_edits: int = 2
+    rank: bool = False
+
+    def backoff(self, retry: int) -> float:
+        """Returns the delay in seconds before the given retry (1-based)."""
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (retry - 1))
+        return max(0.0, delay * (1 + random.uniform(-self.jitter, self.jitter)))
+
+
+@dataclass
+class AcroResult:
+    """Outcome of a single acronym request."""
+
+    expansion: str
+    is_valid: bool
+    attempts: int
+    elapsed: float
+    api_errors: int = 0
+    repaired: bool = False
+    usage: Usage = field(default_factory=Usage)
+    candidates: int = 0
+
+    @property
+    def first_try(self) -> bool:
+        """Valid on the first attempt, without repair."""
+        return self.is_valid and self.attempts == 1 and not self.repaired
+
+
+@dataclass
+class _RetryTracker:
+    """
+    Book-keeping for one request under a RetryPolicy. Shared by the sync and
+    async retry loops so they can only differ in how they call and wait.
+    """
+
+    word: str
+    policy: RetryPolicy
+    start: float = field(default_factory=perf_counter)
+    attempts: int = 0
+    format_failures: int = 0
+    api_errors: int = 0
+    expansion: str | None = None
+    is_valid: bool = False
+    repaired: bool = False
+    error: AcroError | None = None
+    usage: Usage = field(default_factory=Usage)
+    candidates: int = 0
+
+    def elapsed(self) -> float:
+        return perf_counter() - self.start
+
+    def remaining(self) -> float | None:
+        if self.policy.deadline is None:
+            return None
+        return self.policy.deadline - self.elapsed()
+
+    def record_response(self, expansion: str | None) -> bool:
+        """Records a model response. Returns True if no retry is needed."""
+        self.attempts += 1
+        self.error = None
+        self.expansion = expansion
+        self.is_valid = validate_format(self.word, expansion)
+        if not self.is_valid and self.policy.repair:
+            self._repair()
+        if self.is_valid:
+            return True
+        self.format_failures += 1
+        return self.format_failures > self.policy.format_retries
+
+    def record_candidates(self, candidates: list[str | None]) -> bool:
+        """Records a call's candidate responses, keeping the best one."""
+        self.candidates += len(candidates)
+        edits = self.policy.repair_edits if self.policy.repair else None
+        return self.record_response(
+            pick_candidate(self.word, candidates, self.policy.rank, edits)
+        )
+
+    def _repair(self) -> None:
+        repair_stats.attempted += 1
+        repaired = repair_expansion(self.word, self.expansion, self.policy.repair_edits)
+        if repaired is None:
+            return
+        logger.debug("Repaired '%s' -> '%s'", self.expansion, repaired)
+        repair_stats.repaired += 1
+        if self.format_failures < self.policy.format_retries:
+            repair_stats.retries_avoided += 1
+        self.expansion = repaired
+        self.is_valid = True
+        self.repaired = True
+
+    def record_error(self, error: AcroError) -> bool:
+        """Records a failed API call. Returns True if no retry is allowed."""
+        self.attempts += 1
+        self.api_errors += 1
+        self.error = error
+        return self.api_errors > self.policy.error_retries
+
+    def next_delay(self) -> float | None:
+        """Delay before the next attempt, or None if it would miss the deadline."""
+        delay = self.policy.backoff(self.attempts)
+        remaining = self.remaining()
+        if remaining is not None and delay >= remaining:
+            return None
+        return delay
+
+    def result(self) -> AcroResult:
+        if self.error is not None:
+            raise self.error
+        if not isinstance(self.expansion, str):
+            raise TypeError("LLM response must be a string.")
+        result = AcroResult(
+            self.expansion,
+            self.is_valid,
+            self.attempts,
+            self.elapsed(),
+            self.api_errors,
+            self.repaired,
+            self.usage,
+            self.candidates,
+        )
+        logger.info(
+            "Generated: '%s' (attempts: %d, api errors: %d, valid: %s, "
+            "elapsed: %.2fs, tokens: %d)",
+            result.expansion,
+            result.attempts,
+            result.api_errors,
+            result.is_valid,
+            result.elapsed,
+            result.usage.total_tokens,
+        )
+        return result
+
+
 def get_acro_safe(
     model: Model, word: str, convo: str = "", retries: int = 0
 ) -> tuple[str|None, bool]:
@@ -185,29 +773,257 @@ def get_acro(
     function name is rather backwards).
     """
 
-    is_valid_acro: bool = False
+    result = get_acro_result(
+        model, word, convo, RetryPolicy(format_retries=retries)
+    )
+    return (result.expansion, result.is_valid)
+
+
+def get_acro_result(
+    model: Model, word: str, convo: str = "", policy: RetryPolicy | None = None,
+    usage: Usage | None = None,
+) -> AcroResult:
+    """
+    Blocking version of the retry loop. Returns the expansion along with the
+    number of attempts made and the time spent. Tokens are counted in usage,
+    if given, even when the request fails.
+    """
+
+    tracker = _RetryTracker(word, policy or RetryPolicy())
+    if usage is not None:
+        tracker.usage = usage
+    prompt = build_prompt(convo=convo, word=word)
+    logger.info("Requested: '%s'", word)
+    logger.debug("PROMPT:\n%s", prompt)
+
+    with collect_usage(tracker.usage):
+        while True:
+            with tracing.span("llm.attempt", attempt=tracker.attempts + 1) as span:
+                try:
+                    done = tracker.record_candidates(model.generate_candidates(prompt))
+                    span.set(valid=tracker.is_valid, repaired=tracker.repaired)
+                except AcroError as e:
+                    done = tracker.record_error(e)
+                    span.set(error=e())
+            delay = None if done else tracker.next_delay()
+            if delay is None:
+                break
+            with tracing.span("retry.backoff", seconds=round(delay, 3)):
+                sleep(delay)
+
+    return tracker.result()
+
+
+async def get_acro_result_async(
+    model: Model, word: str, convo: str = "", policy: RetryPolicy | None = None,
+    usage: Usage | None = None,
+) -> AcroResult:
+    """
+    Async version of the retry loop. The blocking model call runs in a worker
+    thread and backoff delays don't hold up the event loop. If the policy has
+    a deadline, an attempt still running when it passes is abandoned.
+    """
 
+    tracker = _RetryTracker(word, policy or RetryPolicy())
+    if usage is not None:
+        tracker.usage = usage
     prompt = build_prompt(convo=convo, word=word)
-    logger.info(f"Requested: '{word}'")
-    logger.debug(f"PROMPT:\n{prompt}")
-
-    count = retries
-    while count >= 0:
-        expansion = model.generate_response(prompt)
-        is_valid_acro = validate_format(word, expansion)
-        count -= 1
-        if is_valid_acro:
-            break
-        sleep(1)
-
-    if not isinstance(expansion, str):
-        raise TypeError("LLM response must be a string.")
-
-    logger.info(
-        f"Generated: '{expansion}' (retries: {retries - count - 1}, valid: {is_valid_acro})"
+    logger.info("Requested: '%s'", word)
+    logger.debug("PROMPT:\n%s", prompt)
+
+    with collect_usage(tracker.usage):
+        while True:
+            with tracing.span("llm.attempt", attempt=tracker.attempts + 1) as span:
+                try:
+                    response = await asyncio.wait_for(
+                        call_model(model, model.generate_candidates, prompt),
+                        timeout=tracker.remaining(),
+                    )
+                except AcroError as e:
+                    done = tracker.record_error(e)
+                    span.set(error=e())
+                except TimeoutError as e:
+                    raise AcroError("that took way too long.") from e
+                else:
+                    done = tracker.record_candidates(response)
+                    span.set(valid=tracker.is_valid, repaired=tracker.repaired)
+            delay = None if done else tracker.next_delay()
+            if delay is None:
+                break
+            with tracing.span("retry.backoff", seconds=round(delay, 3)):
+                await asyncio.sleep(delay)
+
+    return tracker.result()
+
+
+BATCH_TEMPLATE = (
+    "Generate an acronym for each of the words below, inspired by the "
+    "conversation given with it.\n\n{items}\n\n"
+    "Reply with one line per word, in the form 'NUMBER. WORD: ACRONYM', and nothing else."
+)
+_BATCH_LINE = re.compile(r"^\W*(\d+)\s*[.):-]\s*(?:[^:\n]*:)?\s*(.+)$")
+
+
+def build_batch_prompt(requests: list[tuple[str, str]], template: str = BATCH_TEMPLATE) -> str:
+    """One prompt asking for an acronym for each (word, convo) request."""
+    items = "\n\n".join(
+        f"### {n}. {word} ###\n{convo or '(no conversation)'}"
+        for n, (word, convo) in enumerate(requests, 1)
     )
+    return template.format(items=items)
+
 
-    return (expansion, is_valid_acro)
+def parse_batch(words: list[str], response: str | None) -> list[str | None]:
+    """
+    Splits a batch response into an answer per word, matched by number.
+    Words without a numbered line get None.
+    """
+    answers: list[str | None] = [None] * len(words)
+    for line in (response or "").splitlines():
+        if match := _BATCH_LINE.match(line):
+            n = int(match.group(1))
+            if 1 <= n <= len(words) and answers[n - 1] is None:
+                answers[n - 1] = match.group(2).strip()
+    return answers
+
+
+async def get_acro_batch_async(
+    model: Model,
+    requests: list[tuple[str, str]],
+    policy: RetryPolicy | None = None,
+    template: str = BATCH_TEMPLATE,
+) -> tuple[list[AcroResult | None], Usage]:
+    """
+    Asks for acronyms for several (word, convo) requests in one call. Each
+    answer is validated (and repaired, if the policy allows) on its own;
+    those that fail come back as None, for the caller to retry singly.
+    Returns the results and the tokens used by the call. API errors raise
+    AcroError.
+    """
+    policy = policy or RetryPolicy()
+    words = [word for word, _ in requests]
+    usage = Usage()
+    start = perf_counter()
+    logger.info("Requested batch: %s", words)
+    with collect_usage(usage), tracing.span("llm.batch", words=len(words)) as span:
+        try:
+            response = await asyncio.wait_for(
+                call_model(model, model.generate_response, build_batch_prompt(requests, template)),
+                timeout=policy.deadline,
+            )
+        except TimeoutError as e:
+            raise AcroError("that took way too long.") from e
+        answers = parse_batch(words, response)
+
+        results: list[AcroResult | None] = []
+        for word, answer in zip(words, answers):
+            repaired = False
+            if not validate_format(word, answer) and policy.repair:
+                fixed = repair_expansion(word, answer, policy.repair_edits)
+                answer, repaired = (fixed, True) if fixed else (answer, False)
+            if answer is None or not validate_format(word, answer):
+                results.append(None)
+                continue
+            results.append(AcroResult(answer, True, 1, perf_counter() - start, 0, repaired))
+        span.set(valid=sum(r is not None for r in results))
+    return results, usage
+
+
+@dataclass
+class RouteRule:
+    """
+    Sends requests to config when the word is min_length to max_length
+    letters long, the request is one of kinds, and at least min_queue
+    requests are waiting. With min_valid_rate, the rule is skipped once the
+    config's observed first-try validity for that word length drops below it,
+    and with max_latency, if the config took longer to answer its probe.
+    """
+
+    config: str
+    min_length: int = 1
+    max_length: int | None = None
+    kinds: tuple[str, ...] | None = None
+    min_queue: int = 0
+    min_valid_rate: float | None = None
+    max_latency: float | None = None
+
+    def matches(self, length: int, kind: str, queue_depth: int) -> bool:
+        return (
+            self.min_length <= length
+            and (self.max_length is None or length <= self.max_length)
+            and (self.kinds is None or kind in self.kinds)
+            and queue_depth >= self.min_queue
+        )
+
+
+class Router:
+    """
+    Picks a config block for each request: the first rule that matches the
+    word length, request kind and queue depth, or None to use the current
+    config. Tracks first-try validity per config and word length over the
+    last window results, which rules with min_valid_rate consult once there
+    are min_samples of them. A rule skipped for low validity still takes an
+    explore fraction of its requests, so a config that recovers is noticed.
+    latency holds each config's probed latency in seconds (None if its
+    probe failed); rules for configs that failed are skipped.
+    """
+
+    def __init__(
+        self,
+        rules: list[RouteRule],
+        min_samples: int = 20,
+        window: int = 200,
+        explore: float = 0.05,
+    ) -> None:
+        self.rules = rules
+        self.min_samples = min_samples
+        self.window = window
+        self.explore = explore
+        self.stats: dict[tuple[str, int], deque[bool]] = {}
+        self.routed: Counter[str] = Counter()
+        self.latency: dict[str, float | None] = {}
+
+    def valid_rate(self, config: str, length: int) -> float | None:
+        """First-try validity of config for words of length, if known."""
+        results = self.stats.get((config, length), ())
+        return sum(results) / len(results) if len(results) >= self.min_samples else None
+
+    def pick(self, word: str, kind: str, queue_depth: int = 0) -> str | None:
+        length = len(word)
+        for rule in self.rules:
+            if not rule.matches(length, kind, queue_depth):
+                continue
+            rate = self.valid_rate(rule.config, length)
+            if (
+                rule.min_valid_rate is not None
+                and rate is not None
+                and rate < rule.min_valid_rate
+                and random.random() >= self.explore
+            ):
+                continue
+            if rule.config in self.latency:
+                latency = self.latency[rule.config]
+                if latency is None or (rule.max_latency is not None and latency > rule.max_latency):
+                    continue
+            self.routed[rule.config] += 1
+            return rule.config
+        return None
+
+    def record(self, config: str, word: str, result: AcroResult | None) -> None:
+        """Records a result of config, or None if its request failed."""
+        results = self.stats.setdefault((config, len(word)), deque(maxlen=self.window))
+        results.append(result is not None and result.first_try)
+
+    def __str__(self) -> str:
+        lines = [f"routed: {dict(self.routed)}"]
+        if self.latency:
+            lines.append(f"probed latency: {self.latency}")
+        for (config, length), results in sorted(self.stats.items()):
+            lines.append(f"{config} len {length}: {sum(results)}/{len(results)} valid first try")
+        return "\n".join(lines)
+
+
+RESERVED_KEYS = {"retry"}
 
 
 def build_model(config: str | dict[str, Any]) -> Model:
@@ -221,6 +1037,9 @@ def build_model(config: str | dict[str, Any]) -> Model:
     if isinstance(config, str):
         config = {"provider": config}
 
+    # Keys handled by the caller rather than the model class itself.
+    config = {k: v for k, v in config.items() if k not in RESERVED_KEYS}
+
     logger.debug(f"Building model with settings:\n{config}")
 
     try:
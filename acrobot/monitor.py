@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 08:23:33 2026
+
+@author: BlankAdventure
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """
+    A thread pool that keeps count of its queued, running and completed
+    calls, and of the time its threads spent running them.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.busy = 0.0
+        self.created = time.monotonic()
+
+    def submit(self, fn: Callable, /, *args: Any, **kwargs: Any) -> Future:  # type: ignore[override]
+        def run() -> Any:
+            with self.lock:
+                self.queued -= 1
+                self.running += 1
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.running -= 1
+                    self.completed += 1
+                    self.busy += time.perf_counter() - start
+
+        with self.lock:
+            self.queued += 1
+        try:
+            return super().submit(run)
+        except RuntimeError:
+            with self.lock:
+                self.queued -= 1
+            raise
+
+    def utilization(self) -> float:
+        """Fraction of thread time spent on calls since the pool was made."""
+        elapsed = time.monotonic() - self.created
+        return self.busy / (self._max_workers * elapsed) if elapsed > 0 else 0.0
+
+
+@dataclass
+class LoopStats:
+    """Running totals for LoopMonitor."""
+
+    samples: int = 0
+    lag_total: float = 0.0
+    lag_max: float = 0.0
+    blocked: int = 0
+
+    @property
+    def lag_mean(self) -> float:
+        return self.lag_total / self.samples if self.samples else 0.0
+
+
+class LoopMonitor:
+    """
+    Wakes up every interval seconds and measures how late it was: the event
+    loop lag. A lag over threshold means something blocked the loop, and is
+    logged along with the state of the default executor (the thread pool
+    behind asyncio.to_thread), which it replaces with a CountingExecutor.
+    """
+
+    def __init__(
+        self, interval: float = 0.5, threshold: float = 0.1, workers: int | None = None
+    ) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.executor = CountingExecutor(workers, thread_name_prefix="acrobot-worker")
+        self.stats = LoopStats()
+        self.last_lag = 0.0
+
+    def install(self, loop: asyncio.AbstractEventLoop) -> None:
+        loop.set_default_executor(self.executor)
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        self.install(loop)
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.record(loop.time() - start - self.interval)
+
+    def record(self, lag: float) -> None:
+        self.last_lag = max(0.0, lag)
+        self.stats.samples += 1
+        self.stats.lag_total += self.last_lag
+        self.stats.lag_max = max(self.stats.lag_max, self.last_lag)
+        if self.last_lag > self.threshold:
+            self.stats.blocked += 1
+            logger.warning("event loop blocked for %.3fs (%s)", self.last_lag, self.executor_state())
+
+    def executor_state(self) -> str:
+        return (
+            f"executor: {self.executor.running} running, {self.executor.queued} queued, "
+            f"{threading.active_count()} threads"
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"loop lag: {self.last_lag * 1000:.1f} ms now, {self.stats.lag_mean * 1000:.1f} ms "
+            f"mean, {self.stats.lag_max * 1000:.1f} ms max, blocked {self.stats.blocked} times\n"
+            f"{self.executor_state()}"
+        )
+
+
+class SamplingProfiler:
+    """
+    Samples every thread's stack each interval seconds from a background
+    thread, and writes the counts in folded-stack format (one
+    'thread;outer;...;inner count' line per stack), which flame graph tools
+    read. Sampling starts after delay seconds and runs for duration seconds,
+    or until stop() is called; the file is written when it ends.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        interval: float = 0.005,
+        delay: float = 0.0,
+        duration: float | None = None,
+    ) -> None:
+        self.path = path
+        self.interval = interval
+        self.delay = delay
+        self.duration = duration
+        self.stacks: Counter[str] = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="acrobot-profiler", daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stops sampling and waits for the file to be written."""
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def _run(self) -> None:
+        if self.stopped.wait(self.delay):
+            return
+        logger.info(f"profiling to {self.path}")
+        end = None if self.duration is None else time.monotonic() + self.duration
+        while not self.stopped.wait(self.interval):
+            self.sample()
+            if end is not None and time.monotonic() >= end:
+                break
+        self.dump()
+
+    def sample(self) -> None:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        me = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            calls = []
+            f: Any = frame
+            while f is not None:
+                code = f.f_code
+                calls.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                f = f.f_back
+            calls.append(names.get(ident, str(ident)))
+            self.stacks[";".join(reversed(calls))] += 1
+
+    def dump(self) -> None:
+        lines = [f"{stack} {n}\n" for stack, n in self.stacks.most_common()]
+        try:
+            with open(self.path, "w") as f:
+                f.writelines(lines)
+        except OSError as e:
+            logger.error(f"could not write profile to {self.path}: {e}")
+            return
+        logger.info(f"wrote {sum(self.stacks.values())} samples to {self.path}")
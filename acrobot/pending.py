@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 07:59:14 2026
+
+@author: BlankAdventure
+"""
+
+import json
+import logging
+import pathlib
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import asdict, dataclass, field
+from typing import Literal
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PendingTask:
+    """
+    A queued acronym request. Calling it runs the request; prefetched holds
+    its acronym if a batch call already produced one. The other fields are
+    what gets saved if it is still queued at shutdown.
+    """
+
+    chat_id: int | None
+    message_id: int | None
+    word: str
+    kind: Literal["acro", "keyword"]
+    enqueued: float = field(default_factory=time.time)
+    update_id: int | None = None
+    bot: str | None = None
+    prefetched: str | None = field(default=None, repr=False)
+    run: Callable[[], Awaitable[None]] | None = field(default=None, repr=False)
+
+    def __call__(self) -> Awaitable[None]:
+        assert self.run is not None
+        return self.run()
+
+    def to_dict(self) -> dict:
+        return {k: v for k, v in asdict(self).items() if k not in ("run", "prefetched")}
+
+
+def save_pending(path: str, tasks: Iterable[PendingTask]) -> int:
+    """Appends tasks to the file at path, one JSON object per line."""
+    lines = [json.dumps(task.to_dict()) + "\n" for task in tasks]
+    try:
+        with pathlib.Path(path).open("a") as f:
+            f.writelines(lines)
+    except OSError as e:
+        logger.error(f"could not save pending work to {path}: {e}")
+        return 0
+    return len(lines)
+
+
+def load_pending(path: str, max_age: float) -> list[PendingTask]:
+    """
+    Reads back (and removes) the file written by save_pending. Tasks queued
+    more than max_age seconds ago are skipped, as are unreadable lines.
+    """
+    file = pathlib.Path(path)
+    try:
+        lines = file.read_text().splitlines()
+        file.unlink()
+    except FileNotFoundError:
+        return []
+    except OSError as e:
+        logger.error(f"could not load pending work from {path}: {e}")
+        return []
+
+    cutoff = time.time() - max_age
+    tasks, stale = [], 0
+    for line in lines:
+        try:
+            task = PendingTask(**json.loads(line))
+        except (TypeError, ValueError) as e:
+            logger.warning(f"skipping pending entry {line!r}: {e}")
+            continue
+        if task.enqueued < cutoff:
+            stale += 1
+        else:
+            tasks.append(task)
+    logger.info(f"loaded {len(tasks)} pending tasks from {path} ({stale} stale)")
+    return tasks
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 07:45:21 2026
+
+@author: BlankAdventure
+"""
+
+import logging
+import time
+from collections import Counter, deque
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Literal
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolStats:
+    """Running totals for KeywordPool."""
+
+    served: int = 0
+    misses: int = 0
+    generated: int = 0
+    expired: int = 0
+
+
+class KeywordPool:
+    """
+    A few ready-made acronyms per keyword, so keyword hits can be answered
+    without waiting on the model. Entries older than ttl seconds are dropped.
+    next_keyword picks what to refill: the emptiest pool first, or with
+    priority 'popular', the most frequently hit keyword first.
+    """
+
+    def __init__(
+        self,
+        size: int = 3,
+        ttl: float = 3600,
+        priority: Literal["emptiest", "popular"] = "emptiest",
+    ) -> None:
+        self.size = size
+        self.ttl = ttl
+        self.priority = priority
+        self.pools: dict[str, deque[tuple[float, str]]] = {}
+        self.hits: Counter[str] = Counter()
+        self.stats = PoolStats()
+
+    def sync(self, keywords: Iterable[str]) -> None:
+        """Adds pools for new keywords and drops pools for removed ones."""
+        keywords = {k.lower() for k in keywords}
+        for keyword in keywords - self.pools.keys():
+            self.pools[keyword] = deque()
+        for keyword in self.pools.keys() - keywords:
+            del self.pools[keyword]
+            self.hits.pop(keyword, None)
+
+    def add(self, keyword: str, expansion: str) -> None:
+        pool = self.pools.get(keyword.lower())
+        if pool is not None and len(pool) < self.size:
+            pool.append((time.time(), expansion))
+            self.stats.generated += 1
+
+    def take(self, keyword: str, context: Iterable[str] = ()) -> str | None:
+        """
+        Removes and returns a pooled acronym for keyword, or None if there
+        isn't one. With context words, the entry sharing the most words with
+        them is preferred; otherwise the oldest goes first.
+        """
+        keyword = keyword.lower()
+        self.hits[keyword] += 1
+        pool = self._prune(keyword)
+        if not pool:
+            self.stats.misses += 1
+            return None
+
+        words = {w.lower() for w in context}
+        best = max(
+            range(len(pool)),
+            key=lambda i: (len(words & set(pool[i][1].lower().split())), -i),
+        )
+        _, expansion = pool[best]
+        del pool[best]
+        self.stats.served += 1
+        return expansion
+
+    def next_keyword(self) -> str | None:
+        """The keyword most in need of a refill, or None if all pools are full."""
+        for keyword in list(self.pools):
+            self._prune(keyword)
+        short = [k for k, pool in self.pools.items() if len(pool) < self.size]
+        if not short:
+            return None
+        if self.priority == "popular":
+            return max(short, key=lambda k: (self.hits[k], -len(self.pools[k])))
+        return min(short, key=lambda k: len(self.pools[k]))
+
+    def _prune(self, keyword: str) -> deque[tuple[float, str]] | None:
+        pool = self.pools.get(keyword)
+        if pool is not None:
+            cutoff = time.time() - self.ttl
+            while pool and pool[0][0] < cutoff:
+                pool.popleft()
+                self.stats.expired += 1
+        return pool
+
+    def __str__(self) -> str:
+        fill = ", ".join(f"{k}: {len(p)}" for k, p in sorted(self.pools.items()))
+        return f"{fill} ({self.stats})"
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 08:33:25 2026
+
+@author: BlankAdventure
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from time import perf_counter
+
+from acrobot.models import Model, RecordingModel, call_model
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProbeResult:
+    """How one config block answered the startup probe."""
+
+    config: str
+    latency: float | None = None
+    error: str | None = None
+    at: float = field(default_factory=time.time)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def to_dict(self) -> dict:
+        return {"latency": self.latency, "error": self.error}
+
+    def __str__(self) -> str:
+        if self.ok:
+            return f"{self.config}: {self.latency:.3f}s"
+        return f"{self.config}: {self.error}"
+
+
+async def probe_model(
+    config: str, model: Model, prompt: str, timeout: float
+) -> ProbeResult:
+    """
+    Times one request for prompt, which should be tiny. Errors and requests
+    taking over timeout seconds count as failures. The reply is not checked;
+    the point is to open the model's connection and see how fast it answers.
+    Offline models are ready without a call, and a RecordingModel's inner
+    model is probed directly so the probe stays out of its cassette.
+    """
+    if isinstance(model, RecordingModel):
+        model = model.inner
+    if model.offline:
+        return ProbeResult(config, 0.0)
+    start = perf_counter()
+    try:
+        await asyncio.wait_for(call_model(model, model.generate_response, prompt), timeout)
+    except TimeoutError:
+        return ProbeResult(config, error=f"timed out after {timeout}s")
+    except Exception as e:
+        return ProbeResult(config, error=f"{type(e).__name__}: {e}")
+    return ProbeResult(config, perf_counter() - start)
+
+
+async def probe_models(
+    models: Mapping[str, Model], prompt: str, timeout: float
+) -> dict[str, ProbeResult]:
+    """Probes every model at once, keyed by config name."""
+    results = await asyncio.gather(
+        *(probe_model(name, model, prompt, timeout) for name, model in models.items())
+    )
+    for result in results:
+        if result.ok:
+            logger.info(f"probe {result}")
+        else:
+            logger.warning(f"probe {result}")
+    return {result.config: result for result in results}
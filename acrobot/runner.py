@@ -8,6 +8,8 @@ import sys
 import argparse
 import logging
 
+from typing import Any
+
 from acrobot import app
 from acrobot.config import setup_logging
 
@@ -38,16 +40,135 @@ def cli(word: str, config_name: str) -> None:
     llm = build_model(config)
     print(get_acro_safe(llm, word, retries=0))
 
-def run_webhook(webhook_url: str | None, ip_addr: str, port: int) -> None:
+def evaluate(
+    words_file: str,
+    config_names: list[str],
+    contexts_file: str | None,
+    output: str,
+    concurrency: int,
+) -> None:
+    """
+    Compare model configs on latency and validity rate.
+    """
+
+    import asyncio
+
+    from acrobot.config import get_settings
+    from acrobot import evaluate as ev
+
+    settings = get_settings()
+    config_names = config_names or [settings.model.use_config]
+    words = ev.load_words(words_file)
+    contexts = ev.load_contexts(contexts_file)
+
+    logger.info(f"Evaluating {config_names} on {len(words)} words x {len(contexts)} contexts.")
+    report = asyncio.run(
+        ev.run_eval(settings, config_names, words, contexts, concurrency)
+    )
+    ev.write_report(report, output)
+    print(ev.format_summary(report))
+
+
+def loadtest(
+    profile,
+    mode: str,
+    config_name: str | None,
+    latency: float,
+    error_rate: float,
+    throttle: int | None,
+    slo: float,
+    output: str | None,
+    concurrency: list[int] | None = None,
+    poll_limit: int | None = None,
+    log_bench: str | None = None,
+    server_bench: bool = False,
+) -> None:
     """
-    Run in webhook mode.
+    Run the bot against a local Bot API stub with synthetic chat traffic.
+    With several concurrency values, runs once per value and compares them.
+    With log_bench (a log file), runs once per logging setup instead, and
+    with server_bench, once per webhook server setup.
+    """
+
+    import asyncio
+    import json
+    from dataclasses import asdict
+
+    from acrobot.config import Server, get_settings
+    from acrobot import loadtest as lt, logs
+
+    settings = get_settings()
+    if config_name is not None:
+        if config_name not in (settings.model_extra or {}):
+            raise KeyError(f"No settings found for {config_name}!")
+        settings.model.use_config = config_name
+    if throttle is not None:
+        settings.acrobot.throttle_interval = throttle
+    if poll_limit is not None:
+        settings.acrobot.poll_limit = poll_limit
+
+    def run() -> lt.LoadReport:
+        stub = lt.BotApiStub(latency=latency, error_rate=error_rate)
+        with asyncio.Runner(loop_factory=lt.loop_factory(settings.server.loop)) as runner:
+            report = runner.run(lt.run_load(settings, profile, mode, stub, slo, seed=1))
+        print(lt.format_report(report))
+        return report
+
+    reports: dict[Any, lt.LoadReport] = {}
+    if log_bench:
+        for log_mode, options in lt.LOG_MODES.items():
+            logger.info(f"Load testing in {mode} mode with {profile}, logging: {log_mode}.")
+            handler = logging.FileHandler(log_bench)
+            logs.configure(settings.logging.level, handler=handler, **options)
+            reports[log_mode] = run()
+            logs.stop()
+            handler.close()
+        setup_logging("INFO")
+        print(lt.format_sweep(reports, "logging"))
+    elif server_bench:
+        mode = "webhook"
+        for name, options in lt.server_modes().items():
+            settings.server = Server(**options)
+            logger.info(f"Load testing in webhook mode with {profile}, server: {name}.")
+            reports[name] = run()
+        print(lt.format_sweep(reports, "server"))
+    else:
+        for n in concurrency or [settings.acrobot.concurrent_updates]:
+            settings.acrobot.concurrent_updates = n
+            logger.info(f"Load testing in {mode} mode with {profile}, concurrent updates: {n}.")
+            reports[n] = run()
+        if len(reports) > 1:
+            print(lt.format_sweep(reports))
+
+    if output:
+        with open(output, "w") as f:
+            json.dump({n: asdict(r) for n, r in reports.items()}, f, indent=2)
+
+
+def run_webhook(webhook_url: str | None, ip_addr: str, port: int, **server: Any) -> None:
+    """
+    Run in webhook mode. If the config lists several bots under 'bots', they
+    are all served, with webhook_url as the base of their webhook paths.
+    server overrides the server settings in the config.
     """
     logger.info("Launching in webhook mode.")
 
     import uvicorn
 
-    bot = app.Acrowebhook(webhook_url=webhook_url)
-    uvicorn.run(bot, host=ip_addr, port=port)  # this will block
+    from acrobot.config import Server, get_settings
+
+    settings = get_settings()
+    settings.server = Server.model_validate({**settings.server.model_dump(), **server})
+    setup_logging(**settings.logging.model_dump())
+    webhook_app: app.Acrowebhook | app.Acrohost
+    if settings.bots:
+        logger.info(f"hosting bots: {', '.join(settings.bots)}")
+        webhook_app = app.Acrohost(base_url=webhook_url, settings=settings)
+    else:
+        webhook_app = app.Acrowebhook(webhook_url=webhook_url, settings=settings)
+    uvicorn.run(
+        webhook_app, host=ip_addr, port=port, **settings.server.uvicorn_options()
+    )  # this will block
 
 
 def run_polling() -> None:
@@ -55,7 +176,12 @@ def run_polling() -> None:
     Run in polling mode.
     """
     logger.info("Launching in polling mode.")
-    bot = app.Acrobot()
+
+    from acrobot.config import get_settings
+
+    settings = get_settings()
+    setup_logging(**settings.logging.model_dump())
+    bot = app.Acrobot(settings)
     bot.start(True)  # this will block
 
 
@@ -63,31 +189,121 @@ def main(argv=None):
     
     parser = argparse.ArgumentParser(prog="acrobot")
     subparsers = parser.add_subparsers(dest="command", required=True)
+
+    # options shared by every command
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--profile", help="sample stacks to this file (folded format)", default=None, type=str)
+    common.add_argument("--profile-start", help="seconds before profiling starts", default=0.0, type=float)
+    common.add_argument("--profile-duration", help="seconds to profile for (default: until exit)", default=None, type=float)
     
     # polling
-    subparsers.add_parser("polling", help='Run in polling mode.')
+    subparsers.add_parser("polling", parents=[common], help='Run in polling mode.')
     
     # webhook
-    webhook = subparsers.add_parser("webhook", help='Run in webhook mode.')
+    webhook = subparsers.add_parser("webhook", parents=[common], help='Run in webhook mode.')
     
     
     webhook.add_argument("-p", help="server port (listening)", required=True, type=int)
     webhook.add_argument("-a", help="server IP address (listening)", default="0.0.0.0", type=str)
     webhook.add_argument("-w", help="webhook URL", default=None, type=str)    
+    webhook.add_argument("--loop", help="event loop", choices=["auto", "asyncio", "uvloop"], default=None)
+    webhook.add_argument("--http", help="HTTP parser", choices=["auto", "h11", "httptools"], default=None)
+    webhook.add_argument("--backlog", help="max connections waiting to be accepted", default=None, type=int)
+    webhook.add_argument("--keep-alive", help="seconds to keep idle connections open", default=None, type=int)
+    webhook.add_argument("--limit-concurrency", help="answer 503 beyond this many requests in flight", default=None, type=int)
+    webhook.add_argument("--no-access-log", help="don't log every request", action="store_true")
+    webhook.add_argument("--fast-path", help="handle updates as a bare ASGI app", action="store_true")
     
     # word mode
-    test = subparsers.add_parser("test", help='Generate an acronym.')
+    test = subparsers.add_parser("test", parents=[common], help='Generate an acronym.')
     test.add_argument("word", type=single_word, help='A single word to acronymize')
     test.add_argument("config", nargs="?", help="optional config from config.yaml")    
 
+    # eval mode
+    eval_cmd = subparsers.add_parser("eval", parents=[common], help='Compare model configs.')
+    eval_cmd.add_argument("words", help="word list file (one word per line)")
+    eval_cmd.add_argument("configs", nargs="*", help="config blocks from config.yaml")
+    eval_cmd.add_argument("-c", help="conversation contexts file (YAML list)", default=None, type=str)
+    eval_cmd.add_argument("-o", help="results file (JSON)", default="eval_results.json", type=str)
+    eval_cmd.add_argument("-n", help="concurrent requests per config", default=4, type=int)
+
+    # load test mode
+    load = subparsers.add_parser("loadtest", parents=[common], help='Load test against a local Bot API stub.')
+    load.add_argument("config", nargs="?", help="optional config from config.yaml")
+    load.add_argument("-m", help="bot mode", choices=["webhook", "polling"], default="webhook")
+    load.add_argument("--chats", help="number of chats", default=10, type=int)
+    load.add_argument("--rate", help="messages per second (all chats)", default=5.0, type=float)
+    load.add_argument("--duration", help="seconds of traffic", default=30.0, type=float)
+    load.add_argument("--keyword-ratio", help="fraction of keyword messages", default=0.1, type=float)
+    load.add_argument("--acro-ratio", help="fraction of /acro commands", default=0.05, type=float)
+    load.add_argument("--latency", help="stub sendMessage latency (s)", default=0.05, type=float)
+    load.add_argument("--error-rate", help="fraction of sendMessage calls answered with 429", default=0.0, type=float)
+    load.add_argument("--throttle", help="override throttle_interval", default=None, type=int)
+    load.add_argument("--slo", help="reply latency target (s)", default=10.0, type=float)
+    load.add_argument(
+        "--concurrent-updates",
+        help="updates handled at once (several values to compare)",
+        nargs="+",
+        default=None,
+        type=int,
+    )
+    load.add_argument("--poll-limit", help="max updates per getUpdates call (polling)", default=None, type=int)
+    load.add_argument("--log-bench", help="compare logging setups, logging to this file", default=None, type=str)
+    load.add_argument("--server-bench", help="compare webhook server setups", action="store_true")
+    load.add_argument("-o", help="results file (JSON)", default=None, type=str)
+
     args = parser.parse_args(argv)
 
+    profiler = None
+    if args.profile:
+        from acrobot.monitor import SamplingProfiler
+
+        profiler = SamplingProfiler(
+            args.profile, delay=args.profile_start, duration=args.profile_duration
+        )
+        profiler.start()
+    try:
+        run_command(args)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+
+
+def run_command(args: argparse.Namespace) -> None:
     if args.command == "webhook":
-        run_webhook(args.w, args.a, args.p)
+        server = {
+            "loop": args.loop,
+            "http": args.http,
+            "backlog": args.backlog,
+            "timeout_keep_alive": args.keep_alive,
+            "limit_concurrency": args.limit_concurrency,
+            "access_log": False if args.no_access_log else None,
+            "fast_path": True if args.fast_path else None,
+        }
+        run_webhook(
+            args.w, args.a, args.p, **{k: v for k, v in server.items() if v is not None}
+        )
     elif args.command == "polling":
         run_polling()
     elif args.command == "test":
         cli(args.word,args.config)
+    elif args.command == "eval":
+        evaluate(args.words, args.configs, args.c, args.o, args.n)
+    elif args.command == "loadtest":
+        from acrobot.loadtest import LoadProfile
+
+        profile = LoadProfile(
+            chats=args.chats,
+            rate=args.rate,
+            duration=args.duration,
+            keyword_ratio=args.keyword_ratio,
+            acro_ratio=args.acro_ratio,
+        )
+        loadtest(
+            profile, args.m, args.config, args.latency, args.error_rate,
+            args.throttle, args.slo, args.o, args.concurrent_updates, args.poll_limit,
+            args.log_bench, server_bench=args.server_bench,
+        )
 
 if __name__ == "__main__":
     main()
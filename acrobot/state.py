@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 07:43:48 2026
+
+@author: BlankAdventure
+"""
+
+import asyncio
+import logging
+import shelve
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Hashable, Iterable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class ChatState:
+    """
+    Everything the bot remembers about one chat. Messages are kept as
+    (sender, text) tuples with interned sender names, so a chatty user costs
+    one string no matter how many messages they send. keywords is None until
+    the chat changes its trigger list, so idle chats share the bot's set.
+    summary is the rolling summary of the conversation (see Summarizer) and
+    unsummarized the number of messages added since it was last refreshed.
+    overlay holds the settings the chat has changed with /set (use_config,
+    throttle_interval, retries), as a diff over the bot's config; None
+    until it changes any. not_before is when (time.monotonic) the chat's
+    next request may run, by its own throttle_interval; it is not saved.
+    """
+
+    __slots__ = (
+        "history",
+        "keywords",
+        "summary",
+        "unsummarized",
+        "overlay",
+        "not_before",
+        "last_seen",
+        "nbytes",
+    )
+
+    def __init__(self, max_history: int) -> None:
+        self.history: deque[tuple[str, str]] = deque(maxlen=max_history)
+        self.keywords: frozenset[str] | None = None
+        self.summary: str | None = None
+        self.unsummarized = 0
+        self.overlay: dict[str, Any] | None = None
+        self.not_before = 0.0
+        self.last_seen = time.time()
+        self.nbytes = 0
+
+    def add_message(self, sender: str, message: str) -> None:
+        self.history.append((sys.intern(sender), message))
+
+    def estimate_size(self) -> int:
+        """Rough size in bytes, not counting interned sender names."""
+        size = sys.getsizeof(self) + sys.getsizeof(self.history)
+        size += sum(sys.getsizeof(t) + sys.getsizeof(t[1]) for t in self.history)
+        if self.keywords is not None:
+            size += sys.getsizeof(self.keywords) + sum(map(sys.getsizeof, self.keywords))
+        if self.summary is not None:
+            size += sys.getsizeof(self.summary)
+        if self.overlay is not None:
+            size += sys.getsizeof(self.overlay)
+        return size
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {
+            "history": list(self.history),
+            "maxlen": self.history.maxlen,
+            "keywords": self.keywords,
+            "summary": self.summary,
+            "unsummarized": self.unsummarized,
+            "overlay": self.overlay,
+            "last_seen": self.last_seen,
+        }
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.history = deque(
+            ((sys.intern(u), m) for u, m in state["history"]), maxlen=state["maxlen"]
+        )
+        self.keywords = state["keywords"]
+        self.summary = state.get("summary")
+        self.unsummarized = state.get("unsummarized", 0)
+        self.overlay = state.get("overlay")
+        self.not_before = 0.0
+        self.last_seen = state["last_seen"]
+        self.nbytes = 0
+
+
+class ChatStates:
+    """
+    Holds per-chat state within a memory budget. When the estimated total
+    exceeds max_bytes, the least recently used chats are evicted, and spilled
+    to a shelve file at path (if given) to be rehydrated on their next
+    message. Without a path, evicted chats simply start over.
+
+    Shelve I/O stays off the event loop: evicted chats wait in spilled and
+    are written in batches by a worker thread, and prefetch() loads a chat
+    in a thread before get() needs it. get() still reads the file itself
+    for a spilled chat that was not prefetched, or when no loop is running.
+    """
+
+    def __init__(
+        self, max_history: int, max_bytes: int = 16_000_000, path: str | None = None
+    ) -> None:
+        self.max_history = max_history
+        self.max_bytes = max_bytes
+        self.path = path
+        self.chats: OrderedDict[Hashable, ChatState] = OrderedDict()
+        self.spilled: dict[Hashable, ChatState] = {}
+        self.writer: asyncio.Task[None] | None = None
+        self.lock = threading.Lock()
+        self.nbytes = 0
+        self.evicted = 0
+        self.rehydrated = 0
+
+    @property
+    def resident(self) -> int:
+        return len(self.chats)
+
+    def get(self, chat_id: Hashable) -> ChatState:
+        """Returns the chat's state, loading or creating it as needed."""
+        state = self.chats.get(chat_id)
+        if state is None:
+            state = self.spilled.pop(chat_id, None) or self._read(chat_id)
+            if state is not None:
+                self._admit(chat_id, state)
+            else:
+                state = ChatState(self.max_history)
+                state.nbytes = state.estimate_size()
+                self.nbytes += state.nbytes
+                self.chats[chat_id] = state
+        self.chats.move_to_end(chat_id)
+        state.last_seen = time.time()
+        return state
+
+    async def prefetch(self, chat_id: Hashable) -> None:
+        """Loads a spilled chat in a worker thread, so get() finds it resident."""
+        if self.path is None or chat_id in self.chats or chat_id in self.spilled:
+            return
+        state = await asyncio.to_thread(self._read, chat_id)
+        if state is not None and chat_id not in self.chats:
+            self._admit(chat_id, state)
+
+    def update(self, chat_id: Hashable) -> None:
+        """
+        Re-estimates a chat's size after it has changed and evicts idle chats
+        if the budget has been exceeded.
+        """
+        state = self.chats.get(chat_id)
+        if state is None:
+            return
+        size = state.estimate_size()
+        self.nbytes += size - state.nbytes
+        state.nbytes = size
+        self._evict(keep=chat_id)
+
+    def items(self) -> Iterable[tuple[Hashable, ChatState]]:
+        return self.chats.items()
+
+    def _admit(self, chat_id: Hashable, state: ChatState) -> None:
+        self.rehydrated += 1
+        if state.history.maxlen != self.max_history:
+            state.history = deque(state.history, maxlen=self.max_history)
+        state.nbytes = state.estimate_size()
+        self.nbytes += state.nbytes
+        self.chats[chat_id] = state
+
+    def _evict(self, keep: Hashable) -> None:
+        while self.nbytes > self.max_bytes and len(self.chats) > 1:
+            chat_id, state = next(iter(self.chats.items()))
+            if chat_id == keep:
+                self.chats.move_to_end(chat_id)
+                continue
+            del self.chats[chat_id]
+            self.nbytes -= state.nbytes
+            self.evicted += 1
+            if self.path is not None:
+                self.spilled[chat_id] = state
+        if self.spilled:
+            self._spill()
+
+    def _spill(self) -> None:
+        """Starts writing spilled chats, in a thread when a loop is running."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write(self.spilled.items())
+            self.spilled.clear()
+            return
+        if self.writer is None or self.writer.done():
+            self.writer = loop.create_task(self._write_spilled())
+
+    async def _write_spilled(self) -> None:
+        # chats evicted while a batch is being written go in the next one
+        while self.spilled:
+            batch = dict(self.spilled)
+            await asyncio.to_thread(self._write, batch.items())
+            for chat_id, state in batch.items():
+                if self.spilled.get(chat_id) is state:
+                    del self.spilled[chat_id]
+
+    def _write(self, chats: Iterable[tuple[Hashable, ChatState]]) -> None:
+        if self.path is None:
+            return
+        try:
+            with self.lock, shelve.open(self.path) as db:
+                for chat_id, state in chats:
+                    db[repr(chat_id)] = state
+        except OSError as e:
+            logger.error(f"could not spill chat state: {e}")
+
+    def _read(self, chat_id: Hashable) -> ChatState | None:
+        if self.path is None:
+            return None
+        try:
+            with self.lock, shelve.open(self.path) as db:
+                return db.pop(repr(chat_id), None)
+        except OSError as e:
+            logger.error(f"could not load chat {chat_id}: {e}")
+            return None
+
+    async def flush(self) -> None:
+        """Spills every resident chat (on shutdown)."""
+        if self.path is None:
+            return
+        if self.writer is not None:
+            await self.writer
+        chats = [*self.spilled.items(), *self.chats.items()]
+        self.spilled.clear()
+        await asyncio.to_thread(self._write, chats)
+
+    def __str__(self) -> str:
+        return (
+            f"chats: {self.resident}, bytes: {self.nbytes}, "
+            f"evicted: {self.evicted}, rehydrated: {self.rehydrated}"
+        )
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 07:51:51 2026
+
+@author: BlankAdventure
+"""
+
+import asyncio
+import logging
+from collections.abc import Hashable
+
+from acrobot.models import AcroError, Model, Usage, call_model, collect_usage
+from acrobot.state import ChatState
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_TEMPLATE = (
+    "### SUMMARY SO FAR ###\n{summary}\n\n### NEW MESSAGES ###\n{convo}\n\n"
+    "Update the summary to cover the new messages. Reply with only the summary."
+)
+
+
+def format_messages(messages: list[tuple[str, str]]) -> str:
+    return "\n".join(f"{u}: {m}" for u, m in messages)
+
+
+class Summarizer:
+    """
+    Keeps a rolling summary per chat, so prompts can carry the gist of a long
+    conversation plus only the last few raw messages. After every new
+    messages a chat is queued for a refresh, which folds those messages into
+    its summary using a separate (ideally cheap) model. Refreshes are run by
+    the caller, off the request path.
+    """
+
+    def __init__(
+        self, model: Model, every: int = 5, recent: int = 2, template: str = SUMMARY_TEMPLATE
+    ) -> None:
+        self.model = model
+        self.every = every
+        self.recent = recent
+        self.template = template
+        self.pending: dict[Hashable, None] = {}
+        self.has_pending = asyncio.Event()
+        self.refreshed = 0
+        self.failed = 0
+
+    def note(self, chat_id: Hashable, state: ChatState) -> None:
+        """Counts a new message, queueing the chat for a refresh when due."""
+        state.unsummarized += 1
+        if state.unsummarized >= self.every and chat_id not in self.pending:
+            self.pending[chat_id] = None
+            self.has_pending.set()
+
+    async def next_chat(self) -> Hashable:
+        """Waits for and removes the longest-waiting chat due for a refresh."""
+        await self.has_pending.wait()
+        chat_id = next(iter(self.pending))
+        del self.pending[chat_id]
+        if not self.pending:
+            self.has_pending.clear()
+        return chat_id
+
+    async def refresh(self, state: ChatState) -> Usage:
+        """
+        Folds the chat's unsummarized messages into its summary. On failure
+        the old summary is kept, and the chat is queued again by its next
+        message. Returns the tokens used.
+        """
+        folded = state.unsummarized
+        messages = list(state.history)[-folded:] if folded else []
+        prompt = self.template.format(
+            summary=state.summary or "(none yet)", convo=format_messages(messages)
+        )
+        usage = Usage()
+        try:
+            with collect_usage(usage):
+                response = await call_model(self.model, self.model.generate_response, prompt)
+        except AcroError as e:
+            logger.warning(f"summary refresh failed: {e}")
+            self.failed += 1
+            return usage
+        except Exception as e:
+            logger.error(f"summary refresh failed: {type(e).__name__}: {e}")
+            self.failed += 1
+            return usage
+        if response:
+            state.summary = response.strip()
+            state.unsummarized = max(0, state.unsummarized - folded)
+            self.refreshed += 1
+        return usage
+
+    def convo(self, state: ChatState) -> str:
+        """
+        The conversation for a prompt: the summary followed by the messages
+        not yet folded into it (at least the last recent ones), or the raw
+        history while there is no summary.
+        """
+        messages = list(state.history)
+        if state.summary is None:
+            return format_messages(messages)
+        keep = max(self.recent, state.unsummarized)
+        recent = format_messages(messages[-keep:] if keep else [])
+        return f"(earlier): {state.summary}\n{recent}".rstrip()
+
+    def __str__(self) -> str:
+        return f"pending: {len(self.pending)}, refreshed: {self.refreshed}, failed: {self.failed}"
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 07:35:31 2026
+
+@author: BlankAdventure
+
+Lightweight span tracing. A trace is started where an update enters the bot
+(trace), nested work is recorded with span, and queued tasks carry their
+trace across the queue (carry/resume). Finished spans of sampled traces are
+buffered and appended to a JSONL file. With tracing disabled, or for traces
+not sampled, span and trace return a shared no-op object.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import pathlib
+import random
+import time
+from collections.abc import Callable
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """A single timed operation within a trace."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "end", "attrs", "_token")
+
+    def __init__(self, name: str, trace_id: str, parent_id: str | None, **attrs: Any):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start = time.time()
+        self.end: float | None = None
+        self.attrs = attrs
+        self._token: contextvars.Token | None = None
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def child(self, name: str, **attrs: Any) -> "Span":
+        return Span(name, self.trace_id, self.span_id, **attrs)
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        if self._token is not None:
+            _current.reset(self._token)
+        self.end = time.time()
+        tracer.export(self)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace": self.trace_id,
+            "span": self.span_id,
+            "parent": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "ms": round(((self.end or self.start) - self.start) * 1000, 3),
+            **self.attrs,
+        }
+
+
+class _NoopSpan:
+    """Stand-in returned when nothing is being traced."""
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+_current: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "acrobot_span", default=None
+)
+
+
+class Tracer:
+    """Decides which traces are sampled and exports their spans as JSONL."""
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        sample_rate: float = 1.0,
+        path: str = "traces.jsonl",
+        batch_size: int = 64,
+    ) -> None:
+        self.configure(enabled, sample_rate, path, batch_size)
+
+    def configure(
+        self,
+        enabled: bool = False,
+        sample_rate: float = 1.0,
+        path: str = "traces.jsonl",
+        batch_size: int = 64,
+    ) -> None:
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.path = path
+        self.batch_size = batch_size
+        self.buffer: list[dict[str, Any]] = []
+
+    def export(self, span: Span) -> None:
+        self.buffer.append(span.to_dict())
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Appends buffered spans to the JSONL file."""
+        if not self.buffer:
+            return
+        lines, self.buffer = self.buffer, []
+        try:
+            with pathlib.Path(self.path).open("a") as f:
+                f.writelines(json.dumps(line, default=str) + "\n" for line in lines)
+        except OSError as e:
+            logger.error(f"could not write traces to {self.path}: {e}")
+
+
+tracer = Tracer()
+
+
+def configure(**kwargs: Any) -> None:
+    """Configures the module-level tracer (see config.Tracing)."""
+    tracer.flush()
+    tracer.configure(**kwargs)
+
+
+def trace(name: str, **attrs: Any) -> Span | _NoopSpan:
+    """
+    Starts a new trace, subject to sampling, or a child span if a trace is
+    already active.
+    """
+    parent = _current.get()
+    if parent is not None:
+        return parent.child(name, **attrs)
+    if not tracer.enabled or random.random() >= tracer.sample_rate:
+        return _NOOP
+    return Span(name, os.urandom(16).hex(), None, **attrs)
+
+
+def span(name: str, **attrs: Any) -> Span | _NoopSpan:
+    """Starts a child span of the active trace. Does nothing outside a trace."""
+    parent = _current.get()
+    if parent is None:
+        return _NOOP
+    return parent.child(name, **attrs)
+
+
+def carry(task: Callable) -> Callable:
+    """
+    Tags a task about to be queued with the active span and the enqueue
+    time, so resume can continue the trace when it is dequeued.
+    """
+    parent = _current.get()
+    if parent is not None:
+        task.trace_parent = (parent, time.time())  # type: ignore[attr-defined]
+    return task
+
+
+@contextmanager
+def resume(task: Callable, wait_name: str = "queue.wait") -> Iterator[None]:
+    """
+    Re-activates the trace a queued task was carried with, recording the
+    time it spent waiting in the queue.
+    """
+    parent, enqueued = getattr(task, "trace_parent", (None, 0.0))
+    if parent is None:
+        yield
+        return
+
+    wait = parent.child(wait_name)
+    wait.start, wait.end = enqueued, time.time()
+    tracer.export(wait)
+
+    token = _current.set(parent)
+    try:
+        yield
+    finally:
+        _current.reset(token)
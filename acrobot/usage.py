@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 07:49:36 2026
+
+@author: BlankAdventure
+"""
+
+import json
+import logging
+import pathlib
+import time
+from collections.abc import Hashable
+
+from acrobot.models import Usage
+
+logger = logging.getLogger(__name__)
+
+# Slots of a bucket: prompt, completion and reasoning tokens, then requests.
+PROMPT, COMPLETION, REASONING, REQUESTS = range(4)
+
+
+class UsageLedger:
+    """
+    Token totals per chat and per config block, bucketed into fixed time
+    windows of window seconds. Each bucket is a plain four-slot list. Every
+    flush_interval seconds, buckets that changed are appended to a JSONL file
+    at path (if given) and buckets more than retention windows old are
+    dropped. With a chat_budget, a chat that has used that many tokens in the
+    current window is over budget until the next window starts.
+    """
+
+    def __init__(
+        self,
+        window: float = 3600,
+        retention: int = 24,
+        chat_budget: int | None = None,
+        path: str | None = None,
+        flush_interval: float = 60,
+    ) -> None:
+        self.window = window
+        self.retention = retention
+        self.chat_budget = chat_budget
+        self.path = path
+        self.flush_interval = flush_interval
+        self.buckets: dict[tuple[str, Hashable, int], list[int]] = {}
+        self.dirty: set[tuple[str, Hashable, int]] = set()
+        self.last_flush = time.time()
+
+    def window_of(self, when: float | None = None) -> int:
+        return int((time.time() if when is None else when) // self.window)
+
+    def record(self, chat_id: Hashable, config: str, usage: Usage) -> None:
+        window = self.window_of()
+        for key in (("chat", chat_id, window), ("config", config, window)):
+            bucket = self.buckets.setdefault(key, [0, 0, 0, 0])
+            bucket[PROMPT] += usage.prompt_tokens
+            bucket[COMPLETION] += usage.completion_tokens
+            bucket[REASONING] += usage.reasoning_tokens
+            bucket[REQUESTS] += 1
+            self.dirty.add(key)
+        if time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def used(self, kind: str, key: Hashable) -> int:
+        """Tokens used by a chat or config block in the current window."""
+        bucket = self.buckets.get((kind, key, self.window_of()))
+        return sum(bucket[:REQUESTS]) if bucket else 0
+
+    def over_budget(self, chat_id: Hashable) -> bool:
+        return self.chat_budget is not None and self.used("chat", chat_id) >= self.chat_budget
+
+    def flush(self) -> None:
+        """Writes changed buckets out and drops the ones past retention."""
+        self.last_flush = time.time()
+        cutoff = self.window_of() - self.retention
+        for stale in [k for k in self.buckets if k[2] <= cutoff]:
+            del self.buckets[stale]
+        self.dirty &= self.buckets.keys()
+        if self.path is None or not self.dirty:
+            self.dirty.clear()
+            return
+
+        lines = []
+        for kind, key, window in sorted(self.dirty, key=str):
+            bucket = self.buckets[(kind, key, window)]
+            row = {
+                "kind": kind,
+                "key": key,
+                "window_start": window * self.window,
+                "prompt": bucket[PROMPT],
+                "completion": bucket[COMPLETION],
+                "reasoning": bucket[REASONING],
+                "requests": bucket[REQUESTS],
+            }
+            lines.append(json.dumps(row, default=str) + "\n")
+        self.dirty.clear()
+        try:
+            with pathlib.Path(self.path).open("a") as f:
+                f.writelines(lines)
+        except OSError as e:
+            logger.error(f"could not write usage to {self.path}: {e}")
+
+    def summary(self, chat_id: Hashable) -> str:
+        """The chat's usage and budget, plus every config's, for this window."""
+        window = self.window_of()
+        budget = "" if self.chat_budget is None else f" of {self.chat_budget}"
+        lines = [f"this chat: {self.used('chat', chat_id)}{budget} tokens"]
+        for (kind, key, w), bucket in sorted(self.buckets.items(), key=str):
+            if kind == "config" and w == window:
+                lines.append(
+                    f"{key}: {bucket[PROMPT]} prompt, {bucket[COMPLETION]} completion, "
+                    f"{bucket[REASONING]} reasoning ({bucket[REQUESTS]} requests)"
+                )
+        return "\n".join(lines)
@@ -67,6 +67,7 @@ def dummy_bot(default_config):
 @pytest.fixture
 def mock_update():
     mock = MagicMock()
+    mock.effective_chat = None
     mock.message = MagicMock()
     mock.message.reply_text = AsyncMock()
     return mock
@@ -5,10 +5,26 @@ Created on Fri Sep 19 16:48:10 2025
 @author: BlankAdventure
 """
 
+import asyncio
+import itertools
+import json
 import time
+import httpx
 import pytest
 from unittest.mock import MagicMock, call, ANY, patch
-from acrobot.app import match_words, Acrobot
+from acrobot.app import (
+    match_words,
+    Acrobot,
+    Acrohost,
+    Acrowebhook,
+    ChatUpdateProcessor,
+    ReplySender,
+    SHUTDOWN_ERROR,
+)
+from acrobot.models import record_usage
+from acrobot.pending import PendingTask
+from telegram import Update
+from telegram.error import NetworkError, RetryAfter
 
 
 def test_match_words_found():
@@ -48,6 +64,22 @@ def test_update_history(dummy_bot):
     assert dummy_bot.history[-1] == ("user_9", "message_9")
 
 
+def test_per_chat_state(dummy_bot):
+    dummy_bot._update_history("bob", "hello", chat_id=1)
+    dummy_bot._update_history("ann", "hi", chat_id=2)
+    assert list(dummy_bot._history(1)) == [("bob", "hello")]
+    assert list(dummy_bot._history(2)) == [("ann", "hi")]
+    assert len(dummy_bot.history) == 0
+
+    # chats inherit the bot's keywords until they change their own
+    dummy_bot._add_keywords(["party"], chat_id=1)
+    assert dummy_bot._keywords(1) == {"beer", "hash", "party"}
+    assert dummy_bot._keywords(2) == {"beer", "hash"}
+    dummy_bot._del_keywords(["beer"], chat_id=2)
+    assert dummy_bot._keywords(2) == {"hash"}
+    assert dummy_bot.keywords == {"beer", "hash"}
+
+
 async def test_command_start_sends_intro(dummy_bot, mock_update, mock_context):
     await dummy_bot.command_start(mock_update, mock_context)
     mock_update.message.reply_text.assert_awaited_once_with(
@@ -184,5 +216,552 @@ async def test_command_acro_timing(
 
     assert mock_update.message.reply_text.mock_calls == expected
 
-    # 2 second throttle interval x 2 + 1 sec retry loop delay.
-    assert duration == pytest.approx(5, abs=0.15)
+    # 2 second throttle interval x 2. The invalid "dog" acronym uses up its
+    # only attempt, so there is no retry delay.
+    assert duration == pytest.approx(4, abs=0.15)
+
+
+# API errors from the configured model fall through to the fallback config.
+@patch("conftest.api_call")
+async def test_fallback_model(mock_call, default_config, mock_update, mock_context):
+    default_config["acrobot"]["throttle_interval"] = 0
+    default_config["model"]["fallback"] = "local"
+    default_config["local"] = {"provider": "LocalModel", "seed": 1}
+
+    bot = Acrobot(default_config, start_telegram=False)
+    mock_call.configure_mock(side_effect=ValueError("naked"))
+    mock_context.args = ["cow"]
+
+    bot.start(run_polling=False)
+    await bot.command_acro(mock_update, mock_context)
+    await bot.complete(stop=True)
+
+    response = mock_update.message.reply_text.await_args.args[0]
+    assert response != "user_message"
+    assert "".join(w[0] for w in response.lower().split()) == "cow"
+
+
+# Once a chat uses up its token budget it is served by the budget model.
+@patch("conftest.api_call")
+async def test_chat_budget(mock_call, default_config):
+    default_config["usage"] = {"chat_budget": 100}
+    bot = Acrobot(default_config, start_telegram=False)
+
+    def respond():
+        record_usage(prompt=80, completion=30)
+        return "Cool Awesome Tiger"
+
+    mock_call.side_effect = respond
+    assert await bot._generate_acro("cat", chat_id=1) == "Cool Awesome Tiger"
+    assert bot.usage.over_budget(1)
+    assert not bot.usage.over_budget(2)
+
+    response = await bot._generate_acro("cow", chat_id=1)
+    assert response != "Cool Awesome Tiger"
+    assert mock_call.call_count == 1
+    assert bot.usage.used("config", "testconf") == 110
+    assert "this chat: 110 of 100 tokens" in bot.usage.summary(1)
+
+
+# Requests still queued at the drain deadline are saved and retried on the next start.
+@patch("conftest.api_call")
+async def test_drain_deadline(mock_call, default_config, mock_update, mock_context, tmp_path):
+    default_config["acrobot"].update(
+        throttle_interval=1, drain_deadline=0.3, pending_path=str(tmp_path / "pending.jsonl")
+    )
+    mock_call.return_value = "Cool Awesome Tiger"
+    mock_update.effective_chat = MagicMock(id=-5)
+    mock_update.message.message_id = 42
+    mock_update.update_id = 7
+
+    bot = Acrobot(default_config, start_telegram=False)
+    bot.start(run_polling=False)
+    for word in ("cat", "cow", "pig"):
+        mock_context.args = [word]
+        await bot.command_acro(mock_update, mock_context)
+    start = time.perf_counter()
+    await bot.complete(stop=True)
+    assert time.perf_counter() - start < 0.6
+
+    bot = Acrobot(default_config, start_telegram=False)
+    bot._restore_pending()
+    restored = [bot.queue.get_nowait() for _ in range(bot.queue.qsize())]
+    assert [(t.chat_id, t.message_id, t.word, t.kind) for t in restored] == [
+        (-5, 42, "cow", "acro"),
+        (-5, 42, "pig", "acro"),
+    ]
+    bot._restore_pending()  # the file is consumed
+    assert bot.queue.empty()
+
+
+# A flood-limited chat keeps its own order but doesn't hold up other chats.
+async def test_reply_sender_per_chat():
+    sender = ReplySender(max_concurrent=4, max_attempts=3)
+    sent = []
+    flood = [RetryAfter(1)]
+
+    async def deliver(chat, text):
+        if chat == "a" and flood:
+            raise flood.pop()
+        sent.append((chat, text, time.perf_counter()))
+
+    start = time.perf_counter()
+    for text in ["1", "2", "3"]:
+        sender.send("a", lambda t=text: deliver("a", t))
+        sender.send("b", lambda t=text: deliver("b", t))
+    await sender.join()
+
+    assert [t for c, t, _ in sent if c == "a"] == ["1", "2", "3"]
+    assert [t for c, t, _ in sent if c == "b"] == ["1", "2", "3"]
+    assert all(when - start < 0.5 for c, _, when in sent if c == "b")
+    assert all(when - start >= 1 for c, _, when in sent if c == "a")
+    assert sender.stats.sent == 6
+    assert sender.stats.flood_waits == 1
+    assert not sender.lanes and not sender.workers
+
+
+async def test_reply_sender_bounded_retries():
+    sender = ReplySender(max_attempts=2)
+    calls = []
+
+    async def deliver():
+        calls.append(1)
+        raise NetworkError("down")
+
+    sender.send(1, deliver)
+    await sender.join()
+
+    assert len(calls) == 2
+    assert sender.stats.failed == 1
+    assert sender.stats.retries == 1
+
+
+# Updates for different chats overlap; updates for one chat stay in order.
+async def test_chat_update_processor():
+    processor = ChatUpdateProcessor(max_concurrent=4)
+    events = []
+
+    async def handle(chat, n, delay):
+        events.append(("start", chat, n))
+        await asyncio.sleep(delay)
+        events.append(("end", chat, n))
+
+    def update(chat):
+        return MagicMock(spec=Update, effective_chat=MagicMock(id=chat))
+
+    jobs = [(1, 1, 0.05), (1, 2, 0.0), (2, 1, 0.01)]
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(processor.process_update(update(c), handle(c, n, d)) for c, n, d in jobs)
+    )
+
+    assert time.perf_counter() - start < 0.09
+    chat1 = [e for e in events if e[1] == 1]
+    assert chat1 == [("start", 1, 1), ("end", 1, 1), ("start", 1, 2), ("end", 1, 2)]
+    assert events.index(("end", 2, 1)) < events.index(("end", 1, 1))
+    assert processor.processed == 3
+    assert not processor.locks
+
+
+# The JSON API runs words through the queue, answers from the keyword pool
+# where it can, and reports each word separately.
+@patch("conftest.api_call")
+async def test_api_acro(mock_call, default_config, monkeypatch):
+    default_config["acrobot"]["throttle_interval"] = 0
+    default_config["api"] = {"enabled": True, "token": "acro_api_token", "max_batch": 3}
+    default_config["acrobot"]["keywords"] = ["beer"]
+    default_config["model"]["retry"] = {"base_delay": 0}
+    default_config["pregen"] = {"enabled": True, "pool_size": 1}
+    monkeypatch.setenv("acro_api_token", "s3cret")
+    monkeypatch.setenv("dummy_key", "123:abc")
+    mock_call.side_effect = lambda: "Cool Awesome Tiger"
+
+    bot = Acrowebhook(settings=default_config)
+    bot.pool.add("beer", "Bring Everyone Extra Refreshments")
+    bot.start(run_polling=False)
+    transport = httpx.ASGITransport(app=bot)
+    headers = {"Authorization": "Bearer s3cret"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.post("/v1/acro", json={"words": "cat"})).status_code == 401
+        response = await client.post("/v1/acro", json={"words": list("abcd")}, headers=headers)
+        assert response.status_code == 413
+        response = await client.post(
+            "/v1/acro", json={"words": "cat", "config": "nope"}, headers=headers
+        )
+        assert response.status_code == 404
+
+        response = await client.post(
+            "/v1/acro", json={"words": ["cat", "beer", "dog"]}, headers=headers
+        )
+        cat, beer, dog = response.json()["results"]
+        assert cat["expansion"] == "Cool Awesome Tiger" and cat["is_valid"]
+        assert beer["cached"] and beer["expansion"].startswith("Bring")
+        assert not dog["is_valid"] and dog["error"] is None
+
+        response = await client.post(
+            "/v1/acro",
+            json={"words": ["cat", "2"], "config": "config_2", "stream": True},
+            headers=headers,
+        )
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert sorted(r["index"] for r in rows) == [0, 1]
+        assert {r["error"] for r in rows} == {None, "not a word"}
+    await bot.complete(stop=True)
+    assert "dog" not in str(mock_call.call_args_list)
+
+
+# Hosted bots keep their own keywords, pools and telegram apps but share the
+# queue and models; saved requests go back to the bot that received them.
+@patch("conftest.api_call")
+async def test_acrohost(mock_call, default_config, monkeypatch, mock_update, mock_context, tmp_path):
+    default_config["acrobot"].update(
+        throttle_interval=1, drain_deadline=0.1, pending_path=str(tmp_path / "pending.jsonl")
+    )
+    default_config["pregen"] = {"enabled": True}
+    default_config["bots"] = {
+        "one": {"telegram_key": "key_1", "keywords": ["pizza"]},
+        "two": {"telegram_key": "key_2", "use_config": "config_2"},
+    }
+    monkeypatch.setenv("key_1", "1:abc")
+    monkeypatch.setenv("key_2", "2:abc")
+    mock_call.return_value = "Cool Awesome Tiger"
+    mock_update.effective_chat = MagicMock(id=-5)
+    mock_update.message.message_id = 42
+    mock_update.update_id = 7
+
+    host = Acrohost(settings=default_config)
+    one, two = host.bots["one"], host.bots["two"]
+    assert one.queue is two.queue and one.pool is not two.pool
+    assert one.telegram_app.bot.token == "1:abc" and two.telegram_app.bot.token == "2:abc"
+    assert two.config_name == "config_2" and one.models is two.models
+    assert set(one.pool.pools) == {"pizza"}
+    assert set(two.pool.pools) == {"beer", "hash"}
+
+    # bots take turns at refills, each with its own config
+    assert one._next_refill() == (one, "pizza")
+    bot, keyword = one._next_refill()
+    assert bot is two and two.llm is two.models["config_2"][0]
+    mock_call.return_value = "Big Eager Elves Run"
+    await two._refill_pool("beer")
+    assert len(two.pool.pools["beer"]) == 1
+    mock_call.return_value = "Cool Awesome Tiger"
+    assert set(host.openapi()["paths"]) == {"/one", "/two", "/healthz", "/readyz"}
+
+    one.start(run_polling=False)
+    for bot in (one, two, two):
+        mock_context.args = ["cat"]
+        await bot.command_acro(mock_update, mock_context)
+    await one.complete(stop=True)
+
+    host = Acrohost(settings=default_config)
+    host.bots["one"]._restore_pending()
+    restored = [host.bots["one"].queue.get_nowait() for _ in range(2)]
+    assert [t.bot for t in restored] == ["two", "two"]
+    assert restored[0].run is not None
+
+
+# Routing rules pick the config block per request; unmatched requests use
+# the current config.
+@patch("conftest.api_call")
+async def test_routing(mock_call, default_config):
+    default_config["routing"] = {
+        "enabled": True,
+        "rules": [{"config": "config_2", "max_length": 3, "kinds": ["keyword"]}],
+    }
+    mock_call.return_value = "Cool Awesome Tiger"
+    bot = Acrobot(default_config, start_telegram=False)
+
+    await bot._generate_acro("cat", chat_id=1, kind="keyword")
+    await bot._generate_acro("cat", chat_id=1)
+    assert "config_2: 0 prompt, 0 completion, 0 reasoning (1 requests)" in bot.usage.summary(1)
+    assert bot.model_router.routed["config_2"] == 1
+    assert {k: list(v) for k, v in bot.model_router.stats.items()} == {
+        ("config_2", 3): [True],
+        ("testconf", 3): [True],
+    }
+    assert "config_2" in bot.models
+
+
+# Queued requests are answered by one batch call; only the one it got wrong
+# goes to the model again.
+@patch("conftest.api_call")
+async def test_batch(mock_call, default_config, mock_update, mock_context):
+    default_config["acrobot"]["throttle_interval"] = 0
+    default_config["batch"] = {"enabled": True}
+    mock_call.side_effect = [
+        "1. cat: Cool Awesome Tiger\n2. dog: Dark Old Goat\n3. pig: Pink",
+        "Purple Iguana Gym",
+    ]
+    bot = Acrobot(default_config, start_telegram=False)
+    for word in ("cat", "dog", "pig"):
+        mock_context.args = [word]
+        await bot.command_acro(mock_update, mock_context)
+    bot.start(run_polling=False)
+    await bot.complete(stop=True)
+
+    replies = [c.args[0] for c in mock_update.message.reply_text.await_args_list]
+    assert replies == ["Cool Awesome Tiger", "Dark Old Goat", "Purple Iguana Gym"]
+    assert mock_call.call_count == 2
+
+
+# An unexpected error from the batch call falls back to single calls rather
+# than stopping the queue processor.
+@patch("conftest.api_call")
+async def test_batch_error(mock_call, default_config, mock_update, mock_context):
+    default_config["acrobot"]["throttle_interval"] = 0
+    default_config["batch"] = {"enabled": True}
+    mock_call.side_effect = [RuntimeError("502"), "Cool Awesome Tiger", "Dark Old Goat"]
+    bot = Acrobot(default_config, start_telegram=False)
+    for word in ("cat", "dog"):
+        mock_context.args = [word]
+        await bot.command_acro(mock_update, mock_context)
+    bot.start(run_polling=False)
+    await bot.complete(stop=True)
+
+    replies = [c.args[0] for c in mock_update.message.reply_text.await_args_list]
+    assert replies == ["Cool Awesome Tiger", "Dark Old Goat"]
+    assert not bot.backlog
+
+
+# Models that can't answer the batch prompt are never sent one.
+async def test_batch_unsupported(default_config, mock_update, mock_context):
+    default_config["acrobot"]["throttle_interval"] = 0
+    default_config["batch"] = {"enabled": True, "window": 1}
+    default_config["model"]["use_config"] = "local"
+    default_config["local"] = {"provider": "LocalModel", "seed": 1}
+    bot = Acrobot(default_config, start_telegram=False)
+    for word in ("cat", "dog"):
+        mock_context.args = [word]
+        await bot.command_acro(mock_update, mock_context)
+
+    with patch.object(bot, "_prefetch_batch") as prefetch:
+        start = time.monotonic()
+        bot.start(run_polling=False)
+        await bot.complete(stop=True)
+    prefetch.assert_not_called()
+    assert time.monotonic() - start < 1  # no batch window waited out
+    replies = [c.args[0] for c in mock_update.message.reply_text.await_args_list]
+    assert ["".join(w[0] for w in r.lower().split()) for r in replies] == ["cat", "dog"]
+
+
+# /set changes only the chat it is sent in, and reuses the shared model.
+@patch("conftest.api_call")
+async def test_chat_overlay(mock_call, dummy_bot, mock_update, mock_context, caplog):
+    mock_call.return_value = "Cool Awesome Tiger"
+    mock_update.effective_chat = MagicMock(id=1)
+    for args in (
+        ["config_2"],
+        ["retries", "3"],
+        ["throttle_interval", "0"],
+        ["throttle_interval", "1e9"],
+        ["throttle_interval", "inf"],
+        ["retries", "-1"],
+    ):
+        mock_context.args = args
+        await dummy_bot.command_set(mock_update, mock_context)
+    replies = [c.args[0] for c in mock_update.message.reply_text.await_args_list]
+    # throttle_interval is kept between the bot's (5) and max_chat_throttle
+    assert replies == [
+        "Model config updated.",
+        "retries set to 3.",
+        "throttle_interval set to 5.",
+        "throttle_interval set to 300.",
+        "Invalid value for throttle_interval",
+        "Invalid value for retries",
+    ]
+
+    config_name, llm, policy = dummy_bot._chat_model(1)
+    assert (config_name, policy.format_retries) == ("config_2", 3)
+    assert llm is dummy_bot.models["config_2"][0]
+    assert dummy_bot._chat_model(2) == ("testconf", dummy_bot.llm, dummy_bot.retry_policy)
+    assert dummy_bot._chat_throttle(1) == 300
+    assert dummy_bot._chat_throttle(2) == 5
+
+    await dummy_bot._generate_acro("cat", chat_id=1)
+    await dummy_bot._generate_acro("cat", chat_id=2)
+    assert "config_2" in dummy_bot.usage.summary(1)
+    assert "testconf" in dummy_bot.usage.summary(2)
+
+    mock_update.message.reply_text.reset_mock()
+    await dummy_bot.command_info(mock_update, mock_context)
+    info = mock_update.message.reply_text.await_args.args[0]
+    assert "use_config: config_2 (this chat)\nthrottle_interval: 300 (this chat)" in info
+    assert "--REPAIRS--\nattempted: " in caplog.text
+
+    mock_context.args = ["reset"]
+    await dummy_bot.command_set(mock_update, mock_context)
+    assert dummy_bot.chats.get(1).overlay is None
+
+
+# /readyz only reports ready once the bot is serving and its model has
+# answered the probe; failed probes are retried and reach the router.
+@patch("conftest.api_call")
+async def test_readyz(mock_call, default_config, monkeypatch):
+    monkeypatch.setenv("dummy_key", "123:abc")
+    default_config["probe"] = {"enabled": True, "timeout": 1.0, "retry_interval": 0.01}
+    default_config["routing"] = {"enabled": True, "rules": [{"config": "config_2"}]}
+
+    calls = itertools.count(1)
+
+    def respond():
+        if next(calls) <= 3:
+            raise ValueError("cold")
+        return "OK"
+
+    mock_call.side_effect = respond
+    bot = Acrowebhook(settings=default_config)
+    assert bot._used_configs() == ["testconf", "config_2"]
+
+    transport = httpx.ASGITransport(app=bot)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.get("/healthz")).json() == {"status": "ok"}
+        assert (await client.get("/readyz")).status_code == 503
+
+        bot.serving = True
+        await bot._probe()
+        response = await client.get("/readyz")
+        assert response.status_code == 200
+        assert response.json()["ready"] is True
+        assert set(response.json()["probes"]) == {"testconf", "config_2"}
+    assert mock_call.call_count == 5
+    assert bot.probed.is_set()
+    # config_2 is re-probed too, so the router picks it again once it answers
+    assert bot.model_router.latency["config_2"] is not None
+    assert bot.model_router.pick("cat", "acro") == "config_2"
+
+
+# A LocalModel block is ready without answering the probe prompt.
+async def test_readyz_local(default_config, monkeypatch):
+    monkeypatch.setenv("dummy_key", "123:abc")
+    default_config["model"]["use_config"] = "local"
+    default_config["local"] = {"provider": "LocalModel"}
+    default_config["probe"] = {"enabled": True, "retry_interval": 0.01}
+    bot = Acrowebhook(settings=default_config)
+    bot.serving = True
+    await asyncio.wait_for(bot._probe(), 1)
+    assert bot.probes["local"].ok
+    assert bot.is_ready()
+
+
+# With server.fast_path, updates skip FastAPI; other routes still use it.
+async def test_fast_path(default_config, monkeypatch):
+    monkeypatch.setenv("dummy_key", "123:abc")
+    default_config["server"] = {"fast_path": True}
+    bot = Acrowebhook(settings=default_config)
+    processed = []
+
+    async def process_update(update):
+        processed.append(update.update_id)
+
+    monkeypatch.setattr(type(bot.telegram_app), "process_update", lambda _, u: process_update(u))
+    transport = httpx.ASGITransport(app=bot)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/", json={"update_id": 7})
+        assert (response.status_code, response.content) == (200, b"")
+        assert (await client.post("/", content=b"{nope")).status_code == 400
+        assert (await client.get("/healthz")).json() == {"status": "ok"}
+    assert processed == [7]
+
+
+# A cancelled API request must not take the queue processor down with it,
+# and unexpected errors become per-row errors.
+@patch("conftest.api_call")
+async def test_api_cancelled(mock_call, default_config, monkeypatch):
+    monkeypatch.setenv("dummy_key", "123:abc")
+    default_config["acrobot"]["throttle_interval"] = 0
+    mock_call.side_effect = lambda: time.sleep(0.05) or "Cool Awesome Tiger"
+    bot = Acrowebhook(settings=default_config)
+    bot.start(run_polling=False)
+    await asyncio.sleep(0)
+
+    task = asyncio.create_task(bot._api_result(0, "cat", "", None))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    await bot.queue.join()
+    assert not bot.task_qp.done()
+
+    mock_call.side_effect = TypeError("boom")
+    row = await bot._api_result(0, "cat", "", None)
+    assert row["error"] == "internal error"
+    assert not bot.task_qp.done()
+    await bot.complete(stop=True)
+
+
+# At the drain deadline, API requests still queued fail instead of hanging,
+# and replies that never went out are logged.
+@patch("conftest.api_call")
+async def test_drain_api(mock_call, default_config, monkeypatch, caplog):
+    monkeypatch.setenv("dummy_key", "123:abc")
+    default_config["acrobot"].update(throttle_interval=1, drain_deadline=0.1)
+    default_config["api"] = {"enabled": True}
+    mock_call.return_value = "Cool Awesome Tiger"
+    bot = Acrowebhook(settings=default_config)
+    bot.start(run_polling=False)
+
+    tasks = [asyncio.create_task(bot._api_result(i, "cat", "", None)) for i in range(3)]
+    bot.sender.send(-5, lambda: asyncio.sleep(10))
+    await asyncio.sleep(0.01)
+    await bot.complete(stop=True)
+    rows = await asyncio.wait_for(asyncio.gather(*tasks), 1)
+
+    assert rows[0]["error"] is None
+    assert [row["error"] for row in rows[1:]] == [SHUTDOWN_ERROR, SHUTDOWN_ERROR]
+    assert not bot.api_waiting
+    assert "dropping 1 unsent replies in 1 chats" in caplog.text
+    for worker in bot.sender.workers.values():
+        worker.cancel()
+
+
+# A chat's own throttle holds back only that chat's next request; the others
+# carry on, and held requests still run before the queue stops.
+async def test_chat_throttle(default_config):
+    default_config["acrobot"]["throttle_interval"] = 0
+    bot = Acrobot(default_config, start_telegram=False)
+    bot.chats.get(1).overlay = {"throttle_interval": 0.2}
+    ran = []
+
+    def task(chat_id, word):
+        pending = PendingTask(chat_id, 1, word, "acro")
+
+        async def run():
+            ran.append((word, time.monotonic()))
+
+        pending.run = run
+        return pending
+
+    start = time.monotonic()
+    for chat_id, word in ((1, "a"), (1, "b"), (2, "c")):
+        await bot.queue.put(task(chat_id, word))
+    bot.start(run_polling=False)
+    await bot.complete(stop=True)
+
+    assert [word for word, _ in ran] == ["a", "c", "b"]
+    assert ran[1][1] - start < 0.1
+    assert ran[2][1] - ran[0][1] >= 0.2
+
+
+# Tokens spent by a failed attempt are charged to the config that spent them,
+# along with the fallback's.
+@patch("conftest.api_call")
+async def test_usage_on_fallback(mock_call, default_config):
+    default_config["model"]["fallback"] = "config_2"
+    default_config["model"]["retry"] = {"base_delay": 0}
+    default_config["config_2"]["retry"] = {"error_retries": 1}
+    default_config["routing"] = {"enabled": True}
+    bot = Acrobot(default_config, start_telegram=False)
+
+    def respond():
+        record_usage(10, 5)
+        if mock_call.call_count <= 2:
+            raise ValueError("down")
+        return "Cool Awesome Tiger"
+
+    # the fallback retries by its own block's policy
+    mock_call.side_effect = respond
+    assert await bot._generate_acro("cat", chat_id=1) == "Cool Awesome Tiger"
+    summary = bot.usage.summary(1)
+    assert "testconf: 10 prompt, 5 completion" in summary
+    assert "config_2: 20 prompt, 10 completion" in summary
+    # the failure is held against the config that was asked, not the fallback
+    assert {k: list(v) for k, v in bot.model_router.stats.items()} == {("testconf", 3): [False]}
@@ -9,7 +9,7 @@ from unittest.mock import patch
 
 import pytest
 
-from acrobot.config import is_url, load_yaml, DEFAULT_PATH
+from acrobot.config import is_url, load_yaml, Config, DEFAULT_PATH
 
 
 @pytest.mark.parametrize(
@@ -39,4 +39,58 @@ def test_url_invocation(mock_call):
     mock_call.assert_called_once_with("http://targetsite.com/file.yaml")
 
 
-    
\ No newline at end of file
+def test_retry_settings(default_config):
+    default_config["model"]["retry"] = {"error_retries": 2, "base_delay": 0.5}
+    default_config["config_2"]["retry"] = {"base_delay": 3, "format_retries": 4}
+    settings = Config(**default_config)
+
+    retry = settings.retry_settings()
+    assert retry["format_retries"] == 1  # falls back to model.retries
+    assert retry["error_retries"] == 2
+    assert retry["base_delay"] == 0.5
+
+    retry = settings.retry_settings("config_2")
+    assert retry["format_retries"] == 4
+    assert retry["error_retries"] == 2
+    assert retry["base_delay"] == 3
+
+
+def test_for_bot(default_config, monkeypatch):
+    from acrobot.app import Acrohost
+
+    monkeypatch.setenv("key_1", "123:abc")
+    monkeypatch.setenv("key_2", "123:abc")
+    default_config["acrobot"]["state_path"] = "state"
+    default_config["bots"] = {
+        "one": {"telegram_key": "key_1", "keywords": ["pizza"], "use_config": "config_2"},
+        "two": {"telegram_key": "key_2"},
+    }
+    settings = Config(**default_config)
+
+    one = settings.for_bot("one")
+    assert one.acrobot.telegram_key == "key_1"
+    assert one.acrobot.keywords == {"pizza"}
+    assert one.acrobot.state_path == "state.one"
+    assert one.use_config == {"provider": "Dummy"}
+    assert one.model.use_config == "config_2"
+
+    two = settings.for_bot("two")
+    assert set(two.acrobot.keywords) == {"beer", "hash"}
+    assert two.model.use_config == "testconf"
+    assert settings.acrobot.telegram_key == "dummy_key"
+
+    # keywords stay a set, so /add_keywords works in multi-bot mode
+    bot = Acrohost(settings=settings).bots["one"]
+    bot._add_keywords(["x"])
+    assert bot.keywords == {"pizza", "x"}
+
+    default_config["bots"]["two"]["use_config"] = "missing"
+    with pytest.raises(KeyError):
+        Config(**default_config)
+
+    # the API is only served by a single bot's webhook app
+    default_config["bots"]["two"]["use_config"] = None
+    default_config["api"] = {"enabled": True}
+    with pytest.raises(ValueError, match="multi-bot"):
+        Config(**default_config)
+
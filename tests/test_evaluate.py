@@ -0,0 +1,70 @@
+"""
+Created on Mon Oct 19 08:08:30 2026
+
+@author: BlankAdventure
+"""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+from acrobot.config import Config
+from acrobot.evaluate import format_summary, percentile, run_eval, load_words, write_report
+
+
+@pytest.mark.parametrize(
+    "values, p, expected",
+    [
+        ([], 50, 0.0),
+        ([3.0], 99, 3.0),
+        ([1.0, 2.0, 3.0, 4.0, 5.0], 50, 3.0),
+        ([1.0, 2.0, 3.0, 4.0, 5.0], 95, 4.8),
+        ([5.0, 1.0, 3.0], 0, 1.0),
+    ],
+)
+def test_percentile(values, p, expected):
+    assert percentile(values, p) == pytest.approx(expected)
+
+
+def test_load_words(tmp_path):
+    path = tmp_path / "words.txt"
+    path.write_text("cat\n\n# comment\n beer \n")
+    assert load_words(str(path)) == ["cat", "beer"]
+
+
+# Runs offline: testconf uses the patched Dummy model, local the LocalModel.
+@patch("acrobot.models.sleep")
+@patch("conftest.api_call")
+async def test_run_eval(mock_call, mock_sleep, default_config, tmp_path):
+    default_config["model"]["retry"] = {"base_delay": 0}
+    default_config["local"] = {"provider": "LocalModel", "seed": 1}
+    settings = Config(**default_config)
+    mock_call.side_effect = lambda: "Cool Awesome Tiger"
+
+    report = await run_eval(
+        settings, ["testconf", "local"], ["cat", "dog"], ["", "bob: hi"], 2
+    )
+    summary = {s["config"]: s for s in report["summary"]}
+
+    assert len(report["records"]) == 8
+    assert summary["local"]["valid_rate"] == 1
+    assert summary["local"]["first_try_rate"] == 1
+    assert summary["testconf"]["valid_rate"] == 0.5  # only "cat" matches
+    assert summary["testconf"]["mean_attempts"] == 1.5  # one retry for "dog"
+    assert summary["testconf"]["p50"] <= summary["testconf"]["p99"]
+
+    # format repairs are counted per config and for the run
+    report = await run_eval(settings, ["testconf"], ["ct"], [""])
+    assert report["summary"][0]["repaired_rate"] == 1
+    assert report["summary"][0]["first_try_rate"] == 0
+    assert report["repairs"] == {"attempted": 1, "repaired": 1, "retries_avoided": 1}
+    assert "repairs: attempted 1, repaired 1, retries avoided 1" in format_summary(report)
+
+    mock_call.side_effect = ValueError("naked")
+    report = await run_eval(settings, ["testconf"], ["cat"], [""])
+    assert report["summary"][0]["errors"] == {"user_message": 1}
+
+    path = tmp_path / "out.json"
+    write_report(report, str(path))
+    assert json.loads(path.read_text()) == report
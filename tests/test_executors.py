@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:00:24 2026
+
+@author: BlankAdventure
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from acrobot import executors
+from acrobot.executors import ExecutorFull, ProviderExecutor
+from acrobot.models import AcroError, Usage, call_model, collect_usage, record_usage
+from conftest import Dummy
+
+
+async def test_provider_executor_reject():
+    executor = ProviderExecutor("test", workers=1, max_queue=1)
+    release = threading.Event()
+    calls = [asyncio.create_task(executor.run(release.wait)) for _ in range(2)]
+    await asyncio.sleep(0.02)
+    assert (executor.running, executor.queued) == (1, 1)
+
+    with pytest.raises(ExecutorFull):
+        await executor.run(release.wait)
+    release.set()
+    assert await asyncio.gather(*calls) == [True, True]
+    assert (executor.completed, executor.rejected, executor.peak_queued) == (2, 1, 1)
+    assert "2 done, 1 rejected" in str(executor)
+    executor.shutdown()
+
+
+# A caller that stops waiting doesn't free the slot while its call still runs.
+async def test_provider_executor_timeout():
+    executor = ProviderExecutor("test", workers=1, max_queue=0)
+    release = threading.Event()
+    with pytest.raises(TimeoutError):
+        await asyncio.wait_for(executor.run(release.wait), 0.02)
+    with pytest.raises(ExecutorFull):
+        await executor.run(release.wait)
+    release.set()
+    await asyncio.sleep(0.02)
+    assert executor.in_flight == 0
+    assert await executor.run(release.wait) is True
+    executor.shutdown()
+
+
+async def test_provider_executor_wait():
+    executor = ProviderExecutor("test", workers=2, max_queue=0, on_full="wait")
+    start = time.perf_counter()
+    await asyncio.gather(*(executor.run(time.sleep, 0.05) for _ in range(4)))
+    assert time.perf_counter() - start == pytest.approx(0.1, abs=0.04)
+    assert executor.rejected == 0 and executor.peak_queued == 0
+    assert 0 < executor.utilization() <= 1
+    executor.shutdown()
+
+
+# Calls run on the provider's pool, in the caller's context (so token usage
+# is still collected), and a full pool fails like an API error.
+async def test_call_model():
+    executors.configure({"Dummy": {"workers": 1, "max_queue": 0}})
+    model = Dummy()
+
+    def call() -> str:
+        record_usage(prompt=5)
+        return threading.current_thread().name
+
+    with collect_usage(usage := Usage()):
+        assert (await call_model(model, call)).startswith("acrobot-Dummy")
+    assert usage.prompt_tokens == 5
+
+    release = threading.Event()
+    blocked = asyncio.create_task(call_model(model, release.wait))
+    await asyncio.sleep(0.01)
+    with pytest.raises(AcroError):
+        await call_model(model, call)
+    release.set()
+    await blocked
+    executors.configure({})
+    assert executors.get("Dummy") is None
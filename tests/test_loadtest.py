@@ -0,0 +1,92 @@
+"""
+Created on Mon Oct 19 08:16:17 2026
+
+@author: BlankAdventure
+"""
+
+import os
+
+import httpx
+
+from acrobot.config import Config
+from acrobot.loadtest import (
+    BotApiStub,
+    LoadProfile,
+    generate_updates,
+    loop_factory,
+    run_load,
+    server_modes,
+)
+
+
+def test_generate_updates():
+    profile = LoadProfile(chats=3, rate=50, duration=10, keyword_ratio=0.2, acro_ratio=0.1, keywords=("beer",))
+    updates = list(generate_updates(profile, seed=1))
+
+    assert updates == list(generate_updates(profile, seed=1))  # reproducible
+    assert 400 < len(updates) < 600
+    assert all(0 < t <= 10 for t, _, _ in updates)
+    assert {u["message"]["chat"]["id"] for _, u, _ in updates} == {-1000, -1001, -1002}
+
+    acros = [u for _, u, _ in updates if u["message"]["text"].startswith("/acro")]
+    replies = [u for _, u, expects in updates if expects]
+    assert 0.05 < len(acros) / len(updates) < 0.15
+    assert 0.2 < len(replies) / len(updates) < 0.4
+    assert all("beer" in u["message"]["text"] for u in replies if u not in acros)
+
+
+async def test_stub_send_message():
+    stub = BotApiStub(error_rate=0)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(stub), base_url="http://stub") as client:
+        response = await client.post("/botTOKEN/sendMessage", data={"chat_id": "-5", "text": "hi"})
+        assert response.json()["result"]["chat"]["id"] == -5
+        assert [(c, t) for _, c, t in stub.replies] == [(-5, "hi")]
+
+        stub.error_rate = 1
+        response = await client.post("/botTOKEN/sendMessage", data={"chat_id": "-5", "text": "hi"})
+        assert response.status_code == 429
+        assert response.json()["parameters"]["retry_after"] == 1
+        assert stub.throttled == 1
+
+        stub.push({"update_id": 1})
+        response = await client.post("/botTOKEN/getUpdates", data={"timeout": "1"})
+        assert response.json()["result"] == [{"update_id": 1}]
+
+
+# End-to-end run in polling mode with the offline LocalModel.
+async def test_run_load(default_config):
+    default_config["acrobot"]["throttle_interval"] = 0
+    default_config["model"]["use_config"] = "local"
+    default_config["local"] = {"provider": "LocalModel", "seed": 1}
+    settings = Config(**default_config)
+    profile = LoadProfile(chats=3, rate=20, duration=1, keyword_ratio=0.3, acro_ratio=0.2)
+
+    token = os.environ.get(settings.acrobot.telegram_key)
+    report = await run_load(settings, profile, "polling", BotApiStub(), slo=5, drain=5, seed=1)
+    assert os.environ.get(settings.acrobot.telegram_key) == token  # stub token not left behind
+
+    assert report.updates > 0
+    assert report.expected_replies > 0
+    assert report.replies == report.expected_replies
+    assert report.slo_adherence == 1
+
+
+# Webhook mode through the raw ASGI fast path, timing each POST.
+async def test_run_load_fast_path(default_config):
+    default_config["acrobot"]["throttle_interval"] = 0
+    default_config["model"]["use_config"] = "local"
+    default_config["local"] = {"provider": "LocalModel", "seed": 1}
+    default_config["server"] = {"fast_path": True, "access_log": False}
+    settings = Config(**default_config)
+    profile = LoadProfile(chats=3, rate=20, duration=1, keyword_ratio=0.3, acro_ratio=0.2)
+
+    report = await run_load(settings, profile, "webhook", BotApiStub(), slo=5, drain=5, seed=1)
+
+    assert report.replies == report.expected_replies > 0
+    assert 0 < report.request_p50 <= report.request_p99
+
+
+def test_server_modes():
+    modes = server_modes()
+    assert modes["default"] == {} and modes["fast_path"] == {"fast_path": True}
+    assert loop_factory("asyncio") is None
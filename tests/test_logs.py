@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 08:39:23 2026
+
+@author: BlankAdventure
+"""
+
+import json
+import logging
+import threading
+
+import pytest
+
+from acrobot import logs
+
+
+class Collector(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+        self.threads.add(threading.get_ident())
+
+
+@pytest.fixture
+def collector():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield Collector()
+    logs.stop()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+def test_json_with_correlation_ids(collector):
+    logs.configure("INFO", format="json", handler=collector)
+    log = logging.getLogger("acrobot.test")
+    with logs.bind(chat=-5, request=12):
+        log.info("hello %s", "bob")
+    log.debug("not shown")
+    log.info("outside")
+    logs.stop()  # flushes the queue
+
+    lines = [json.loads(line) for line in collector.lines]
+    assert [(x["message"], x["chat"], x["request"]) for x in lines] == [
+        ("hello bob", -5, 12),
+        ("outside", None, None),
+    ]
+    assert collector.threads != {threading.get_ident()}  # written off-thread
+
+
+# Tracebacks are formatted by the listener, and still reach the JSON line.
+def test_json_exception(collector):
+    logs.configure("INFO", format="json", handler=collector)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logging.getLogger("acrobot.test").exception("failed %d", 1)
+    logs.stop()
+
+    [line] = [json.loads(line) for line in collector.lines]
+    assert line["message"] == "failed 1"
+    assert "ValueError: boom" in line["exc"]
+
+
+def test_sampling(collector):
+    logs.configure("INFO", use_queue=False, sample={"acrobot.noisy": 0.0}, handler=collector)
+    logging.getLogger("acrobot.noisy.child").info("dropped")
+    logging.getLogger("acrobot.noisy").warning("kept")
+    logging.getLogger("acrobot.quiet").info("kept too")
+
+    assert [line.rsplit(" | ", 1)[-1] for line in collector.lines] == ["kept", "kept too"]
@@ -6,8 +6,32 @@ Created on Sat Dec 20 20:34:42 2025
 """
 
 import pytest
-from unittest.mock import patch
-from acrobot.models import validate_format, get_acro, build_model, AcroError, catch
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from acrobot.models import (
+    validate_format,
+    get_acro,
+    get_acro_result,
+    get_acro_result_async,
+    record_usage,
+    build_model,
+    AcroError,
+    RetryPolicy,
+    catch,
+    repair_expansion,
+    repair_stats,
+    build_prompt,
+    LocalModel,
+    CerebrasModel,
+    pick_candidate,
+    AcroResult,
+    RouteRule,
+    Router,
+    build_batch_prompt,
+    parse_batch,
+    RecordingModel,
+    ReplayModel,
+)
 
 
 # test helper function. Suggest to move to conftest and incorporate into
@@ -63,6 +87,126 @@ def test_get_acro_retries_until_valid(mock_call, dummy_model):
     assert mock_call.call_count == 4
 
 
+@patch("acrobot.models.sleep")
+@patch("conftest.api_call")
+def test_get_acro_no_sleep_after_final_attempt(mock_call, mock_sleep, dummy_model):
+    model = dummy_model()
+    mock_call.return_value = "Still Wrong"
+    policy = RetryPolicy(format_retries=2, base_delay=1, multiplier=2, jitter=0)
+    result = get_acro_result(model, word="cat", policy=policy)
+
+    assert not result.is_valid
+    assert result.attempts == 3
+    assert [c.args[0] for c in mock_sleep.call_args_list] == [1, 2]
+
+
+@patch("acrobot.models.sleep")
+@patch("conftest.api_call")
+def test_get_acro_separate_error_budget(mock_call, mock_sleep, dummy_model):
+    model = dummy_model()
+
+    # API errors draw from their own budget and don't use up format retries
+    mock_call.side_effect = [ValueError("naked"), "Still Wrong", "Cool Awesome Tiger"]
+    policy = RetryPolicy(format_retries=1, error_retries=1, jitter=0)
+    result = get_acro_result(model, word="cat", policy=policy)
+    assert result.is_valid
+    assert result.attempts == 3
+    assert result.api_errors == 1
+
+    # once the error budget is spent the AcroError is raised
+    mock_call.side_effect = [ValueError("naked"), ValueError("naked")]
+    with pytest.raises(AcroError, match="user_message"):
+        get_acro_result(model, word="cat", policy=policy)
+
+
+@patch("acrobot.models.sleep")
+@patch("conftest.api_call")
+def test_get_acro_deadline(mock_call, mock_sleep, dummy_model):
+    model = dummy_model()
+    mock_call.return_value = "Still Wrong"
+    policy = RetryPolicy(format_retries=5, base_delay=2, jitter=0, deadline=1)
+    result = get_acro_result(model, word="cat", policy=policy)
+
+    assert result.attempts == 1
+    mock_sleep.assert_not_called()
+
+
+@patch("conftest.api_call")
+async def test_get_acro_result_async(mock_call, dummy_model):
+    model = dummy_model()
+    mock_call.side_effect = ["Still Wrong", "Cool Awesome Tiger"]
+    policy = RetryPolicy(format_retries=1, base_delay=0.01, jitter=0)
+    result = await get_acro_result_async(model, word="cat", policy=policy)
+
+    assert result.is_valid
+    assert result.expansion == "Cool Awesome Tiger"
+    assert result.attempts == 2
+    assert result.elapsed >= 0.01
+
+
+# Usage reported from the worker thread is summed over all attempts.
+@patch("conftest.api_call")
+async def test_get_acro_result_usage(mock_call, dummy_model):
+    responses = iter(["Still Wrong", "Cool Awesome Tiger"])
+
+    def respond():
+        record_usage(prompt=10, completion=3, reasoning=5)
+        return next(responses)
+
+    mock_call.side_effect = respond
+    policy = RetryPolicy(format_retries=1, base_delay=0)
+    result = await get_acro_result_async(dummy_model(), word="cat", policy=policy)
+
+    assert result.usage.prompt_tokens == 20
+    assert result.usage.reasoning_tokens == 10
+    assert result.usage.total_tokens == 36
+    record_usage(prompt=1)  # outside a request; ignored
+
+
+@pytest.mark.parametrize("retry, expected", [(1, 1.0), (2, 2.0), (3, 4.0), (6, 8.0)])
+def test_retry_policy_backoff(retry, expected):
+    policy = RetryPolicy(base_delay=1, multiplier=2, max_delay=8, jitter=0.25)
+    assert expected * 0.75 <= policy.backoff(retry) <= expected * 1.25
+
+
+@pytest.mark.parametrize(
+    "word, expansion, expected",
+    [
+        ("cat", '"Cool Awesome Tiger."', "Cool Awesome Tiger"),
+        ("cat", "Cool Awesome Tiger\n.", "Cool Awesome Tiger"),
+        ("cat", "1. Cool\n2. Awesome\n3. Tiger", "Cool Awesome Tiger"),
+        ("dog", "Dark Over-Grown", "Dark Over Grown"),
+        ("cat", "Cool and Awesome the Tiger", "Cool Awesome Tiger"),
+        ("cat", "Sure!\nCool Awesome Tiger", "Cool Awesome Tiger"),
+        ("cat", "Cool Awesome Tiger and other stuff", None),  # over edit budget
+        ("cat", "Totally Wrong Answer", None),
+        ("cat", None, None),
+    ],
+)
+def test_repair_expansion(word, expansion, expected):
+    assert repair_expansion(word, expansion, max_edits=2) == expected
+
+
+@patch("acrobot.models.sleep")
+@patch("conftest.api_call")
+def test_get_acro_repair_avoids_retry(mock_call, mock_sleep, dummy_model):
+    model = dummy_model()
+    mock_call.return_value = "1. Cool Awesome-Tiger."
+    avoided = repair_stats.retries_avoided
+
+    result = get_acro_result(model, word="cat", policy=RetryPolicy(format_retries=1))
+    assert result.is_valid
+    assert result.expansion == "Cool Awesome Tiger"
+    assert result.attempts == 1
+    assert repair_stats.retries_avoided == avoided + 1
+
+    # repair can be switched off
+    policy = RetryPolicy(format_retries=1, repair=False)
+    result = get_acro_result(model, word="cat", policy=policy)
+    assert not result.is_valid
+    assert result.attempts == 2
+
+
 def test_catch_functionality():
 
     @catch(ZeroDivisionError, "user_message_1")
@@ -159,3 +303,152 @@ def test_get_model_success_str(dummy_model):
 def test_get_model_fails():
     with pytest.raises(KeyError):
         build_model("model_doesnt_exist")
+
+
+@pytest.mark.parametrize("word", ["a", "cat", "beer", "weekend", "xylophonezq"])
+def test_local_model_valid(word):
+    model = build_model({"provider": "LocalModel", "seed": 1})
+    assert isinstance(model, LocalModel)
+    acro, is_valid = get_acro(model, word=word, convo="bob: hello there")
+    assert is_valid
+
+
+def test_local_model_history_bias():
+    model = LocalModel(history_bias=1, seed=1)
+    prompt = build_prompt("cat", convo="bob: crunchy apples taste good")
+    words = model.generate_response(prompt).lower().split()
+    assert words[0] == "crunchy"
+    assert words[1] == "apples"
+    assert words[2] == "taste"
+
+
+@pytest.mark.parametrize(
+    "candidates, rank, expected",
+    [
+        (["Cold Angry Grape", "Cool Awesome Tiger", "Cat Ate Tuna"], False, "Cool Awesome Tiger"),
+        (["Cat a Tuna", "Cool Awesome Tiger"], True, "Cool Awesome Tiger"),
+        (["no", "1. Cool Awesome Tiger"], False, "1. Cool Awesome Tiger"),  # repairable
+        (["no", None], False, "no"),
+    ],
+)
+def test_pick_candidate(candidates, rank, expected):
+    assert pick_candidate("cat", candidates, rank, repair_edits=2) == expected
+
+
+# One call returning several candidates stands in for a round of retries.
+def test_get_acro_result_candidates():
+    model = CerebrasModel(api_key="x", candidates=3)
+    choices = ["Cold Angry Grape", "Cool Awesome Tiger", None]
+    completion = SimpleNamespace(
+        usage=None,
+        choices=[SimpleNamespace(message=SimpleNamespace(content=c)) for c in choices],
+    )
+    model.client = MagicMock()
+    model.client.chat.completions.create.return_value = completion
+
+    result = get_acro_result(model, "cat", policy=RetryPolicy(format_retries=2))
+    assert (result.expansion, result.is_valid) == ("Cool Awesome Tiger", True)
+    assert (result.attempts, result.candidates) == (1, 3)
+    assert model.client.chat.completions.create.call_args.kwargs["n"] == 3
+
+    assert model.generate_response("prompt") == "Cold Angry Grape"
+    assert model.client.chat.completions.create.call_args.kwargs["n"] == 1
+
+
+def test_router():
+    router = Router(
+        [
+            RouteRule("fast", min_queue=10),
+            RouteRule("fast", max_length=5, kinds=("keyword",), min_valid_rate=0.5),
+            RouteRule("think", min_length=8),
+        ],
+        min_samples=2,
+        window=3,
+        explore=0,
+    )
+    assert router.pick("cat", "keyword") == "fast"
+    assert router.pick("cat", "acro") is None
+    assert router.pick("elephants", "acro") == "think"
+    assert router.pick("elephants", "acro", queue_depth=10) == "fast"
+
+    # once "fast" proves unreliable for 3-letter words, the rule is skipped
+    router.record("fast", "cat", AcroResult("Cool Awesome Tiger", True, 1, 0.1))
+    assert router.pick("dog", "keyword") == "fast"  # too few samples yet
+    router.record("fast", "cat", AcroResult("Cool Tiger", False, 2, 0.1))
+    router.record("fast", "cat", AcroResult("Cool Tiger", False, 2, 0.1))
+    assert router.valid_rate("fast", 3) == pytest.approx(1 / 3)
+    assert router.pick("dog", "keyword") is None
+    assert router.pick("duck", "keyword") == "fast"
+    assert router.routed["fast"] == 4
+
+    # a small fraction still goes to the skipped rule, and only the last
+    # window results count, so the config can win its rule back
+    router.explore = 1
+    assert router.pick("dog", "keyword") == "fast"
+    router.record("fast", "dog", AcroResult("Dumb Old Goat", True, 1, 0.1))
+    router.record("fast", "dog", AcroResult("Dumb Old Goat", True, 1, 0.1))
+    assert router.valid_rate("fast", 3) == pytest.approx(2 / 3)
+    router.explore = 0
+    assert router.pick("dog", "keyword") == "fast"
+
+    # repaired answers and failed requests don't count as valid first try
+    router.record("fast", "dog", AcroResult("Dumb Old Goat", True, 1, 0.1, repaired=True))
+    router.record("fast", "dog", None)
+    assert router.valid_rate("fast", 3) == pytest.approx(1 / 3)
+
+    # configs that failed their probe, or answered it too slowly, are skipped
+    router.rules.append(RouteRule("slow", min_length=8, max_latency=1.0))
+    router.rules.insert(0, RouteRule("down"))
+    router.latency.update({"down": None, "think": 2.0, "slow": 0.5})
+    assert router.pick("elephants", "acro") == "think"
+    router.rules[-2].max_latency = 1.0
+    assert router.pick("elephants", "acro") == "slow"
+
+
+def test_parse_batch():
+    prompt = build_batch_prompt([("cat", "bob: hi"), ("dog", "")])
+    assert "### 1. cat ###\nbob: hi" in prompt and "(no conversation)" in prompt
+    response = "Here you go:\n1. CAT: Cool Awesome Tiger\n**3)** PIG: Purple Iguana Gym\n"
+    assert parse_batch(["cat", "dog", "pig"], response) == [
+        "Cool Awesome Tiger",
+        None,
+        "Purple Iguana Gym",
+    ]
+
+
+# A recorded session replays the same responses, errors and token counts.
+@patch("conftest.api_call")
+def test_record_replay(mock_call, tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    recorder = RecordingModel(model="Dummy", path=path)
+
+    responses = iter(["Cool Awesome Tiger", "Cat", ValueError("boom"), TypeError("sdk")])
+
+    def respond():
+        response = next(responses)
+        if isinstance(response, Exception):
+            raise response
+        record_usage(prompt=10, completion=3)
+        return response
+
+    mock_call.side_effect = respond
+    result = get_acro_result(recorder, "cat")
+    assert (result.expansion, result.usage.total_tokens) == ("Cool Awesome Tiger", 13)
+    assert recorder.generate_response("hello") == "Cat"
+    with pytest.raises(AcroError):
+        recorder.generate_response("hello")
+    with pytest.raises(TypeError):
+        recorder.generate_response("hello")
+
+    replay = build_model({"provider": "ReplayModel", "path": path, "latency": True, "speed": 0})
+    assert isinstance(replay, ReplayModel)
+    result = get_acro_result(replay, "cat")
+    assert (result.expansion, result.usage.total_tokens) == ("Cool Awesome Tiger", 13)
+    assert replay.generate_response("hello") == "Cat"
+    with pytest.raises(AcroError, match="user_message"):
+        replay.generate_response("hello")
+    with pytest.raises(AcroError, match="TypeError: sdk"):
+        replay.generate_response("hello")
+    assert replay.generate_response("hello") == "Cat"  # starts over
+    with pytest.raises(AcroError):
+        replay.generate_response("never recorded")
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 08:58:17 2026
+
+@author: BlankAdventure
+"""
+
+import asyncio
+import threading
+import time
+
+from acrobot.monitor import CountingExecutor, LoopMonitor, SamplingProfiler
+
+
+async def test_loop_monitor_blocked(caplog):
+    monitor = LoopMonitor(interval=0.01, threshold=0.05)
+    task = asyncio.create_task(monitor.run())
+    await asyncio.sleep(0.03)
+    time.sleep(0.1)  # blocks the loop
+    await asyncio.sleep(0.03)
+    task.cancel()
+
+    assert monitor.stats.blocked == 1
+    assert monitor.stats.lag_max >= 0.05
+    assert "event loop blocked" in caplog.text
+    # to_thread now runs on the monitored executor
+    name = await asyncio.to_thread(lambda: threading.current_thread().name)
+    assert name.startswith("acrobot-worker")
+    assert "blocked 1 times" in str(monitor)
+
+
+def test_counting_executor():
+    executor = CountingExecutor(max_workers=1)
+    release = threading.Event()
+    first = executor.submit(release.wait)
+    second = executor.submit(lambda: 2)
+    time.sleep(0.02)
+    assert (executor.running, executor.queued) == (1, 1)
+    release.set()
+    assert second.result() == 2 and first.result()
+    assert (executor.running, executor.queued) == (0, 0)
+    executor.shutdown()
+
+
+def test_sampling_profiler(tmp_path):
+    path = tmp_path / "profile.txt"
+    profiler = SamplingProfiler(str(path), interval=0.001)
+    profiler.start()
+
+    def busy_function():
+        end = time.monotonic() + 0.05
+        while time.monotonic() < end:
+            pass
+
+    busy_function()
+    profiler.stop()
+    lines = path.read_text().splitlines()
+    assert any("busy_function" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 08:33:58 2026
+
+@author: BlankAdventure
+"""
+
+import time
+
+from acrobot.pending import PendingTask, load_pending, save_pending
+
+
+def test_save_load_pending(tmp_path):
+    path = str(tmp_path / "pending.jsonl")
+    tasks = [
+        PendingTask(-1, 10, "cat", "acro", run=lambda: None),
+        PendingTask(-2, 11, "beer", "keyword", enqueued=time.time() - 120),
+    ]
+    assert save_pending(path, tasks) == 2
+    with open(path, "a") as f:
+        f.write("not json\n")
+
+    loaded = load_pending(path, max_age=60)
+    assert [t.to_dict() for t in loaded] == [tasks[0].to_dict()]
+    assert load_pending(path, max_age=60) == []
@@ -0,0 +1,95 @@
+"""
+Created on Mon Oct 19 08:20:05 2026
+
+@author: BlankAdventure
+"""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+from acrobot.app import Acrobot
+from acrobot.pregen import KeywordPool
+
+
+def test_pool_sync_and_take():
+    pool = KeywordPool(size=2)
+    pool.sync(["beer", "Party"])
+    assert pool.next_keyword() in {"beer", "party"}
+
+    pool.add("beer", "big eager elves run")
+    pool.add("beer", "bad earth eats rocks")
+    pool.add("beer", "one too many")  # pool is full
+    assert len(pool.pools["beer"]) == 2
+    assert pool.next_keyword() == "party"
+
+    # context words pick the best match, otherwise oldest first
+    assert pool.take("beer", ["rocks", "earth"]) == "bad earth eats rocks"
+    assert pool.take("BEER") == "big eager elves run"
+    assert pool.take("beer") is None
+    assert pool.stats.served == 2 and pool.stats.misses == 1
+
+    pool.sync(["beer"])
+    assert "party" not in pool.pools
+
+
+def test_pool_ttl_and_priority():
+    pool = KeywordPool(size=2, ttl=10, priority="popular")
+    pool.sync(["beer", "party"])
+    pool.add("beer", "big eager elves run")
+    with patch("acrobot.pregen.time.time", return_value=time.time() + 11):
+        assert pool.take("beer") is None
+        assert pool.stats.expired == 1
+
+    pool.take("party")
+    pool.take("party")
+    assert pool.next_keyword() == "party"  # most hits first
+
+
+# The pool fills while the bot is idle and then answers keyword hits
+# without going through the queue.
+@patch("conftest.api_call")
+async def test_pregen_bot(mock_call, default_config, mock_update, mock_context):
+    default_config["acrobot"]["throttle_interval"] = 0
+    default_config["acrobot"]["keywords"] = ["beer"]
+    default_config["pregen"] = {"enabled": True, "pool_size": 2, "idle_poll": 0.01}
+    bot = Acrobot(default_config, start_telegram=False)
+    mock_call.configure_mock(return_value="big eager elves run")
+
+    bot.start(run_polling=False)
+    for _ in range(100):
+        if len(bot.pool.pools["beer"]) == 2:
+            break
+        await asyncio.sleep(0.01)
+
+    mock_update.message.from_user.username = "bob"
+    mock_update.message.text = "who wants a beer"
+    await bot._handle_message(mock_update, mock_context)
+    await bot.complete(stop=True)
+
+    mock_update.message.reply_text.assert_awaited_once_with(
+        "beer? Who said beer!?\nbig eager elves run", do_quote=False
+    )
+    assert bot.pool.stats.served == 1
+
+
+# Failed refills back off, so a model that is down isn't hammered.
+@patch("conftest.api_call")
+async def test_refill_backoff(mock_call, default_config):
+    default_config["acrobot"]["keywords"] = ["beer"]
+    default_config["pregen"] = {"enabled": True, "idle_poll": 1, "max_backoff": 3}
+    default_config["model"]["retry"] = {"base_delay": 0}
+    bot = Acrobot(default_config, start_telegram=False)
+    mock_call.side_effect = ValueError("down")
+
+    pauses = []
+    for _ in range(4):
+        await bot._refill_pool("beer")
+        pauses.append(bot.refill_after - time.monotonic())
+    assert [round(p) for p in pauses] == [1, 2, 3, 3]
+
+    mock_call.side_effect = None
+    mock_call.return_value = "big eager elves run"
+    await bot._refill_pool("beer")
+    assert bot.refill_failures == 0
+    assert len(bot.pool.pools["beer"]) == 1
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:08:09 2026
+
+@author: BlankAdventure
+"""
+
+import time
+from unittest.mock import patch
+
+from acrobot.models import LocalModel, RecordingModel
+from acrobot.probe import ProbeResult, probe_models
+from conftest import Dummy
+
+
+@patch("conftest.api_call")
+async def test_probe_models(mock_call):
+    def answer():
+        time.sleep(0.05)
+        return "OK"
+
+    mock_call.side_effect = answer
+    results = await probe_models({"a": Dummy(), "b": Dummy()}, "Say OK.", timeout=1.0)
+    assert set(results) == {"a", "b"}
+    assert all(r.ok and 0.05 <= r.latency < 1.0 for r in results.values())
+
+    results = await probe_models({"a": Dummy()}, "Say OK.", timeout=0.01)
+    assert results["a"].error == "timed out after 0.01s"
+
+    mock_call.side_effect = ValueError("no key")
+    results = await probe_models({"a": Dummy()}, "Say OK.", timeout=1.0)
+    assert not results["a"].ok and results["a"].latency is None
+    assert str(results["a"]).startswith("a: AcroError")
+
+
+# Offline models can't answer the probe prompt, and need no warming up.
+async def test_probe_offline(tmp_path):
+    cassette = tmp_path / "cassette.jsonl"
+    models = {
+        "local": LocalModel(seed=1),
+        "recorded": RecordingModel(model="LocalModel", path=str(cassette)),
+    }
+    results = await probe_models(models, "Reply with the single word OK.", timeout=1.0)
+    assert all(r.ok and r.latency == 0.0 for r in results.values())
+    assert not cassette.exists()  # the probe is not recorded
+
+
+def test_probe_result():
+    assert str(ProbeResult("a", 0.1234)) == "a: 0.123s"
+    assert ProbeResult("a", error="down").to_dict() == {"latency": None, "error": "down"}
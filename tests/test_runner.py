@@ -51,10 +51,75 @@ def test_webhook(mock_func):
     main(["webhook","-p", "5555", "-w", "a_url"])
     mock_func.assert_called_once_with("a_url", "0.0.0.0", 5555)
 
+    # server options are passed on only when given
+    mock_func.reset_mock()
+    main(["webhook", "-p", "5555", "--http", "h11", "--keep-alive", "30", "--fast-path"])
+    mock_func.assert_called_once_with(
+        None, "0.0.0.0", 5555, http="h11", timeout_keep_alive=30, fast_path=True
+    )
+
     # Failure to include port throws error
     mock_func.reset_mock()
     with pytest.raises(SystemExit):    
         main(["webhook","-w", "a_url","-a", "1.2.3.4"])
-        
-        
-        
+
+
+# Confirm functionality of eval command
+@patch('acrobot.runner.evaluate')
+def test_eval(mock_func):
+
+    # word file only; other values use default
+    main(["eval", "words.txt"])
+    mock_func.assert_called_once_with("words.txt", [], None, "eval_results.json", 4)
+
+    # several configs and options
+    mock_func.reset_mock()
+    main(["eval", "words.txt", "config0", "config1", "-c", "ctx.yaml", "-o", "out.json", "-n", "8"])
+    mock_func.assert_called_once_with("words.txt", ["config0", "config1"], "ctx.yaml", "out.json", 8)
+
+
+# Confirm functionality of loadtest command
+@patch('acrobot.runner.loadtest')
+def test_loadtest(mock_func):
+
+    main(["loadtest", "config5", "-m", "polling", "--rate", "20", "--throttle", "0"])
+    profile, mode, config, latency, error_rate, throttle, slo, output, *sweep = mock_func.call_args.args
+    assert (mode, config, throttle, output) == ("polling", "config5", 0, None)
+    assert profile.rate == 20
+    assert sweep == [None, None, None]
+
+    main(["loadtest", "--concurrent-updates", "1", "8", "--poll-limit", "10"])
+    *_, concurrency, poll_limit, log_bench = mock_func.call_args.args
+    assert (concurrency, poll_limit) == ([1, 8], 10)
+
+    main(["loadtest", "--log-bench", "bench.log"])
+    assert mock_func.call_args.args[-1] == "bench.log"
+
+    main(["loadtest", "--server-bench"])
+    assert mock_func.call_args.kwargs == {"server_bench": True}
+
+
+# An unknown config block is refused before the load test starts
+@patch('acrobot.loadtest.run_load')
+def test_loadtest_unknown_config(mock_run, default_config):
+    from acrobot.config import Config
+    from acrobot.runner import loadtest
+
+    with patch('acrobot.config.get_settings', return_value=Config(**default_config)):
+        with pytest.raises(KeyError, match="nope"):
+            loadtest(None, "polling", "nope", 0, 0, None, 10, None)
+    mock_run.assert_not_called()
+
+    # bad mode fails
+    with pytest.raises(SystemExit):
+        main(["loadtest", "-m", "carrier_pigeon"])
+
+
+# --profile samples stacks while the command runs and writes them on exit.
+@patch('acrobot.runner.cli')
+def test_profile(mock_func, tmp_path):
+    path = tmp_path / "profile.txt"
+    mock_func.side_effect = lambda *_: __import__("time").sleep(0.1)
+    main(["test", "word", "--profile", str(path)])
+    mock_func.assert_called_once_with("word", None)
+    assert "MainThread;" in path.read_text()
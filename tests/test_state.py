@@ -0,0 +1,84 @@
+"""
+Created on Mon Oct 19 08:18:32 2026
+
+@author: BlankAdventure
+"""
+
+from acrobot.state import ChatStates
+
+
+def test_history_is_bounded():
+    chats = ChatStates(max_history=3)
+    for i in range(10):
+        chats.get(1).add_message("bob", f"message {i}")
+    assert list(chats.get(1).history) == [("bob", f"message {i}") for i in (7, 8, 9)]
+
+
+def test_usernames_interned():
+    chats = ChatStates(max_history=5)
+    chats.get(1).add_message("".join(["us", "er"]), "a")
+    chats.get(2).add_message("".join(["us", "er"]), "b")
+    assert chats.get(1).history[0][0] is chats.get(2).history[0][0]
+
+
+def test_lru_eviction():
+    chats = ChatStates(max_history=5, max_bytes=10**9)
+    for chat_id in range(5):
+        chats.get(chat_id).add_message("bob", "x" * 1000)
+        chats.update(chat_id)
+    chats.get(0)  # chat 0 is now the most recently used
+
+    chats.max_bytes = chats.nbytes - 1
+    chats.update(4)
+
+    assert chats.resident == 4
+    assert 1 not in dict(chats.items())  # least recently used went first
+    assert chats.evicted == 1
+    assert chats.nbytes == sum(s.estimate_size() for _, s in chats.items())
+
+
+async def test_spill_and_rehydrate(tmp_path):
+    path = str(tmp_path / "chats")
+    chats = ChatStates(max_history=5, max_bytes=0, path=path)
+    chats.get(1).add_message("bob", "hello")
+    chats.get(1).keywords = frozenset({"beer"})
+    chats.get(1).overlay = {"use_config": "config2"}
+    chats.update(1)
+    chats.get(2).add_message("ann", "hi")
+    chats.update(2)  # pushes chat 1 out to disk
+
+    assert chats.resident == 1
+    state = chats.get(1)
+    assert list(state.history) == [("bob", "hello")]
+    assert state.keywords == {"beer"}
+    assert state.overlay == {"use_config": "config2"}
+    assert chats.rehydrated == 1
+
+    # state survives a restart via flush
+    await chats.flush()
+    restarted = ChatStates(max_history=5, path=path)
+    assert list(restarted.get(2).history) == [("ann", "hi")]
+
+
+async def test_spill_off_loop(tmp_path):
+    path = str(tmp_path / "chats")
+    chats = ChatStates(max_history=5, max_bytes=0, path=path)
+    for chat_id in range(4):
+        chats.get(chat_id).add_message("bob", f"message {chat_id}")
+        chats.update(chat_id)
+
+    # evicted chats wait in spilled until the writer has put them on disk
+    assert chats.writer is not None
+    assert list(chats.get(0).history) == [("bob", "message 0")]
+    await chats.writer
+    assert not chats.spilled
+
+    await chats.prefetch(1)
+    assert 1 in dict(chats.items())
+    assert chats.rehydrated == 2
+
+    await chats.flush()
+    restarted = ChatStates(max_history=5, path=path)
+    await restarted.prefetch(2)
+    assert list(restarted.get(2).history) == [("bob", "message 2")]
+    assert restarted.rehydrated == 1
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 08:26:35 2026
+
+@author: BlankAdventure
+"""
+
+import asyncio
+from unittest.mock import patch
+
+from acrobot.app import Acrobot
+from acrobot.state import ChatState
+from acrobot.summary import Summarizer
+
+
+def make_state(summarizer, count):
+    state = ChatState(max_history=5)
+    for i in range(count):
+        state.add_message("bob", f"message {i}")
+        summarizer.note(1, state)
+    return state
+
+
+@patch("conftest.api_call")
+async def test_summarizer(mock_call, dummy_model):
+    summarizer = Summarizer(dummy_model(), every=3, recent=1)
+    state = make_state(summarizer, 2)
+    assert not summarizer.pending
+    assert summarizer.convo(state) == "bob: message 0\nbob: message 1"
+
+    state = make_state(summarizer, 4)
+    assert await asyncio.wait_for(summarizer.next_chat(), 1) == 1
+
+    mock_call.return_value = " bob is counting "
+    await summarizer.refresh(state)
+    assert state.summary == "bob is counting"
+    assert state.unsummarized == 0
+    assert summarizer.convo(state) == "(earlier): bob is counting\nbob: message 3"
+
+    # unfolded messages are always sent raw
+    state.add_message("amy", "hi")
+    state.add_message("amy", "there")
+    summarizer.recent = 0
+    state.unsummarized = 2
+    assert summarizer.convo(state).endswith("amy: hi\namy: there")
+
+
+@patch("conftest.api_call")
+async def test_summarizer_failure_keeps_summary(mock_call, dummy_model):
+    summarizer = Summarizer(dummy_model(), every=1)
+    state = make_state(summarizer, 1)
+    state.summary = "old"
+    mock_call.side_effect = ValueError("naked")
+
+    await summarizer.refresh(state)
+    assert state.summary == "old"
+    assert state.unsummarized == 1
+    assert summarizer.failed == 1
+
+    # errors the model doesn't translate (SDK exceptions) are survived too
+    mock_call.side_effect = RuntimeError("503")
+    await summarizer.refresh(state)
+    assert state.summary == "old"
+    assert summarizer.failed == 2
+
+
+# The bot refreshes summaries in the background and uses them in prompts.
+@patch("conftest.api_call")
+async def test_bot_summary(mock_call, default_config):
+    default_config["acrobot"]["throttle_interval"] = 0
+    default_config["summary"] = {
+        "enabled": True, "config": "config_2", "every": 2, "interval": 0
+    }
+    bot = Acrobot(default_config, start_telegram=False)
+    mock_call.return_value = "Bob likes beer"
+    bot.start(run_polling=False)
+
+    bot._update_history("bob", "beer", chat_id=7)
+    bot._update_history("bob", "more beer", chat_id=7)
+    for _ in range(50):
+        if bot.chats.get(7).summary:
+            break
+        await asyncio.sleep(0.01)
+
+    assert bot.chats.get(7).summary == "Bob likes beer"
+    assert bot._convo(7) == "(earlier): Bob likes beer\nbob: beer\nbob: more beer"
+    await bot.complete(stop=True)
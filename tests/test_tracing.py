@@ -0,0 +1,83 @@
+"""
+Created on Mon Oct 19 08:10:15 2026
+
+@author: BlankAdventure
+"""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+from acrobot import tracing
+from acrobot.app import Acrobot
+
+
+@pytest.fixture
+def traces(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracing.configure(enabled=True, path=str(path))
+    yield path
+    tracing.configure()
+
+
+def read(path):
+    tracing.tracer.flush()
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_spans_nest(traces):
+    with tracing.trace("root") as root:
+        with tracing.span("child", n=1) as child:
+            child.set(ok=True)
+    spans = {s["name"]: s for s in read(traces)}
+
+    assert spans["child"]["parent"] == spans["root"]["span"]
+    assert spans["child"]["trace"] == spans["root"]["trace"]
+    assert spans["child"]["n"] == 1 and spans["child"]["ok"] is True
+    assert root.span_id == spans["root"]["span"]
+
+
+def test_disabled_and_unsampled(traces):
+    # spans outside a trace are dropped
+    with tracing.span("orphan"):
+        pass
+
+    tracing.configure(enabled=True, sample_rate=0, path=str(traces))
+    with tracing.trace("root") as root:
+        assert tracing.span("child") is root  # shared no-op
+    assert not traces.exists()
+
+
+def test_carry_and_resume(traces):
+    with tracing.trace("root"):
+        task = tracing.carry(lambda: None)
+    with tracing.resume(task):
+        with tracing.span("later"):
+            pass
+    spans = {s["name"]: s for s in read(traces)}
+
+    assert spans["queue.wait"]["parent"] == spans["root"]["span"]
+    assert spans["later"]["parent"] == spans["root"]["span"]
+
+
+# A queued /acro request is traced from the command through the queue, each
+# LLM attempt, and the reply.
+@patch("conftest.api_call")
+async def test_bot_trace(mock_call, traces, default_config, mock_update, mock_context):
+    default_config["acrobot"]["throttle_interval"] = 0
+    default_config["model"]["retry"] = {"base_delay": 0}
+    default_config["tracing"] = {"enabled": True, "path": str(traces)}
+    bot = Acrobot(default_config, start_telegram=False)
+    mock_call.configure_mock(side_effect=["wrong", "call on weeds"])
+    mock_context.args = ["cow"]
+
+    bot.start(run_polling=False)
+    await bot.command_acro(mock_update, mock_context)
+    await bot.complete(stop=True)
+
+    names = [s["name"] for s in read(traces)]
+    assert len({s["trace"] for s in read(traces)}) == 1
+    assert names.count("llm.attempt") == 2
+    for name in ["command.acro", "queue.wait", "queue.task", "telegram.reply", "queue.throttle"]:
+        assert name in names
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 08:24:20 2026
+
+@author: BlankAdventure
+"""
+
+import json
+from unittest.mock import patch
+
+from acrobot.models import Usage
+from acrobot.usage import UsageLedger
+
+
+def test_ledger_totals():
+    ledger = UsageLedger(chat_budget=50)
+    ledger.record(1, "config0", Usage(10, 5, 20))
+    ledger.record(2, "config0", Usage(1, 1, 0))
+    ledger.record(1, "config1", Usage(10, 0, 0))
+
+    assert ledger.used("chat", 1) == 45
+    assert ledger.used("config", "config0") == 37
+    assert not ledger.over_budget(1)
+    ledger.record(1, "config1", Usage(5, 0, 0))
+    assert ledger.over_budget(1)
+    assert "config0: 11 prompt, 6 completion, 20 reasoning (2 requests)" in ledger.summary(1)
+
+
+# Budgets reset with each window, and old windows are dropped on flush.
+def test_ledger_windows():
+    ledger = UsageLedger(window=60, retention=2, chat_budget=10)
+    with patch("acrobot.usage.time.time", return_value=1000.0):
+        ledger.record(1, "config0", Usage(20, 0, 0))
+        assert ledger.over_budget(1)
+    with patch("acrobot.usage.time.time", return_value=1070.0):
+        assert not ledger.over_budget(1)
+        ledger.flush()
+        assert len(ledger.buckets) == 2
+    with patch("acrobot.usage.time.time", return_value=1200.0):
+        ledger.flush()
+        assert not ledger.buckets
+
+
+def test_ledger_flush(tmp_path):
+    path = tmp_path / "usage.jsonl"
+    ledger = UsageLedger(window=60, path=str(path), flush_interval=0)
+    ledger.record(1, "config0", Usage(3, 2, 1))
+    ledger.flush()  # nothing new since the flush in record
+
+    rows = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(rows) == 2
+    chat = next(r for r in rows if r["kind"] == "chat")
+    assert chat["key"] == 1
+    assert (chat["prompt"], chat["completion"], chat["reasoning"], chat["requests"]) == (3, 2, 1, 1)
+    assert chat["window_start"] % 60 == 0